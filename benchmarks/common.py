@@ -0,0 +1,175 @@
+"""Shared helpers for the RAG service benchmarks."""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = ROOT_DIR / "src"
+FIXTURES_DIR = ROOT_DIR / "codes"
+
+
+def prepare_environment(
+    data_dir: Path | None = None,
+    embed_extra: dict[str, Any] | None = None,
+    llm_extra: dict[str, Any] | None = None,
+) -> Path:
+    """
+    Point the service at a throwaway data dir and the offline fake provider.
+
+    Must be called before ``main`` is imported, since the service reads its
+    configuration from the environment at import time.
+    """
+    if data_dir is None:
+        data_dir = Path(tempfile.mkdtemp(prefix="rag-bench-"))
+    os.environ["DATA_DIR"] = str(data_dir)
+    os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+    os.environ.setdefault("RAG_EMBED_PROVIDER", "fake")
+    os.environ.setdefault("RAG_EMBED_MODEL", "fake")
+    os.environ.setdefault("RAG_LLM_PROVIDER", "fake")
+    os.environ.setdefault("RAG_LLM_MODEL", "fake")
+    if embed_extra is not None:
+        os.environ["RAG_EMBED_EXTRA"] = json.dumps(embed_extra)
+    if llm_extra is not None:
+        os.environ["RAG_LLM_EXTRA"] = json.dumps(llm_extra)
+    if str(SRC_DIR) not in sys.path:
+        sys.path.insert(0, str(SRC_DIR))
+    return data_dir
+
+
+def parse_language_mix(spec: str | None, fixtures: list[Path]) -> dict[str, float]:
+    """
+    Parse a language mix such as ``"rs=2,kt=1"`` into extension weights.
+
+    Without a spec every fixture extension gets the same weight.
+    """
+    available = {path.suffix.lstrip(".") for path in fixtures}
+    if not spec:
+        return dict.fromkeys(sorted(available), 1.0)
+
+    weights = {}
+    for item in spec.split(","):
+        ext, _, weight = item.strip().partition("=")
+        ext = ext.lstrip(".")
+        if ext not in available:
+            error_msg = f"No fixture with extension '{ext}' (available: {sorted(available)})"
+            raise ValueError(error_msg)
+        weights[ext] = float(weight) if weight else 1.0
+    return weights
+
+
+def generate_repository(
+    target: Path,
+    num_files: int,
+    language_mix: str | None = None,
+    fixtures_dir: Path = FIXTURES_DIR,
+    files_per_dir: int = 50,
+    seed: int = 0,
+) -> dict[str, int]:
+    """
+    Fill ``target`` with ``num_files`` copies of the fixtures.
+
+    Files are spread over nested package directories so that the scan stage
+    walks a realistic tree. Returns the number of generated files per extension.
+    """
+    fixtures = sorted(p for p in fixtures_dir.iterdir() if p.is_file())
+    weights = parse_language_mix(language_mix, fixtures)
+    by_ext: dict[str, list[Path]] = {}
+    for path in fixtures:
+        ext = path.suffix.lstrip(".")
+        if ext in weights:
+            by_ext.setdefault(ext, []).append(path)
+
+    rng = random.Random(seed)
+    exts = list(weights)
+    counts: dict[str, int] = dict.fromkeys(exts, 0)
+    for i in range(num_files):
+        ext = rng.choices(exts, weights=[weights[e] for e in exts])[0]
+        source = rng.choice(by_ext[ext])
+        directory = target / f"pkg_{i // files_per_dir:04d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(source, directory / f"{source.stem}_{i:06d}{source.suffix}")
+        counts[ext] += 1
+    return counts
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in KiB elsewhere
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def git_revision() -> str | None:
+    """Current commit of the repository, if available."""
+    git_executable = shutil.which("git")
+    if not git_executable:
+        return None
+    result = subprocess.run(
+        [git_executable, "-C", str(ROOT_DIR), "rev-parse", "--short", "HEAD"],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+class StageTimer:
+    """Accumulate wall-clock time and call counts per stage."""
+
+    def __init__(self: StageTimer) -> None:
+        """Initialize the timer."""
+        self.seconds: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+
+    @contextmanager
+    def measure(self: StageTimer, stage: str) -> Generator[None, None, None]:
+        """Time the enclosed block under ``stage``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + elapsed
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    def wrap(self: StageTimer, stage: str, func: Any) -> Any:  # noqa: ANN401
+        """Return ``func`` instrumented to be timed under ``stage``."""
+
+        def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+            with self.measure(stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def as_dict(self: StageTimer) -> dict[str, dict[str, float]]:
+        """Serialize the collected timings."""
+        return {
+            stage: {"seconds": round(seconds, 6), "calls": self.calls[stage]}
+            for stage, seconds in self.seconds.items()
+        }
+
+
+def write_report(report: dict[str, Any], output: str | None) -> None:
+    """Write the report as JSON to ``output`` or to stdout."""
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if output:
+        Path(output).write_text(text + "\n", encoding="utf-8")
+    else:
+        sys.__stdout__.write(text + "\n")
@@ -0,0 +1,146 @@
+"""
+End-to-end indexing throughput benchmark.
+
+Generates a synthetic repository from the ``codes/`` fixtures and runs it
+through ``scan_directory -> load -> split_documents -> process_document_batch``
+against the offline fake embedding provider, then prints a JSON report.
+
+Example:
+    python benchmarks/indexing.py --files 500 --languages rs=2,kt=1,lua=1 \
+        --embed-latency 0.05 --output bench_output.txt
+
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from common import (
+    StageTimer,
+    generate_repository,
+    git_revision,
+    peak_rss_mb,
+    prepare_environment,
+    write_report,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=200, help="Number of files")
+    parser.add_argument(
+        "--languages",
+        default=None,
+        help="Language mix as ext=weight pairs, e.g. 'rs=2,kt=1' (default: all fixtures)",
+    )
+    parser.add_argument(
+        "--repo",
+        type=Path,
+        default=None,
+        help="Index this directory instead of generating a synthetic repository",
+    )
+    parser.add_argument("--dimensions", type=int, default=256, help="Embedding size")
+    parser.add_argument(
+        "--embed-latency",
+        type=float,
+        default=0.0,
+        help="Artificial latency per embedding request in seconds",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Override MAX_WORKERS")
+    parser.add_argument("--batch-size", type=int, default=None, help="Override BATCH_SIZE")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    parser.add_argument("--log-level", default="WARNING", help="Service log level")
+    return parser.parse_args()
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Run the benchmark and return the report."""
+    work_dir = Path(tempfile.mkdtemp(prefix="rag-bench-index-"))
+    prepare_environment(
+        work_dir / "data",
+        embed_extra={"dimensions": args.dimensions, "latency": args.embed_latency},
+    )
+
+    if args.repo is None:
+        repo_dir = work_dir / "repo"
+        language_counts = generate_repository(
+            repo_dir, args.files, args.languages, seed=args.seed
+        )
+    else:
+        repo_dir = args.repo.resolve()
+        language_counts = None
+
+    import main  # noqa: PLC0415
+    from llama_index.core import SimpleDirectoryReader  # noqa: PLC0415
+
+    logging.getLogger().setLevel(args.log_level)
+
+    workers = args.workers or main.MAX_WORKERS
+    batch_size = args.batch_size or main.BATCH_SIZE
+
+    timer = StageTimer()
+    main.embed_documents = timer.wrap("embed", main.embed_documents)
+    main.upsert_nodes = timer.wrap("vector_upsert", main.upsert_nodes)
+    history = main.indexing_history_service
+    history.get_indexing_status = timer.wrap("sqlite_read", history.get_indexing_status)
+    history.update_indexing_status = timer.wrap(
+        "sqlite_write", history.update_indexing_status
+    )
+
+    start = time.perf_counter()
+    with timer.measure("scan"):
+        files = main.scan_directory(repo_dir)
+    with timer.measure("load"):
+        documents = SimpleDirectoryReader(
+            input_files=files,
+            filename_as_id=True,
+            required_exts=main.required_exts,
+        ).load_data()
+    with timer.measure("split"):
+        chunks = main.split_documents(documents)
+    batches = [chunks[i : i + batch_size] for i in range(0, len(chunks), batch_size)]
+    with timer.measure("index"), ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(main.process_document_batch, batches))
+    total_seconds = time.perf_counter() - start
+
+    return {
+        "revision": git_revision(),
+        "config": {
+            "files": len(files),
+            "languages": language_counts,
+            "dimensions": args.dimensions,
+            "embed_latency": args.embed_latency,
+            "workers": workers,
+            "batch_size": batch_size,
+            "seed": args.seed,
+        },
+        "results": {
+            "documents": len(documents),
+            "chunks": len(chunks),
+            "vectors": main.chroma_collection.count(),
+            "batches": len(batches),
+            "failed_batches": results.count(False),
+            "total_seconds": round(total_seconds, 6),
+            "files_per_second": round(len(files) / total_seconds, 3),
+            "chunks_per_second": round(len(chunks) / total_seconds, 3),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        },
+        "stages": timer.as_dict(),
+    }
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    # The service prints progress to stdout; keep it clear for the JSON report
+    with redirect_stdout(sys.stderr):
+        report = run(arguments)
+    write_report(report, arguments.output)
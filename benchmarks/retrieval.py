@@ -0,0 +1,237 @@
+"""
+Retrieval latency and recall benchmark.
+
+Indexes a fixed corpus into a temporary data dir, then drives
+``/api/v1/retrieve`` in-process through the ASGI app at a controlled
+concurrency and prints a JSON report with latency percentiles, throughput
+and recall@k against the labeled queries.
+
+Example:
+    python benchmarks/retrieval.py --requests 200 --concurrency 8 --top-k 5
+
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Any
+
+from common import (
+    FIXTURES_DIR,
+    git_revision,
+    peak_rss_mb,
+    prepare_environment,
+    write_report,
+)
+
+DEFAULT_QUERIES = Path(__file__).resolve().parent / "data" / "retrieval_queries.json"
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--queries", type=Path, default=DEFAULT_QUERIES, help="Labeled query set"
+    )
+    parser.add_argument(
+        "--fixtures", type=Path, default=FIXTURES_DIR, help="Directory of corpus files"
+    )
+    parser.add_argument("--requests", type=int, default=100, help="Total requests")
+    parser.add_argument("--concurrency", type=int, default=4, help="In-flight requests")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed warmup requests")
+    parser.add_argument("--top-k", type=int, default=5, help="top_k sent to retrieve")
+    parser.add_argument("--dimensions", type=int, default=256, help="Embedding size")
+    parser.add_argument(
+        "--embed-latency",
+        type=float,
+        default=0.0,
+        help="Artificial latency per embedding request in seconds",
+    )
+    parser.add_argument(
+        "--llm-latency",
+        type=float,
+        default=0.0,
+        help="Artificial LLM latency in seconds",
+    )
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    parser.add_argument("--log-level", default="WARNING", help="Service log level")
+    return parser.parse_args()
+
+
+def percentile(samples: list[float], pct: int) -> float:
+    """Return the ``pct``-th percentile of ``samples``."""
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+def is_hit(expected: dict[str, str], sources: list[dict[str, Any]]) -> bool:
+    """Check whether any source matches the labeled chunk."""
+    return any(
+        (source.get("uri") or "").endswith("/" + expected["file"])
+        and expected["contains"] in source.get("content", "")
+        for source in sources
+    )
+
+
+async def index_corpus(main: Any, corpus_dir: Path) -> str:  # noqa: ANN401
+    """Register the corpus directory as a resource and index it."""
+    from models.resource import Resource  # noqa: PLC0415
+
+    uri = main.path_to_uri(corpus_dir)
+    resource = Resource(
+        id=None,
+        name="retrieval-benchmark",
+        uri=uri,
+        type="local",
+        status="active",
+        indexing_status="pending",
+        indexing_status_message=None,
+        indexing_started_at=None,
+        last_indexed_at=None,
+        last_error=None,
+    )
+    main.resource_service.add_resource_to_db(resource)
+    await main.index_local_resource_async(resource)
+    return uri
+
+
+async def drive(  # noqa: PLR0913
+    app: Any,  # noqa: ANN401
+    base_uri: str,
+    queries: list[dict[str, Any]],
+    total: int,
+    concurrency: int,
+    warmup: int,
+    top_k: int,
+) -> dict[str, Any]:
+    """Send ``total`` retrieve requests with at most ``concurrency`` in flight."""
+    import httpx  # noqa: PLC0415
+
+    transport = httpx.ASGITransport(app=app)
+    latencies: list[float] = []
+    errors = 0
+    first_sources: dict[int, list[dict[str, Any]]] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://benchmark", timeout=None
+    ) as client:
+
+        async def send(i: int, *, timed: bool) -> None:
+            nonlocal errors
+            query_index = i % len(queries)
+            payload = {
+                "query": queries[query_index]["query"],
+                "base_uri": base_uri,
+                "top_k": top_k,
+            }
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/api/v1/retrieve", json=payload)
+                elapsed = time.perf_counter() - start
+            if response.status_code != httpx.codes.OK:
+                errors += timed
+                return
+            first_sources.setdefault(query_index, response.json()["sources"])
+            if timed:
+                latencies.append(elapsed)
+
+        await asyncio.gather(*(send(i, timed=False) for i in range(warmup)))
+        start = time.perf_counter()
+        await asyncio.gather(*(send(i, timed=True) for i in range(total)))
+        wall_seconds = time.perf_counter() - start
+
+    recalls = []
+    for query_index, query in enumerate(queries):
+        sources = first_sources.get(query_index, [])
+        hits = sum(is_hit(expected, sources) for expected in query["expected"])
+        recalls.append(hits / len(query["expected"]))
+
+    result: dict[str, Any] = {
+        "requests": total,
+        "errors": errors,
+        "wall_seconds": round(wall_seconds, 6),
+        "throughput_rps": round(len(latencies) / wall_seconds, 3),
+        f"recall_at_{top_k}": round(sum(recalls) / len(recalls), 4),
+    }
+    if latencies:
+        result["latency_ms"] = {
+            "mean": round(statistics.fmean(latencies) * 1000, 3),
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(max(latencies) * 1000, 3),
+        }
+    return result
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Run the benchmark and return the report."""
+    query_set = json.loads(args.queries.read_text(encoding="utf-8"))
+    work_dir = Path(tempfile.mkdtemp(prefix="rag-bench-retrieve-"))
+    prepare_environment(
+        work_dir / "data",
+        embed_extra={"dimensions": args.dimensions, "latency": args.embed_latency},
+        llm_extra={"latency": args.llm_latency},
+    )
+
+    corpus_dir = work_dir / "corpus"
+    corpus_dir.mkdir()
+    for name in query_set["corpus"]:
+        shutil.copyfile(args.fixtures / name, corpus_dir / name)
+
+    import main  # noqa: PLC0415
+
+    logging.getLogger().setLevel(args.log_level)
+
+    async def bench() -> dict[str, Any]:
+        start = time.perf_counter()
+        base_uri = await index_corpus(main, corpus_dir)
+        index_seconds = time.perf_counter() - start
+        result = await drive(
+            main.app,
+            base_uri,
+            query_set["queries"],
+            args.requests,
+            args.concurrency,
+            args.warmup,
+            args.top_k,
+        )
+        result["index_seconds"] = round(index_seconds, 6)
+        return result
+
+    results = asyncio.run(bench())
+    results["peak_rss_mb"] = round(peak_rss_mb(), 1)
+
+    return {
+        "revision": git_revision(),
+        "config": {
+            "queries": len(query_set["queries"]),
+            "corpus_files": len(query_set["corpus"]),
+            "concurrency": args.concurrency,
+            "top_k": args.top_k,
+            "dimensions": args.dimensions,
+            "embed_latency": args.embed_latency,
+            "llm_latency": args.llm_latency,
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    # The service prints progress to stdout; keep it clear for the JSON report
+    with redirect_stdout(sys.stderr):
+        report = run(arguments)
+    write_report(report, arguments.output)
@@ -1,12 +1,57 @@
+import os
+import threading
+from collections import OrderedDict
+
 import tree_sitter
 from tree_sitter_language_pack import get_language, get_parser
 
+from libs.logger import logger
+
 # 在LANGUAGE_NODE_MAP的顶部添加合并配置说明
 # 配置说明：
 # _merge_config: 指定哪些类别需要合并
 # - enabled: 是否启用合并
 # - max_gap_lines: 允许的最大行间隔（超过此间隔的代码块不会合并）
 # - preserve_order: 是否保持原始顺序
+# size_config: 可选，覆盖该语言的代码块大小限制（字符数）
+# - max_chunk_size: 超过此大小的代码块沿子节点递归拆分
+# - min_chunk_size: 小于此大小的相邻同类代码块会被打包合并
+
+# 默认代码块大小限制（字符数）
+CODE_MAX_CHUNK_SIZE = int(os.getenv("RAG_CODE_MAX_CHUNK_SIZE", "4000"))
+CODE_MIN_CHUNK_SIZE = int(os.getenv("RAG_CODE_MIN_CHUNK_SIZE", "200"))
+# 打包小代码块时允许的最大行间隔
+PACK_MAX_GAP_LINES = 1
+# 嵌套匹配（如类和其中的方法）的处理策略：
+# - parent: 只保留最外层的代码块（过大时再沿子节点拆分）
+# - children: 只保留不包含其他匹配的最内层代码块
+# - skeleton: 外层代码块只保留骨架（子代码块折叠为首行），子代码块完整保留
+# - all: 保留所有匹配，代码块之间可能重叠
+CONTAINMENT_POLICIES = ("parent", "children", "skeleton", "all")
+CODE_CONTAINMENT = os.getenv("RAG_CODE_CONTAINMENT", "parent")
+# 为增量解析缓存的语法树数量（按文件）
+PARSE_TREE_CACHE_SIZE = int(os.getenv("RAG_PARSE_TREE_CACHE_SIZE", "128"))
+# 不收录为符号的类别
+SYMBOL_SKIP_CATEGORIES = {"import", "include", "export", "use"}
+# 可以直接作为符号名称的节点类型
+SYMBOL_NAME_NODE_TYPES = {
+    "identifier",
+    "type_identifier",
+    "simple_identifier",
+    "field_identifier",
+    "property_identifier",
+    "scoped_identifier",
+    "constant",
+    "name",
+    "dot_index_expression",
+    "method_index_expression",
+}
+# 依次尝试的名称字段；definition/declaration 指向被包裹的定义
+SYMBOL_NAME_FIELDS = ("name", "definition", "declaration", "declarator", "left", "type")
+SYMBOL_NAME_MAX_DEPTH = 4
+SYMBOL_NAME_MAX_LENGTH = 200
+# 语言配置中不是查询类别的键
+CONFIG_KEYS = {"merge_config", "size_config"}
 
 LANGUAGE_NODE_MAP = {
     "python": {
@@ -1018,19 +1063,166 @@ LANGUAGE_NODE_MAP = {
 class CodeBlock:
     """代码块数据结构，包含内容和位置信息"""
 
-    def __init__(self, content: str, start_line: int, end_line: int, category: str):
+    def __init__(
+        self,
+        content: str,
+        start_line: int,
+        end_line: int,
+        category: str,
+        node: tree_sitter.Node | None = None,
+        start_byte: int | None = None,
+        partial: bool = False,
+    ):
         self.content = content
         self.start_line = start_line
         self.end_line = end_line
         self.category = category
+        # 对应的语法树节点，用于拆分过大的代码块
+        self.node = node
+        # 包含前置注释的起始字节位置
+        self.start_byte = (
+            start_byte if start_byte is not None or node is None else node.start_byte
+        )
+        # 包含关系中的直接子代码块
+        self.children: list[CodeBlock] = []
+        # 内容不是源码中连续的完整行（过长的行被截断，或骨架省略了子代码块），不能按行合并
+        self.partial = partial
+
+    @property
+    def end_byte(self) -> int | None:
+        return self.node.end_byte if self.node is not None else None
 
     def __repr__(self):
         return f"CodeBlock(category={self.category}, lines={self.start_line}-{self.end_line})"
 
 
+class CodeSymbol:
+    """代码中定义的符号：名称、类别和行范围"""
+
+    def __init__(self, name: str, kind: str, start_line: int, end_line: int):
+        self.name = name
+        self.kind = kind
+        self.start_line = start_line
+        self.end_line = end_line
+
+    def __repr__(self):
+        return f"CodeSymbol(name={self.name}, kind={self.kind}, lines={self.start_line}-{self.end_line})"
+
+
+def _find_symbol_name(node: tree_sitter.Node, depth: int = 0) -> str | None:
+    """查找定义节点的名称：优先使用名称字段，其次是名称类型的子节点"""
+    if node.type in SYMBOL_NAME_NODE_TYPES:
+        name = node.text.decode("utf8", errors="replace") if node.text else ""
+        if name and "\n" not in name and len(name) <= SYMBOL_NAME_MAX_LENGTH:
+            return name
+        return None
+    if depth >= SYMBOL_NAME_MAX_DEPTH:
+        return None
+    for field in SYMBOL_NAME_FIELDS:
+        child = node.child_by_field_name(field)
+        if child is not None:
+            return _find_symbol_name(child, depth + 1)
+    for child in node.named_children:
+        if child.type in SYMBOL_NAME_NODE_TYPES:
+            return _find_symbol_name(child, depth + 1)
+    return None
+
+
+class ParsedFile:
+    """缓存的解析结果：源码、语法树以及从中提取的代码块"""
+
+    def __init__(
+        self, language: str, code_bytes: bytes, tree: tree_sitter.Tree, code_blocks: list
+    ):
+        self.language = language
+        self.code_bytes = code_bytes
+        self.tree = tree
+        self.code_blocks = code_blocks
+
+
+class ParseTreeCache:
+    """按文件缓存最近的语法树（LRU），用于文件修改后的增量解析"""
+
+    def __init__(self, max_size: int = PARSE_TREE_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, ParsedFile] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def pop(self, key: str) -> ParsedFile | None:
+        """取出缓存项；语法树不是线程安全的，使用期间不保留在缓存中"""
+        with self._lock:
+            return self._entries.pop(key, None)
+
+    def put(self, key: str, parsed: ParsedFile) -> None:
+        """放入缓存项，超出容量时淘汰最久未使用的"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = parsed
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        """删除缓存项"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+parse_tree_cache = ParseTreeCache()
+
+# 编译好的查询（按线程缓存，Query 的字节区间是可变状态）
+_query_cache = threading.local()
+
+
+def _common_prefix_length(a: bytes, b: bytes) -> int:
+    """二分查找两个字节串的公共前缀长度（每次比较都是 memcmp）"""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def _common_suffix_length(a: bytes, b: bytes, limit: int) -> int:
+    """二分查找两个字节串不超过 limit 的公共后缀长度"""
+    low, high = 0, min(len(a), len(b), limit)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[len(a) - mid :] == b[len(b) - mid :]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def _byte_to_point(code_bytes: bytes, byte: int) -> tuple[int, int]:
+    """字节位置转换为 tree-sitter 的 (行, 列)"""
+    row = code_bytes.count(b"\n", 0, byte)
+    column = byte - (code_bytes.rfind(b"\n", 0, byte) + 1)
+    return row, column
+
+
 class CodeSplitter:
-    def __init__(self, language_map):
+    def __init__(
+        self,
+        language_map,
+        max_chunk_size: int = CODE_MAX_CHUNK_SIZE,
+        min_chunk_size: int = CODE_MIN_CHUNK_SIZE,
+        containment: str = CODE_CONTAINMENT,
+    ):
+        if containment not in CONTAINMENT_POLICIES:
+            raise ValueError(
+                f"Invalid containment policy '{containment}', "
+                f"expected one of {CONTAINMENT_POLICIES}"
+            )
         self.language_map = language_map
+        self.max_chunk_size = max_chunk_size
+        self.min_chunk_size = min_chunk_size
+        self.containment = containment
 
     def _get_target_node_types(self, language: str) -> dict:
         """获取指定语言的所有目标节点类型"""
@@ -1042,7 +1234,7 @@ class CodeSplitter:
         # 方便后续处理查询结果
         target_types = {}
         for category, node_types in lang_map.items():
-            if category.startswith("_"):  # 跳过配置项
+            if category.startswith("_") or category in CONFIG_KEYS:  # 跳过配置项
                 continue
             for node_type in node_types:
                 target_types[node_type] = category
@@ -1053,6 +1245,13 @@ class CodeSplitter:
         lang_map = self.language_map.get(language, {})
         return lang_map.get("merge_config", {})
 
+    def _get_size_limits(self, language: str) -> tuple[int, int]:
+        """获取指定语言的代码块大小限制 (max_chunk_size, min_chunk_size)"""
+        size_config = self.language_map.get(language, {}).get("size_config", {})
+        max_chunk_size = size_config.get("max_chunk_size", self.max_chunk_size)
+        min_chunk_size = size_config.get("min_chunk_size", self.min_chunk_size)
+        return max_chunk_size, min(min_chunk_size, max_chunk_size)
+
     def _build_query(self, language: str, target_node_types: dict) -> tree_sitter.Query:
         """根据目标节点类型动态构建查询"""
         query_str = ""
@@ -1065,7 +1264,7 @@ class CodeSplitter:
                 # 如果是简单节点类型，用标准格式包装
                 query_str += f"({node_type}) @{category}\n"
 
-        print(f"Final query: {query_str}")
+        logger.debug("Final query: %s", query_str)
 
         # 忽略类型检查错误
         lang_object = get_language(language)  # type: ignore
@@ -1074,17 +1273,163 @@ class CodeSplitter:
     def _extract_code_blocks(self, code: str, language: str) -> list:
         """提取所有代码块，包含位置信息"""
         code_bytes = bytes(code, "utf8")
-        code_lines = code.split("\n")
 
         # 忽略类型检查错误
         parser = get_parser(language)  # type: ignore
         tree = parser.parse(code_bytes)
+        return self._query_code_blocks(tree, language)
+
+    def _extract_code_blocks_incremental(
+        self, code_bytes: bytes, language: str, cached: ParsedFile
+    ) -> tuple[tree_sitter.Tree, list]:
+        """
+        基于缓存的语法树增量解析修改后的文件
 
+        新旧源码的公共前缀和后缀确定编辑区间，通过 tree.edit 和增量 parse 得到新语法树。
+        只在编辑区间与 changed_ranges 覆盖的顶层节点中重新查询（区间会扩展到不与任何
+        代码块及其前置注释交叉）；其余代码块沿用缓存，只平移位置。
+        """
+        old_bytes = cached.code_bytes
+        prefix = _common_prefix_length(old_bytes, code_bytes)
+        suffix = _common_suffix_length(
+            old_bytes, code_bytes, min(len(old_bytes), len(code_bytes)) - prefix
+        )
+        old_end = len(old_bytes) - suffix
+        new_end = len(code_bytes) - suffix
+        byte_delta = new_end - old_end
+        line_delta = code_bytes.count(b"\n", prefix, new_end) - old_bytes.count(
+            b"\n", prefix, old_end
+        )
+
+        # 编辑前记录缓存代码块在旧源码中的位置
+        old_ranges = [
+            (block, block.start_byte, block.node.start_byte, block.end_byte, block.node.type)
+            for block in cached.code_blocks
+        ]
+
+        old_tree = cached.tree
+        old_tree.edit(
+            start_byte=prefix,
+            old_end_byte=old_end,
+            new_end_byte=new_end,
+            start_point=_byte_to_point(old_bytes, prefix),
+            old_end_point=_byte_to_point(old_bytes, old_end),
+            new_end_point=_byte_to_point(code_bytes, new_end),
+        )
+        parser = get_parser(language)  # type: ignore
+        tree = parser.parse(code_bytes, old_tree)
+
+        # 需要重新查询的区间
+        region_start, region_end = prefix, new_end
+        for changed in old_tree.changed_ranges(tree):
+            region_start = min(region_start, changed.start_byte)
+            region_end = max(region_end, changed.end_byte)
+
+        # 扩展区间，直到没有代码块（包括前置注释）跨越区间边界
+        top_level = tree.root_node.children
+        while True:
+            for child in top_level:
+                if child.end_byte >= region_start and child.start_byte <= region_end:
+                    region_start = min(region_start, child.start_byte)
+                    region_end = max(region_end, child.end_byte)
+            old_region_end = region_end - byte_delta
+            expanded = False
+            for _, start_byte, _, end_byte, _ in old_ranges:
+                if start_byte < region_start < end_byte:
+                    region_start = start_byte
+                    expanded = True
+                if start_byte < old_region_end < end_byte:
+                    region_end = end_byte + byte_delta
+                    expanded = True
+            if expanded:
+                continue
+
+            region_blocks = self._query_code_blocks(
+                tree, language, (region_start, region_end)
+            )
+            for block in region_blocks:
+                if block.start_byte < region_start < block.end_byte:
+                    region_start = block.start_byte
+                    expanded = True
+                if block.start_byte < region_end < block.end_byte:
+                    region_end = block.end_byte
+                    expanded = True
+            if not expanded:
+                break
+
+        code_blocks = [
+            block
+            for block in region_blocks
+            if block.start_byte >= region_start and block.end_byte <= region_end
+        ]
+        for block, start_byte, node_start_byte, end_byte, node_type in old_ranges:
+            if end_byte <= region_start:
+                shift, lines = 0, 0
+            elif start_byte >= old_region_end:
+                shift, lines = byte_delta, line_delta
+            else:
+                continue
+            node_start = node_start_byte + shift
+            node_end = end_byte + shift
+            node = tree.root_node.descendant_for_byte_range(node_start, node_end)
+            while node is not None and node.type != node_type:
+                node = node.parent
+            if node is None or (node.start_byte, node.end_byte) != (node_start, node_end):
+                # 找不到对应的节点，退回完整查询
+                return tree, self._query_code_blocks(tree, language)
+            code_blocks.append(
+                CodeBlock(
+                    content=block.content,
+                    start_line=block.start_line + lines,
+                    end_line=block.end_line + lines,
+                    category=block.category,
+                    node=node,
+                    start_byte=start_byte + shift,
+                )
+            )
+        return tree, code_blocks
+
+    def _extract_code_blocks_cached(
+        self, code: str, language: str, cache_key: str
+    ) -> list:
+        """提取代码块，优先基于缓存的语法树增量解析"""
+        code_bytes = bytes(code, "utf8")
+        cached = parse_tree_cache.pop(cache_key)
+        if cached is not None and cached.language == language:
+            if cached.code_bytes == code_bytes:
+                tree, code_blocks = cached.tree, cached.code_blocks
+            else:
+                tree, code_blocks = self._extract_code_blocks_incremental(
+                    code_bytes, language, cached
+                )
+        else:
+            parser = get_parser(language)  # type: ignore
+            tree = parser.parse(code_bytes)
+            code_blocks = self._query_code_blocks(tree, language)
+        parse_tree_cache.put(
+            cache_key, ParsedFile(language, code_bytes, tree, list(code_blocks))
+        )
+        return code_blocks
+
+    def _query_code_blocks(
+        self,
+        tree: tree_sitter.Tree,
+        language: str,
+        byte_range: tuple[int, int] | None = None,
+    ) -> list:
+        """在语法树（或其中的字节区间）上执行查询，提取代码块"""
         target_node_types = self._get_target_node_types(language)
         if not target_node_types:
             return []
 
-        query = self._build_query(language, target_node_types)
+        queries = getattr(_query_cache, "queries", None)
+        if queries is None:
+            queries = _query_cache.queries = {}
+        query_key = (language, tuple(target_node_types))
+        query = queries.get(query_key)
+        if query is None:
+            query = queries[query_key] = self._build_query(language, target_node_types)
+        query.set_byte_range(byte_range or (0, tree.root_node.end_byte))
         matches = query.matches(tree.root_node)
 
         code_blocks = []
@@ -1115,6 +1460,8 @@ class CodeSplitter:
                             )  # tree-sitter是0-based
                             end_line = target_node.end_point[0] + 1
 
+                            start_byte = target_node.start_byte
+
                             # 如果有注释，调整起始行号
                             if comments:
                                 comments.sort(key=lambda x: x.start_byte)
@@ -1122,6 +1469,7 @@ class CodeSplitter:
                                 start_line = min(
                                     start_line, first_comment.start_point[0] + 1
                                 )
+                                start_byte = min(start_byte, first_comment.start_byte)
 
                                 # 构建完整的代码块内容
                                 comment_text = "\n".join(
@@ -1142,15 +1490,269 @@ class CodeSplitter:
                                     start_line=start_line,
                                     end_line=end_line,
                                     category=target_type,
+                                    node=target_node,
+                                    start_byte=start_byte,
                                 )
                             )
 
         return code_blocks
 
+    def _build_containment_tree(self, code_blocks: list) -> list:
+        """
+        根据字节区间建立代码块的包含关系，返回最外层的代码块
+
+        区间完全相同的重复匹配只保留第一个；与已有代码块部分重叠的匹配被丢弃。
+        只包裹一个定义的代码块（如 decorated_definition 包裹 function_definition）
+        与被包裹的定义视为同一个代码块。
+        """
+        blocks = sorted(code_blocks, key=lambda b: (b.start_byte, -b.end_byte))
+        roots = []
+        stack = []
+        previous_range = None
+        for block in blocks:
+            block.children = []
+            block_range = (block.start_byte, block.end_byte)
+            if block_range == previous_range:
+                continue
+            while stack and stack[-1].end_byte <= block.start_byte:
+                stack.pop()
+            if stack:
+                if block.end_byte > stack[-1].end_byte:
+                    # 部分重叠，丢弃
+                    continue
+                stack[-1].children.append(block)
+            else:
+                roots.append(block)
+            stack.append(block)
+            previous_range = block_range
+
+        def collapse_wrappers(block: CodeBlock) -> None:
+            while (
+                len(block.children) == 1
+                and block.children[0].end_byte == block.end_byte
+            ):
+                block.children = block.children[0].children
+            for child in block.children:
+                collapse_wrappers(child)
+
+        for root in roots:
+            collapse_wrappers(root)
+        return roots
+
+    def _make_skeleton(self, block: CodeBlock, code_bytes: bytes) -> CodeBlock:
+        """
+        生成代码块的骨架：每个直接子代码块折叠为其首行
+
+        子代码块的其余行被省略，不加占位符，骨架中的每一行都与源码中的行一致。
+        """
+        lines = code_bytes[block.start_byte : block.end_byte].split(b"\n")
+        elided = set()
+        for child in block.children:
+            first = code_bytes.count(b"\n", block.start_byte, child.node.start_byte)
+            last = code_bytes.count(b"\n", block.start_byte, child.end_byte)
+            elided.update(range(first + 1, last + 1))
+        content = b"\n".join(
+            line for number, line in enumerate(lines) if number not in elided
+        )
+        return CodeBlock(
+            content=content.decode("utf8", errors="replace"),
+            start_line=block.start_line,
+            end_line=block.end_line,
+            category=block.category,
+            partial=True,
+        )
+
+    def _resolve_containment(self, code_blocks: list, code_bytes: bytes) -> list:
+        """按 containment 策略处理嵌套的代码块，使输出的字节区间互不重叠"""
+        if self.containment == "all":
+            return code_blocks
+        roots = self._build_containment_tree(
+            [b for b in code_blocks if b.node is not None]
+        )
+
+        resolved = []
+
+        def visit(block: CodeBlock) -> None:
+            if not block.children:
+                resolved.append(block)
+                return
+            if self.containment == "skeleton":
+                resolved.append(self._make_skeleton(block, code_bytes))
+            for child in block.children:
+                visit(child)
+
+        for root in roots:
+            if self.containment == "parent":
+                resolved.append(root)
+            else:
+                visit(root)
+        return resolved
+
+    @staticmethod
+    def _char_length(code_bytes: bytes, start_byte: int, end_byte: int) -> int:
+        """字节区间的字符数，代码块大小都按字符计算"""
+        return len(code_bytes[start_byte:end_byte].decode("utf8", errors="replace"))
+
+    def _split_lines(
+        self, code_bytes: bytes, start_byte: int, end_byte: int, max_chunk_size: int
+    ) -> list[tuple[int, int]]:
+        """按行拆分没有子节点的过大区间，单行过长时在字符边界处强制截断"""
+        ranges = []
+        group_start = start_byte
+        group_size = 0  # 当前组的字符数
+        pos = start_byte
+        while pos < end_byte:
+            line_end = code_bytes.find(b"\n", pos, end_byte)
+            line_end = end_byte if line_end == -1 else line_end + 1
+            line = code_bytes[pos:line_end].decode("utf8", errors="replace")
+            if group_size + len(line) > max_chunk_size and pos > group_start:
+                ranges.append((group_start, pos))
+                group_start = pos
+                group_size = 0
+            # 此时组从本行开始，按字符截断以免切开多字节字符
+            while len(line) > max_chunk_size:
+                cut = group_start + len(line[:max_chunk_size].encode("utf8"))
+                ranges.append((group_start, cut))
+                group_start = cut
+                line = line[max_chunk_size:]
+            group_size += len(line)
+            pos = line_end
+        if end_byte > group_start:
+            ranges.append((group_start, end_byte))
+        return ranges
+
+    def _split_node(
+        self,
+        node: tree_sitter.Node,
+        code_bytes: bytes,
+        start_byte: int,
+        max_chunk_size: int,
+    ) -> list[tuple[int, int]]:
+        """
+        沿子节点（方法、成员等）递归拆分过大的节点
+
+        相邻的子节点被打包到不超过 max_chunk_size 的区间中，仍然过大的子节点继续递归拆分。
+        返回的字节区间首尾相接，覆盖 [start_byte, node.end_byte)，因此不会丢失或重复代码。
+        """
+        end_byte = node.end_byte
+        if self._char_length(code_bytes, start_byte, end_byte) <= max_chunk_size:
+            return [(start_byte, end_byte)]
+        if not node.children:
+            return self._split_lines(code_bytes, start_byte, end_byte, max_chunk_size)
+
+        ranges = []
+        group_start = group_end = start_byte
+        for child in node.children:
+            if self._char_length(code_bytes, group_start, child.end_byte) <= max_chunk_size:
+                group_end = child.end_byte
+                continue
+            # 当前组已满，先输出
+            if group_end > group_start:
+                ranges.append((group_start, group_end))
+                group_start = group_end
+            if self._char_length(code_bytes, group_start, child.end_byte) <= max_chunk_size:
+                group_end = child.end_byte
+            else:
+                # 子节点本身过大，递归拆分
+                ranges.extend(
+                    self._split_node(child, code_bytes, group_start, max_chunk_size)
+                )
+                group_start = group_end = child.end_byte
+        if end_byte > group_start:
+            ranges.append((group_start, end_byte))
+        return ranges
+
+    def _split_oversized_blocks(
+        self, code_blocks: list, code_bytes: bytes, max_chunk_size: int
+    ) -> list:
+        """将超过 max_chunk_size 的代码块拆分为多个代码块"""
+        result = []
+        for block in code_blocks:
+            if len(block.content) <= max_chunk_size:
+                result.append(block)
+                continue
+            if block.node is None:
+                # 没有语法树节点（如骨架），按行拆分；骨架的行不连续，拆出的部分不能按行合并
+                content_bytes = block.content.encode("utf8")
+                for start, end in self._split_lines(
+                    content_bytes, 0, len(content_bytes), max_chunk_size
+                ):
+                    text = content_bytes[start:end].decode("utf8", errors="replace")
+                    if text.strip():
+                        result.append(
+                            CodeBlock(
+                                content=text.strip("\n"),
+                                start_line=block.start_line,
+                                end_line=block.end_line,
+                                category=block.category,
+                                partial=True,
+                            )
+                        )
+                continue
+
+            # 代码块内容是 注释 + 节点文本，注释放到第一个子块前面
+            node_text = block.node.text.decode("utf8")
+            comment_prefix = block.content[: len(block.content) - len(node_text)]
+            ranges = self._split_node(
+                block.node, code_bytes, block.node.start_byte, max_chunk_size
+            )
+            for start, end in ranges:
+                text = code_bytes[start:end].decode("utf8", errors="replace")
+                if not text.strip():
+                    continue
+                # 行号按去掉首尾空白后的内容计算，从节点起始行开始计数
+                content_start = start + len(text.encode("utf8")) - len(
+                    text.lstrip().encode("utf8")
+                )
+                content_end = start + len(text.rstrip().encode("utf8"))
+                node_line = block.node.start_point[0] + 1
+                node_start = block.node.start_byte
+                start_line = node_line + code_bytes.count(b"\n", node_start, content_start)
+                end_line = node_line + code_bytes.count(b"\n", node_start, content_end)
+                text = text.strip("\n")
+                if comment_prefix and start == block.node.start_byte:
+                    text = comment_prefix + text
+                    start_line = block.start_line
+                result.append(
+                    CodeBlock(
+                        content=text,
+                        start_line=start_line,
+                        end_line=end_line,
+                        category=block.category,
+                        partial=not self._is_whole_lines(code_bytes, start, end),
+                    )
+                )
+        return result
+
+    @staticmethod
+    def _is_whole_lines(code_bytes: bytes, start_byte: int, end_byte: int) -> bool:
+        """字节区间是否由完整的行组成（忽略区间和行首尾的空白）"""
+        text = code_bytes[start_byte:end_byte]
+        start_byte += len(text) - len(text.lstrip())
+        end_byte -= len(text) - len(text.rstrip())
+        line_start = code_bytes.rfind(b"\n", 0, start_byte) + 1
+        line_end = code_bytes.find(b"\n", end_byte)
+        if line_end == -1:
+            line_end = len(code_bytes)
+        return (
+            not code_bytes[line_start:start_byte].strip()
+            and not code_bytes[end_byte:line_end].strip()
+        )
+
     def _merge_code_blocks(
-        self, code_blocks: list, code_lines: list, merge_config: dict
+        self,
+        code_blocks: list,
+        code_lines: list,
+        merge_config: dict,
+        max_chunk_size: int = CODE_MAX_CHUNK_SIZE,
+        min_chunk_size: int = CODE_MIN_CHUNK_SIZE,
     ) -> list:
-        """根据配置合并代码块"""
+        """
+        根据配置合并代码块
+
+        启用了 merge_config 的类别按 max_gap_lines 合并；其他类别中小于 min_chunk_size
+        的相邻代码块也会被打包。合并后的代码块不超过 max_chunk_size，重叠的代码块不合并。
+        """
         if not code_blocks:
             return code_blocks
 
@@ -1169,39 +1771,50 @@ class CodeSplitter:
         # 对每个类别进行合并处理
         for category, blocks in blocks_by_category.items():
             category_config = merge_config.get(category, {})
-
-            if not category_config.get("enabled", False):
-                # 不需要合并，直接添加
-                merged_blocks.extend(blocks)
-                continue
-
-            max_gap_lines = category_config.get("max_gap_lines", 1)
+            enabled = category_config.get("enabled", False)
+            if enabled:
+                max_gap_lines = category_config.get("max_gap_lines", 1)
+            else:
+                max_gap_lines = PACK_MAX_GAP_LINES
 
             # 合并相邻的代码块
             current_group = [blocks[0]]
+            group_size = len(blocks[0].content)
 
             for i in range(1, len(blocks)):
                 prev_block = current_group[-1]
                 curr_block = blocks[i]
 
-                if max_gap_lines >= 0:
-                    # 检查是否应该合并
-                    gap = curr_block.start_line - prev_block.end_line - 1
-
-                    if gap <= max_gap_lines:
-                        # 合并到当前组
-                        current_group.append(curr_block)
-                    else:
-                        # 完成当前组的合并，开始新组
-                        if len(current_group) > 1:
-                            merged_block = self._merge_group(current_group, code_lines)
-                            merged_blocks.append(merged_block)
-                        else:
-                            merged_blocks.extend(current_group)
-
-                        current_group = [curr_block]
+                gap = curr_block.start_line - prev_block.end_line - 1
+                if prev_block.end_byte is not None and curr_block.start_byte is not None:
+                    overlapping = curr_block.start_byte < prev_block.end_byte
                 else:
+                    overlapping = gap < 0
+                should_merge = (
+                    not overlapping
+                    and not (prev_block.partial or curr_block.partial)
+                    and (max_gap_lines < 0 or gap <= max_gap_lines)
+                    and group_size + len(curr_block.content) <= max_chunk_size
+                    and (
+                        enabled
+                        or min(group_size, len(curr_block.content)) < min_chunk_size
+                    )
+                )
+
+                if should_merge:
+                    # 合并到当前组
                     current_group.append(curr_block)
+                    group_size += len(curr_block.content) + 1
+                else:
+                    # 完成当前组的合并，开始新组
+                    if len(current_group) > 1:
+                        merged_block = self._merge_group(current_group, code_lines)
+                        merged_blocks.append(merged_block)
+                    else:
+                        merged_blocks.extend(current_group)
+
+                    current_group = [curr_block]
+                    group_size = len(curr_block.content)
 
             # 处理最后一组
             if len(current_group) > 1:
@@ -1220,12 +1833,20 @@ class CodeSplitter:
         first_block = group[0]
         last_block = group[-1]
 
-        # 提取完整的代码段（包括中间的空行）
+        # 提取完整的代码段（包括中间较小的间隔）
         start_line = first_block.start_line
         end_line = last_block.end_line
 
-        # 获取完整的代码内容
-        full_content = "\n".join(code_lines[start_line - 1 : end_line])
+        # 获取代码内容；较大间隔中的其他代码不包含在内，同一行也不会重复
+        lines = []
+        last_line = start_line - 1
+        for block in group:
+            block_start = max(block.start_line, last_line + 1)
+            if block_start - last_line - 1 <= PACK_MAX_GAP_LINES:
+                block_start = last_line + 1
+            lines.extend(code_lines[block_start - 1 : block.end_line])
+            last_line = max(last_line, block.end_line)
+        full_content = "\n".join(lines)
 
         return CodeBlock(
             content=full_content,
@@ -1234,64 +1855,104 @@ class CodeSplitter:
             category=first_block.category,
         )
 
-    def split_text(self, code: str, language: str) -> dict:
+    def extract_symbols(self, code_blocks: list) -> list:
         """
-        对源代码进行分割，提取出定义的代码块
+        从代码块中提取符号定义
+
+        包裹定义的节点（如 decorated_definition）与被包裹的定义名称相同、结束位置相同，
+        只保留范围最小的一个。
+        """
+        symbols = {}
+        blocks = [
+            b
+            for b in code_blocks
+            if b.node is not None and b.category not in SYMBOL_SKIP_CATEGORIES
+        ]
+        blocks.sort(key=lambda b: b.node.end_byte - b.node.start_byte)
+        for block in blocks:
+            name = _find_symbol_name(block.node)
+            if name is None:
+                continue
+            key = (name, block.node.end_byte)
+            if key not in symbols:
+                symbols[key] = CodeSymbol(
+                    name=name,
+                    kind=block.category,
+                    start_line=block.node.start_point[0] + 1,
+                    end_line=block.node.end_point[0] + 1,
+                )
+        return sorted(symbols.values(), key=lambda symbol: symbol.start_line)
+
+    def split_blocks(
+        self, code: str, language: str, cache_key: str | None = None
+    ) -> tuple[list, list]:
+        """
+        对源代码进行分割，返回按行号排序的代码块和其中定义的符号
 
         :param code: 源代码字符串
         :param language: 语言名称（如 'python', 'javascript'）
-        :return: 一个字典，键是通用类别，值是提取到的代码块列表
+        :param cache_key: 可选的文件标识；提供时缓存语法树，下次分割同一文件时增量解析
+        :return: (代码块列表, 符号列表)
         """
         # 提取所有代码块（包含位置信息）
-        code_blocks = self._extract_code_blocks(code, language)
+        if cache_key is None:
+            original_blocks = self._extract_code_blocks(code, language)
+        else:
+            original_blocks = self._extract_code_blocks_cached(code, language, cache_key)
 
-        # 获取合并配置
+        # 获取合并配置和大小限制
         merge_config = self._get_merge_config(language)
+        max_chunk_size, min_chunk_size = self._get_size_limits(language)
 
-        # 如果有合并配置，执行合并
-        if merge_config:
-            code_lines = code.split("\n")
-            code_blocks = self._merge_code_blocks(code_blocks, code_lines, merge_config)
-
-            # 打印合并统计信息
-            original_count = len(self._extract_code_blocks(code, language))
-            merged_count = len(code_blocks)
-            if original_count != merged_count:
-                print(f"📊 合并统计: {original_count} → {merged_count} 个代码块")
-
-                # 显示合并详情
-                merge_details = {}
-                for category, config in merge_config.items():
-                    if config.get("enabled", False):
-                        orig_blocks = [
-                            b
-                            for b in self._extract_code_blocks(code, language)
-                            if b.category == category
-                        ]
-                        merged_blocks = [
-                            b for b in code_blocks if b.category == category
-                        ]
-                        if len(orig_blocks) != len(merged_blocks):
-                            merge_details[category] = (
-                                f"{len(orig_blocks)} → {len(merged_blocks)}"
-                            )
+        # 处理嵌套匹配，拆分过大的代码块，再合并相邻的代码块
+        code_bytes = bytes(code, "utf8")
+        code_blocks = self._resolve_containment(original_blocks, code_bytes)
+        code_blocks = self._split_oversized_blocks(
+            code_blocks, code_bytes, max_chunk_size
+        )
+        code_lines = code.split("\n")
+        code_blocks = self._merge_code_blocks(
+            code_blocks, code_lines, merge_config, max_chunk_size, min_chunk_size
+        )
 
-                if merge_details:
-                    for category, detail in merge_details.items():
-                        print(f"  📦 {category}: {detail}")
+        # 打印合并统计信息
+        original_count = len(original_blocks)
+        merged_count = len(code_blocks)
+        if original_count != merged_count:
+            logger.debug("📊 合并统计: %d → %d 个代码块", original_count, merged_count)
 
-        # 转换为原来的字典格式
-        results = {}
-        target_node_types = self._get_target_node_types(language)
+            # 显示合并详情
+            merge_details = {}
+            for category in {block.category for block in original_blocks}:
+                orig_blocks = [b for b in original_blocks if b.category == category]
+                merged_blocks = [b for b in code_blocks if b.category == category]
+                if len(orig_blocks) != len(merged_blocks):
+                    merge_details[category] = (
+                        f"{len(orig_blocks)} → {len(merged_blocks)}"
+                    )
 
-        # 初始化结果字典
-        for category in set(block.category for block in code_blocks):
-            results[category] = []
+            if merge_details:
+                for category, detail in merge_details.items():
+                    logger.debug("  📦 %s: %s", category, detail)
 
-        # 添加代码块内容
-        for block in code_blocks:
-            results[block.category].append(block.content)
+        logger.debug("Total matches: %d", len(code_blocks))
+
+        code_blocks.sort(key=lambda block: block.start_line)
+        return code_blocks, self.extract_symbols(original_blocks)
+
+    def split_text(self, code: str, language: str, cache_key: str | None = None) -> dict:
+        """
+        对源代码进行分割，提取出定义的代码块
 
-        print(f"Total matches: {len(code_blocks)}")
+        :param code: 源代码字符串
+        :param language: 语言名称（如 'python', 'javascript'）
+        :param cache_key: 可选的文件标识；提供时缓存语法树，下次分割同一文件时增量解析
+        :return: 一个字典，键是通用类别，值是提取到的代码块列表
+        """
+        code_blocks, _ = self.split_blocks(code, language, cache_key)
 
+        # 转换为原来的字典格式
+        results = {}
+        for block in code_blocks:
+            results.setdefault(block.category, []).append(block.content)
         return results
@@ -6,6 +6,8 @@ BASE_DATA_DIR = Path(os.environ.get("DATA_DIR", "data"))
 CHROMA_PERSIST_DIR = BASE_DATA_DIR / "chroma_db"
 LOG_DIR = BASE_DATA_DIR / "logs"
 DB_FILE = BASE_DATA_DIR / "sqlite" / "indexing_history.db"
+QUERY_EMBEDDING_CACHE_FILE = BASE_DATA_DIR / "sqlite" / "query_embeddings.db"
+VECTOR_SNAPSHOT_DIR = BASE_DATA_DIR / "vectors"
 
 # Configure directories
 BASE_DATA_DIR.mkdir(parents=True, exist_ok=True)
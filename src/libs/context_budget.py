@@ -0,0 +1,113 @@
+"""Selection of retrieved chunks for the LLM prompt under a token budget."""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+from llama_index.core.schema import MetadataMode, NodeWithScore
+
+from libs.utils import get_node_uri
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+# Tokens of retrieved context sent to the LLM
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "8000"))
+# Tokens kept free for the prompt template and the query
+CONTEXT_PROMPT_RESERVE_TOKENS = 1024
+# A chunk is only truncated to fit if at least this many of its tokens remain
+CONTEXT_MIN_TRUNCATED_TOKENS = 200
+# Share of the lines of the smaller of two chunks of one file that makes them overlap
+CONTEXT_OVERLAP_THRESHOLD = 0.8
+
+
+def _content_lines(text: str) -> set[str]:
+    return {line.strip() for line in text.splitlines() if line.strip()}
+
+
+def chunks_overlap(a: str, b: str, threshold: float = CONTEXT_OVERLAP_THRESHOLD) -> bool:
+    """Whether one chunk contains the other or most of its lines."""
+    if a in b or b in a:
+        return True
+    lines_a = _content_lines(a)
+    lines_b = _content_lines(b)
+    if not lines_a or not lines_b:
+        return False
+    shared = len(lines_a & lines_b)
+    return shared >= threshold * min(len(lines_a), len(lines_b))
+
+
+def _longest_prefix(
+    pieces: list[str], max_tokens: int, count_tokens: Callable[[str], int]
+) -> str:
+    low, high = 0, len(pieces)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens("".join(pieces[:middle])) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return "".join(pieces[:low])
+
+
+def truncate_to_tokens(
+    text: str, max_tokens: int, count_tokens: Callable[[str], int]
+) -> str:
+    """Return the longest prefix of whole lines of ``text`` within ``max_tokens``, or of characters if no line fits."""
+    lines = text.splitlines(keepends=True)
+    prefix = _longest_prefix(lines, max_tokens, count_tokens)
+    if not prefix and lines:
+        prefix = _longest_prefix(list(lines[0]), max_tokens, count_tokens)
+    return prefix.rstrip()
+
+
+def select_context(
+    nodes: list[NodeWithScore],
+    max_nodes: int | None,
+    token_budget: int,
+    count_tokens: Callable[[str], int],
+) -> list[NodeWithScore]:
+    """
+    Select the chunks the LLM sees, best first.
+
+    Chunks that overlap a better chunk of the same file are dropped, then at
+    most ``max_nodes`` chunks are taken while their prompt text, metadata
+    included, fits into ``token_budget`` tokens. The first chunk that does
+    not fit is truncated to whole lines if enough of it remains; the rest
+    are dropped. The best chunk is always kept, truncated if needed; if none
+    of its text fits, e.g. with a budget of 0, it is truncated to
+    ``CONTEXT_MIN_TRUNCATED_TOKENS`` tokens over the budget.
+    """
+    selected: list[NodeWithScore] = []
+    remaining = token_budget
+    for node in nodes:
+        if max_nodes is not None and len(selected) >= max_nodes:
+            break
+        text = node.node.get_content()
+        uri = get_node_uri(node.node)
+        if any(
+            get_node_uri(other.node) == uri
+            and chunks_overlap(text, other.node.get_content())
+            for other in selected
+        ):
+            continue
+
+        tokens = count_tokens(node.node.get_content(metadata_mode=MetadataMode.LLM))
+        if tokens <= remaining:
+            selected.append(node)
+            remaining -= tokens
+            continue
+
+        # Metadata is sent along with the text and cannot be truncated
+        text_budget = remaining - (tokens - count_tokens(text))
+        if not selected and text_budget <= 0:
+            # Answering from a part of the best chunk beats answering from none
+            text_budget = CONTEXT_MIN_TRUNCATED_TOKENS
+        if text_budget >= CONTEXT_MIN_TRUNCATED_TOKENS or not selected:
+            truncated = node.node.model_copy()
+            truncated.set_content(truncate_to_tokens(text, text_budget, count_tokens))
+            if truncated.get_content():
+                selected.append(NodeWithScore(node=truncated, score=node.score))
+        break
+    return selected
@@ -0,0 +1,205 @@
+"""Breadth-first crawler for remote documentation sites."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import xml.etree.ElementTree as ET
+from typing import TYPE_CHECKING
+from urllib.parse import urldefrag, urljoin, urlparse, urlunparse
+
+import httpx
+
+from libs.http_client import http_client
+from libs.logger import logger
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Awaitable, Callable
+
+CRAWL_MAX_DEPTH = int(os.getenv("RAG_CRAWL_MAX_DEPTH", "2"))
+CRAWL_MAX_PAGES = int(os.getenv("RAG_CRAWL_MAX_PAGES", "500"))
+CRAWL_USE_SITEMAP = os.getenv("RAG_CRAWL_USE_SITEMAP", "true").lower() in (
+    "true",
+    "1",
+    "yes",
+    "on",
+)
+
+MARKDOWN_LINK_PATTERN = re.compile(r"\[(.*?)\]\((.*?)\)")
+SITEMAP_NAMESPACE = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL for deduplication.
+
+    Lowercases the scheme and host, drops default ports and fragments, and
+    uses "/" for an empty path.
+    """
+    url, _ = urldefrag(url.strip())
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    if parsed.port and parsed.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parsed.port}"
+    return urlunparse((scheme, host, parsed.path or "/", "", parsed.query, ""))
+
+
+def default_url_prefix(root_url: str) -> str:
+    """Scope a crawl to the pages below the root URL."""
+    normalized = normalize_url(root_url)
+    return normalized if normalized.endswith("/") else f"{normalized}/"
+
+
+def is_url_in_scope(url: str, root_url: str) -> bool:
+    """
+    Check if a normalized URL is the root URL or lies below it.
+
+    This is the scope of a default crawl, so that retrieval under a remote
+    resource URI returns exactly the pages crawled for it.
+    """
+    return url == normalize_url(root_url) or url.startswith(
+        default_url_prefix(root_url)
+    )
+
+
+def markdown_to_links(base_url: str, markdown: str) -> list[str]:
+    """Extract absolute, normalized links from markdown content."""
+    links = []
+    seen = set()
+    for match in MARKDOWN_LINK_PATTERN.finditer(markdown):
+        target = match.group(2).strip().split(" ", 1)[0]
+        if not target:
+            continue
+        url = urljoin(base_url, target)
+        if urlparse(url).scheme not in DEFAULT_PORTS:
+            continue
+        url = normalize_url(url)
+        if url not in seen:
+            seen.add(url)
+            links.append(url)
+    return links
+
+
+async def fetch_sitemap_urls(root_url: str, max_urls: int) -> list[str]:
+    """Collect page URLs from the site's sitemap.xml, following sitemap indexes."""
+    parsed = urlparse(root_url)
+    pending = [f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"]
+    visited = set()
+    urls: list[str] = []
+    while pending and len(urls) < max_urls:
+        sitemap_url = pending.pop(0)
+        if sitemap_url in visited:
+            continue
+        visited.add(sitemap_url)
+        try:
+            response = await http_client.get(sitemap_url)
+            if response.status_code != httpx.codes.OK:
+                continue
+            root = ET.fromstring(response.content)  # noqa: S314
+        except (httpx.HTTPError, ET.ParseError) as e:
+            logger.debug("Failed to read sitemap %s: %s", sitemap_url, e)
+            continue
+        for loc in root.iter(f"{SITEMAP_NAMESPACE}loc"):
+            if not loc.text:
+                continue
+            if root.tag == f"{SITEMAP_NAMESPACE}sitemapindex":
+                pending.append(loc.text.strip())
+            else:
+                urls.append(normalize_url(loc.text))
+    logger.debug("Found %d URLs in sitemap of %s", len(urls), root_url)
+    return urls[:max_urls]
+
+
+class SiteCrawler:
+    """
+    Breadth-first crawler bounded by depth, page budget and URL prefix.
+
+    Pages of one depth level are fetched concurrently and yielded as soon as
+    they arrive, so callers can start embedding before the crawl finishes.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self: SiteCrawler,
+        root_url: str,
+        fetch: Callable[[str], Awaitable[tuple[str, list[str] | None]]],
+        max_depth: int = CRAWL_MAX_DEPTH,
+        max_pages: int = CRAWL_MAX_PAGES,
+        url_prefix: str | None = None,
+        use_sitemap: bool = CRAWL_USE_SITEMAP,  # noqa: FBT001
+    ) -> None:
+        """
+        Initialize the crawler.
+
+        Args:
+            root_url: The page to start crawling from.
+            fetch: Coroutine returning the markdown of a page and its links.
+                The markdown is "" for failed or unchanged pages, and links
+                may be None to extract them from the markdown.
+            max_depth: Number of link hops to follow from the root page.
+            max_pages: Maximum number of pages to fetch.
+            url_prefix: Only URLs starting with this prefix are crawled.
+                Defaults to the URLs below the root URL.
+            use_sitemap: Seed the crawl with the URLs of the site's sitemap.xml.
+
+        """
+        self.root_url = normalize_url(root_url)
+        self.fetch = fetch
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.url_prefix = url_prefix or default_url_prefix(root_url)
+        self.use_sitemap = use_sitemap
+        self.seen: set[str] = set()
+
+    def _schedule(self: SiteCrawler, urls: list[str], frontier: list[str]) -> None:
+        for url in urls:
+            if len(self.seen) >= self.max_pages:
+                return
+            if url in self.seen:
+                continue
+            if url != self.root_url and not url.startswith(self.url_prefix):
+                continue
+            self.seen.add(url)
+            frontier.append(url)
+
+    async def _fetch_page(
+        self: SiteCrawler, url: str
+    ) -> tuple[str, str, list[str] | None]:
+        markdown, links = await self.fetch(url)
+        return url, markdown, links
+
+    async def crawl(self: SiteCrawler) -> AsyncGenerator[tuple[str, str], None]:
+        """Yield ``(url, markdown)`` for every fetched page with new content."""
+        frontier: list[str] = []
+        self._schedule([self.root_url], frontier)
+        if self.use_sitemap:
+            sitemap_urls = await fetch_sitemap_urls(self.root_url, self.max_pages)
+            self._schedule(sitemap_urls, frontier)
+
+        depth = 0
+        while frontier:
+            next_frontier: list[str] = []
+            tasks = [asyncio.create_task(self._fetch_page(url)) for url in frontier]
+            try:
+                for task in asyncio.as_completed(tasks):
+                    url, markdown, links = await task
+                    if depth < self.max_depth:
+                        if links is None:
+                            links = markdown_to_links(url, markdown)
+                        self._schedule(links, next_frontier)
+                    if markdown:
+                        yield url, markdown
+            finally:
+                for task in tasks:
+                    task.cancel()
+            logger.debug(
+                "Crawled depth %d of %s: %d pages, %d queued",
+                depth,
+                self.root_url,
+                len(frontier),
+                len(next_frontier),
+            )
+            frontier = next_frontier
+            depth += 1
@@ -32,13 +32,64 @@ CREATE TABLE IF NOT EXISTS resources (
     indexing_started_at DATETIME,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     last_indexed_at DATETIME,
-    last_error TEXT
+    last_error TEXT,
+    refresh_interval INTEGER,  -- seconds between refreshes of remote resources
+    generation INTEGER NOT NULL DEFAULT 0  -- incremented whenever the indexed content changes
 );
 
 CREATE INDEX IF NOT EXISTS idx_resources_name ON resources(name);
 CREATE INDEX IF NOT EXISTS idx_resources_uri ON resources(uri);
 CREATE INDEX IF NOT EXISTS idx_resources_status ON resources(status);
 CREATE INDEX IF NOT EXISTS idx_status ON indexing_history(status);
+
+CREATE TABLE IF NOT EXISTS crawl_state (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    resource_uri TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,
+    links TEXT,  -- JSON list of outgoing links, reused when the page is unchanged
+    last_fetched_at DATETIME
+);
+
+CREATE INDEX IF NOT EXISTS idx_crawl_state_resource_uri ON crawl_state(resource_uri);
+
+CREATE TABLE IF NOT EXISTS symbols (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,  -- category from LANGUAGE_NODE_MAP, e.g. 'function' or 'class'
+    uri TEXT NOT NULL,  -- URI of the file defining the symbol
+    language TEXT,
+    start_line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL,
+    chunk_id TEXT,  -- node ID of the indexed chunk containing the definition
+    doc_id TEXT  -- ID of the indexed document the chunk was split from
+);
+
+CREATE INDEX IF NOT EXISTS idx_symbols_name ON symbols(name);
+CREATE INDEX IF NOT EXISTS idx_symbols_uri ON symbols(uri);
+CREATE INDEX IF NOT EXISTS idx_symbols_chunk_id ON symbols(chunk_id);
+CREATE INDEX IF NOT EXISTS idx_symbols_doc_id ON symbols(doc_id);
+
+-- Full-text index of the embedded chunks, kept in sync with the vector store
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    node_id UNINDEXED,
+    doc_id UNINDEXED,
+    uri UNINDEXED,
+    content,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+-- Looks up full-text rows by document and URI, as FTS5 cannot index them
+CREATE TABLE IF NOT EXISTS chunks_fts_rows (
+    fts_rowid INTEGER PRIMARY KEY,  -- rowid of the row in chunks_fts
+    doc_id TEXT NOT NULL,
+    uri TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_chunks_fts_rows_doc_id ON chunks_fts_rows(doc_id);
+CREATE INDEX IF NOT EXISTS idx_chunks_fts_rows_uri ON chunks_fts_rows(uri);
 """
 
 
@@ -53,8 +104,30 @@ def get_db_connection() -> Generator[sqlite3.Connection, None, None]:
         conn.close()
 
 
+# Columns added after a table was first created, as (column, definition) pairs
+ADDED_COLUMNS = {
+    "resources": [
+        ("refresh_interval", "INTEGER"),
+        ("generation", "INTEGER NOT NULL DEFAULT 0"),
+    ],
+    "symbols": [
+        ("doc_id", "TEXT"),
+    ],
+}
+
+
 def init_db() -> None:
     """Initialize the SQLite database."""
     with get_db_connection() as conn:
         conn.executescript(CREATE_TABLES_SQL)
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for column, definition in columns:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        # Full-text rows added before their lookup table existed
+        if conn.execute("SELECT 1 FROM chunks_fts_rows LIMIT 1").fetchone() is None:
+            conn.execute(
+                "INSERT INTO chunks_fts_rows (fts_rowid, doc_id, uri) SELECT rowid, doc_id, uri FROM chunks_fts"
+            )
         conn.commit()
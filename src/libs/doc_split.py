@@ -0,0 +1,238 @@
+"""Heading-aware splitter for markdown, reStructuredText and HTML documents."""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Literal
+
+from libs.html_markdown import html_to_markdown
+
+DocFormat = Literal["markdown", "rst", "html"]
+
+DOC_MAX_CHUNK_SIZE = int(os.getenv("RAG_DOC_MAX_CHUNK_SIZE", "4000"))
+DOC_MIN_CHUNK_SIZE = int(os.getenv("RAG_DOC_MIN_CHUNK_SIZE", "200"))
+
+DOC_EXT_MAP: dict[str, DocFormat] = {
+    ".md": "markdown",
+    ".markdown": "markdown",
+    ".rst": "rst",
+    ".html": "html",
+    ".htm": "html",
+}
+
+BREADCRUMB_SEPARATOR = " > "
+MARKDOWN_HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+MARKDOWN_FENCE_PATTERN = re.compile(r"^\s*(```|~~~)")
+RST_ADORNMENT_PATTERN = re.compile(r"^([!-/:-@\[-`{-~])\1{2,}\s*$")
+PARAGRAPH_SEPARATOR_PATTERN = re.compile(r"\n\s*\n")
+
+
+@dataclass
+class DocChunk:
+    """A chunk of a document and the headings it is nested under."""
+
+    text: str
+    breadcrumb: list[str] = field(default_factory=list)
+    # Part of a line that was too long, never packed with other chunks
+    partial: bool = False
+
+    @property
+    def breadcrumb_text(self: DocChunk) -> str:
+        """Return the breadcrumb as a single string."""
+        return BREADCRUMB_SEPARATOR.join(self.breadcrumb)
+
+
+def _markdown_headings(lines: list[str]) -> list[tuple[int, int, str]]:
+    """Return ``(line, level, title)`` for each heading outside of code fences."""
+    headings = []
+    fence = None
+    for i, line in enumerate(lines):
+        fence_match = MARKDOWN_FENCE_PATTERN.match(line)
+        if fence_match:
+            if fence is None:
+                fence = fence_match.group(1)
+            elif fence_match.group(1) == fence:
+                fence = None
+            continue
+        if fence is not None:
+            continue
+        match = MARKDOWN_HEADING_PATTERN.match(line)
+        if match:
+            headings.append((i, len(match.group(1)), match.group(2)))
+    return headings
+
+
+def _rst_headings(lines: list[str]) -> list[tuple[int, int, str]]:
+    """
+    Return ``(line, level, title)`` for each section title.
+
+    Levels follow the order in which adornment styles first appear, as in
+    docutils. The line of a heading with an overline is the overline.
+    """
+    headings = []
+    styles: list[tuple[str, bool]] = []
+    i = 0
+    while i < len(lines) - 1:
+        title = lines[i].strip()
+        underline = RST_ADORNMENT_PATTERN.match(lines[i + 1])
+        if (
+            title
+            and not RST_ADORNMENT_PATTERN.match(lines[i])
+            and underline
+            and len(lines[i + 1].rstrip()) >= len(title)
+        ):
+            overline = i > 0 and lines[i - 1].rstrip() == lines[i + 1].rstrip()
+            style = (underline.group(1), overline)
+            if style not in styles:
+                styles.append(style)
+            start = i - 1 if overline else i
+            headings.append((start, styles.index(style) + 1, title))
+            i += 2
+            continue
+        i += 1
+    return headings
+
+
+def source_text(text: str, doc_format: DocFormat, base_url: str = "") -> str:
+    """
+    Return the text the chunks of a document are cut from.
+
+    HTML is converted to markdown first; other formats are split as they are.
+    Chunks are checked against this text, not the raw file, at retrieve time.
+    """
+    if doc_format == "html":
+        text, _ = html_to_markdown(text, base_url)
+    return text
+
+
+def _cut_line(line: str, max_size: int) -> list[str]:
+    """Cut a long line into substrings of at most ``max_size`` characters, at spaces where possible."""
+    pieces = []
+    start = 0
+    while len(line) - start > max_size:
+        end = line.rfind(" ", start + 1, start + max_size + 1)
+        if end <= start:
+            end = start + max_size
+        pieces.append(line[start:end])
+        start = end
+    pieces.append(line[start:])
+    return [piece for piece in pieces if piece.strip()]
+
+
+class DocumentSplitter:
+    """
+    Split structured documents into sections along their heading hierarchy.
+
+    Every chunk carries the breadcrumb of headings it is nested under.
+    Sections above ``max_chunk_size`` characters are split on paragraph,
+    then line boundaries, and adjacent sections below ``min_chunk_size`` are
+    packed together so that embeddings stay small but not trivially short.
+    """
+
+    def __init__(
+        self: DocumentSplitter,
+        max_chunk_size: int = DOC_MAX_CHUNK_SIZE,
+        min_chunk_size: int = DOC_MIN_CHUNK_SIZE,
+    ) -> None:
+        """Initialize the splitter."""
+        self.max_chunk_size = max_chunk_size
+        self.min_chunk_size = min(min_chunk_size, max_chunk_size)
+
+    def _sections(
+        self: DocumentSplitter, text: str, doc_format: DocFormat
+    ) -> list[DocChunk]:
+        lines = text.splitlines()
+        headings = (
+            _rst_headings(lines) if doc_format == "rst" else _markdown_headings(lines)
+        )
+        sections = []
+        stack: list[tuple[int, str]] = []
+        start = 0
+        breadcrumb: list[str] = []
+        for line, level, title in headings:
+            if line > start:
+                sections.append(DocChunk("\n".join(lines[start:line]), breadcrumb))
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, title))
+            breadcrumb = [heading for _, heading in stack]
+            start = line
+        sections.append(DocChunk("\n".join(lines[start:]), breadcrumb))
+        return [section for section in sections if section.text.strip()]
+
+    def _split_oversized(self: DocumentSplitter, chunk: DocChunk) -> list[DocChunk]:
+        if len(chunk.text) <= self.max_chunk_size:
+            return [chunk]
+        chunks = []
+        current = ""
+        for paragraph in PARAGRAPH_SEPARATOR_PATTERN.split(chunk.text):
+            pieces = (
+                [paragraph]
+                if len(paragraph) <= self.max_chunk_size
+                else paragraph.splitlines()
+            )
+            for piece in pieces:
+                if current and len(current) + len(piece) + 2 > self.max_chunk_size:
+                    chunks.append(DocChunk(current, chunk.breadcrumb))
+                    current = ""
+                if len(piece) <= self.max_chunk_size:
+                    current = f"{current}\n\n{piece}" if current else piece
+                    continue
+                # Parts of a line stay substrings of the text, each its own chunk
+                chunks.extend(
+                    DocChunk(part, chunk.breadcrumb, partial=True)
+                    for part in _cut_line(piece, self.max_chunk_size)
+                )
+        if current:
+            chunks.append(DocChunk(current, chunk.breadcrumb))
+        return chunks
+
+    def _pack(self: DocumentSplitter, chunks: list[DocChunk]) -> list[DocChunk]:
+        packed: list[DocChunk] = []
+        for chunk in chunks:
+            previous = packed[-1] if packed else None
+            if (
+                previous is not None
+                and not (previous.partial or chunk.partial)
+                and min(len(previous.text), len(chunk.text)) < self.min_chunk_size
+                and len(previous.text) + len(chunk.text) + 2 <= self.max_chunk_size
+            ):
+                # Keep the headings both chunks are nested under
+                common = 0
+                for a, b in zip(previous.breadcrumb, chunk.breadcrumb, strict=False):
+                    if a != b:
+                        break
+                    common += 1
+                packed[-1] = DocChunk(
+                    f"{previous.text}\n\n{chunk.text}", previous.breadcrumb[:common]
+                )
+            else:
+                packed.append(chunk)
+        return packed
+
+    def split_text(
+        self: DocumentSplitter, text: str, doc_format: DocFormat, base_url: str = ""
+    ) -> list[DocChunk]:
+        """
+        Split a document into chunks along its headings.
+
+        Args:
+            text: The document content.
+            doc_format: Format of the content.
+            base_url: URL of an HTML document, used to resolve its links.
+
+        Returns:
+            The chunks in document order.
+
+        """
+        text = source_text(text, doc_format, base_url)
+        chunks = []
+        for section in self._sections(text, doc_format):
+            chunks.extend(self._split_oversized(section))
+        return [
+            DocChunk(chunk.text.strip(), chunk.breadcrumb)
+            for chunk in self._pack(chunks)
+            if chunk.text.strip()
+        ]
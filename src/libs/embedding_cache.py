@@ -0,0 +1,187 @@
+"""LRU cache of query embeddings with expiry and an optional SQLite layer."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from libs.configs import QUERY_EMBEDDING_CACHE_FILE
+from libs.logger import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from pathlib import Path
+
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("RAG_QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+# Seconds a cached embedding stays valid; 0 disables the cache
+QUERY_EMBEDDING_CACHE_TTL = float(os.getenv("RAG_QUERY_EMBEDDING_CACHE_TTL", "86400"))
+# Also keep embeddings in SQLite, shared by all workers and kept across restarts
+QUERY_EMBEDDING_CACHE_PERSIST = os.getenv(
+    "RAG_QUERY_EMBEDDING_CACHE_PERSIST", "false"
+).lower() in ("true", "1", "yes", "on")
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS query_embeddings (
+    key TEXT PRIMARY KEY,
+    embedding BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_query_embeddings_created_at ON query_embeddings(created_at);
+"""
+
+
+def normalize_query(query: str) -> str:
+    """Normalize Unicode and whitespace so that trivially different queries share an entry."""
+    return " ".join(unicodedata.normalize("NFC", query).split())
+
+
+class QueryEmbeddingCache:
+    """
+    Cache of query embeddings keyed by model and normalized query text.
+
+    Entries expire ``ttl`` seconds after they were computed and the least
+    recently used ones are evicted beyond ``max_size``. With ``persist_path``
+    set, misses of the in-memory cache fall back to a SQLite table trimmed to
+    the same size, so the entries are shared by all workers.
+    """
+
+    def __init__(
+        self: QueryEmbeddingCache,
+        max_size: int = QUERY_EMBEDDING_CACHE_SIZE,
+        ttl: float = QUERY_EMBEDDING_CACHE_TTL,
+        persist_path: Path | None = (
+            QUERY_EMBEDDING_CACHE_FILE if QUERY_EMBEDDING_CACHE_PERSIST else None
+        ),
+    ) -> None:
+        """Initialize the cache."""
+        self.max_size = max_size
+        self.ttl = ttl
+        self.persist_path = persist_path
+        self._entries: OrderedDict[str, tuple[list[float], float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_initialized = False
+
+    @property
+    def enabled(self: QueryEmbeddingCache) -> bool:
+        """Whether embeddings are cached at all."""
+        return self.max_size > 0 and self.ttl > 0
+
+    @staticmethod
+    def make_key(model: str, query: str) -> str:
+        """Return the cache key of ``query`` embedded by ``model``."""
+        return f"{model}\0{normalize_query(query)}"
+
+    @contextmanager
+    def _connect(self: QueryEmbeddingCache) -> Generator[sqlite3.Connection, None, None]:
+        conn = sqlite3.connect(self.persist_path, timeout=5)
+        try:
+            if not self._db_initialized:
+                conn.executescript(CREATE_TABLE_SQL)
+                self._db_initialized = True
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _get_persisted(self: QueryEmbeddingCache, key: str) -> tuple[list[float], float] | None:
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT embedding, created_at FROM query_embeddings WHERE key = ?",
+                    (key,),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Failed to read query embedding cache: %s", e)
+            return None
+        if row is None:
+            return None
+        return array("d", row[0]).tolist(), row[1]
+
+    def _put_persisted(
+        self: QueryEmbeddingCache, key: str, embedding: list[float], created_at: float
+    ) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (key, embedding, created_at) VALUES (?, ?, ?)",
+                    (key, array("d", embedding).tobytes(), created_at),
+                )
+                conn.execute(
+                    "DELETE FROM query_embeddings WHERE created_at < ?",
+                    (created_at - self.ttl,),
+                )
+                conn.execute(
+                    """
+                  DELETE FROM query_embeddings WHERE key IN (
+                    SELECT key FROM query_embeddings
+                    ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                  )
+                  """,
+                    (self.max_size,),
+                )
+        except sqlite3.Error as e:
+            logger.warning("Failed to write query embedding cache: %s", e)
+
+    def get(self: QueryEmbeddingCache, model: str, query: str) -> list[float] | None:
+        """Return the cached embedding of ``query``, or None."""
+        if not self.enabled:
+            return None
+        key = self.make_key(model, query)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[1] < self.ttl:
+                    self._entries.move_to_end(key)
+                    return entry[0]
+                del self._entries[key]
+        if self.persist_path is None:
+            return None
+        entry = self._get_persisted(key)
+        if entry is None or now - entry[1] >= self.ttl:
+            return None
+        self._remember(key, *entry)
+        return entry[0]
+
+    def put(
+        self: QueryEmbeddingCache, model: str, query: str, embedding: list[float]
+    ) -> None:
+        """Cache the embedding of ``query``."""
+        if not self.enabled:
+            return
+        key = self.make_key(model, query)
+        created_at = time.time()
+        self._remember(key, embedding, created_at)
+        if self.persist_path is not None:
+            self._put_persisted(key, embedding, created_at)
+
+    def _remember(
+        self: QueryEmbeddingCache, key: str, embedding: list[float], created_at: float
+    ) -> None:
+        with self._lock:
+            self._entries[key] = (embedding, created_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self: QueryEmbeddingCache) -> None:
+        """Drop all cached embeddings."""
+        with self._lock:
+            self._entries.clear()
+        if self.persist_path is not None:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM query_embeddings")
+            except sqlite3.Error as e:
+                logger.warning("Failed to clear query embedding cache: %s", e)
+
+
+query_embedding_cache = QueryEmbeddingCache()
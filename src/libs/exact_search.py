@@ -0,0 +1,411 @@
+"""Exact in-process vector search over memory-mapped embeddings."""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterCondition,
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
+from llama_index.vector_stores.chroma import ChromaVectorStore
+from pydantic import PrivateAttr
+
+from libs.logger import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from llama_index.core.schema import BaseNode
+
+# "auto" searches collections of up to RAG_EXACT_SEARCH_MAX_VECTORS vectors
+# exactly and larger ones with Chroma's HNSW index; "exact" and "chroma" force
+# one engine
+VECTOR_BACKEND = os.getenv("RAG_VECTOR_BACKEND", "auto")
+EXACT_SEARCH_MAX_VECTORS = int(os.getenv("RAG_EXACT_SEARCH_MAX_VECTORS", "20000"))
+# Seconds a changed collection must go without writes before it is
+# snapshotted, so that indexing does not rebuild the snapshot after each batch;
+# also the minimum interval between rebuilds
+EXACT_SEARCH_REBUILD_INTERVAL = 5.0
+SNAPSHOT_FETCH_BATCH_SIZE = 1000
+VERSION_FILE_NAME = "version"
+INITIAL_VERSION = "initial"
+SUPPORTED_FILTER_OPERATORS = {
+    FilterOperator.EQ,
+    FilterOperator.NE,
+    FilterOperator.IN,
+    FilterOperator.NIN,
+}
+
+
+def filters_supported(filters: MetadataFilters | None) -> bool:
+    """Whether a snapshot can evaluate ``filters`` itself."""
+    if filters is None:
+        return True
+    if filters.condition not in (FilterCondition.AND, FilterCondition.OR, None):
+        return False
+    return all(
+        filters_supported(f)
+        if isinstance(f, MetadataFilters)
+        else f.operator in SUPPORTED_FILTER_OPERATORS
+        for f in filters.filters
+    )
+
+
+def _filter_matches(metadata: dict[str, Any], metadata_filter: MetadataFilter) -> bool:
+    value = metadata.get(metadata_filter.key)
+    if metadata_filter.operator == FilterOperator.EQ:
+        return value == metadata_filter.value
+    if metadata_filter.operator == FilterOperator.NE:
+        return value != metadata_filter.value
+    if metadata_filter.operator == FilterOperator.IN:
+        return value in metadata_filter.value  # pyright: ignore[reportOperatorIssue]
+    return value not in metadata_filter.value  # pyright: ignore[reportOperatorIssue]
+
+
+def filters_match(metadata: dict[str, Any], filters: MetadataFilters) -> bool:
+    """Evaluate supported metadata filters against a node's metadata."""
+    results = (
+        filters_match(metadata, f)
+        if isinstance(f, MetadataFilters)
+        else _filter_matches(metadata, f)
+        for f in filters.filters
+    )
+    if filters.condition == FilterCondition.OR:
+        return any(results)
+    return all(results)
+
+
+class VectorSnapshot:
+    """
+    Embeddings of a collection at one version, memory-mapped from disk.
+
+    The float32 matrix is stored as ``<version>.npy`` and the node IDs and
+    scalar metadata as ``<version>.json``, so workers share one copy through
+    the page cache and a restart does not re-read the collection.
+    """
+
+    def __init__(
+        self: VectorSnapshot,
+        version: str,
+        ids: list[str],
+        metadatas: list[dict[str, Any]],
+        vectors: np.ndarray,
+    ) -> None:
+        """Initialize the snapshot."""
+        self.version = version
+        self.ids = ids
+        self.metadatas = metadatas
+        self.vectors = vectors
+        self.squared_norms = np.einsum("ij,ij->i", vectors, vectors)
+
+    @classmethod
+    def load(
+        cls: type[VectorSnapshot], directory: Path, version: str
+    ) -> VectorSnapshot | None:
+        """Load the snapshot of ``version``, or None if it was not built."""
+        vectors_path = directory / f"{version}.npy"
+        entries_path = directory / f"{version}.json"
+        if not vectors_path.exists() or not entries_path.exists():
+            return None
+        with entries_path.open("r", encoding="utf-8") as f:
+            entries = json.load(f)
+        vectors = np.load(vectors_path, mmap_mode="r")
+        return cls(version, entries["ids"], entries["metadatas"], vectors)
+
+    @classmethod
+    def build(
+        cls: type[VectorSnapshot],
+        collection: Any,  # noqa: ANN401
+        directory: Path,
+        version: str,
+    ) -> VectorSnapshot | None:
+        """Read all embeddings of a Chroma collection into a new snapshot, or None if it was removed meanwhile."""
+        ids: list[str] = []
+        metadatas: list[dict[str, Any]] = []
+        batches = []
+        total = collection.count()
+        for offset in range(0, total, SNAPSHOT_FETCH_BATCH_SIZE):
+            result = collection.get(
+                limit=SNAPSHOT_FETCH_BATCH_SIZE,
+                offset=offset,
+                include=["embeddings", "metadatas"],
+            )
+            if not result["ids"]:
+                break
+            ids.extend(result["ids"])
+            # Node contents are loaded from Chroma for the hits only
+            metadatas.extend(
+                {k: v for k, v in (metadata or {}).items() if not k.startswith("_")}
+                for metadata in result["metadatas"]
+            )
+            batches.append(np.asarray(result["embeddings"], dtype=np.float32))
+
+        directory.mkdir(parents=True, exist_ok=True)
+        suffix = uuid.uuid4().hex
+        entries_path = directory / f"{version}.json"
+        vectors_path = directory / f"{version}.npy"
+        # Written under temporary names and renamed, as other workers may be
+        # loading the same version; the matrix comes last as it marks completion
+        tmp_entries_path = directory / f".{suffix}.json"
+        with tmp_entries_path.open("w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "metadatas": metadatas}, f)
+        tmp_entries_path.replace(entries_path)
+        tmp_vectors_path = directory / f".{suffix}.npy"
+        vectors = (
+            np.concatenate(batches) if batches else np.empty((0, 0), dtype=np.float32)
+        )
+        np.save(tmp_vectors_path, vectors)
+        tmp_vectors_path.replace(vectors_path)
+
+        # Workers that still map an older snapshot keep reading it until they reload
+        for path in directory.iterdir():
+            if (
+                path.suffix in (".npy", ".json")
+                and path.stem != version
+                and not path.name.startswith(".")
+            ):
+                path.unlink(missing_ok=True)
+        return cls.load(directory, version)
+
+    def search(
+        self: VectorSnapshot,
+        embedding: list[float],
+        top_k: int,
+        space: str = "l2",
+        filters: MetadataFilters | None = None,
+    ) -> list[tuple[str, float]]:
+        """
+        Return the ``(node_id, distance)`` pairs of the nearest embeddings.
+
+        Distances are computed like Chroma's for the collection's ``space``,
+        i.e. squared L2, ``1 - inner product`` or cosine distance.
+        """
+        if not self.ids or top_k <= 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        products = self.vectors @ query
+        if space == "ip":
+            distances = 1.0 - products
+        elif space == "cosine":
+            norms = np.sqrt(self.squared_norms) * np.linalg.norm(query)
+            distances = 1.0 - products / np.maximum(norms, np.finfo(np.float32).tiny)
+        else:
+            distances = self.squared_norms - 2.0 * products + float(query @ query)
+
+        if filters is not None:
+            mask = np.fromiter(
+                (filters_match(metadata, filters) for metadata in self.metadatas),
+                dtype=bool,
+                count=len(self.metadatas),
+            )
+            distances = np.where(mask, distances, np.inf)
+            top_k = min(top_k, int(mask.sum()))
+        top_k = min(top_k, len(self.ids))
+        if top_k == 0:
+            return []
+        nearest = np.argpartition(distances, top_k - 1)[:top_k]
+        nearest = nearest[np.argsort(distances[nearest])]
+        return [(self.ids[i], float(distances[i])) for i in nearest]
+
+
+class ExactSearchVectorStore(BasePydanticVectorStore):
+    """
+    Chroma vector store that answers small collections by exact search.
+
+    Nodes are stored in Chroma as before. Queries against a collection of at
+    most ``max_vectors`` embeddings are answered by a matrix product over a
+    memory-mapped snapshot of all embeddings, which is exact and avoids the
+    HNSW and SQLite round trips; larger collections, filters the snapshot
+    cannot evaluate and queries arriving while a changed collection is still
+    being written to or snapshotted fall through to Chroma. Every write
+    replaces the version token in ``snapshot_dir``, so all workers notice that
+    their snapshot is stale, and its age tells them when writes have stopped.
+    """
+
+    stores_text: bool = True
+    snapshot_dir: Path
+    max_vectors: int
+
+    _store: ChromaVectorStore = PrivateAttr()
+    _snapshot: VectorSnapshot | None = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _building: bool = PrivateAttr(default=False)
+    _last_build: float = PrivateAttr(default=-math.inf)
+
+    def __init__(
+        self: ExactSearchVectorStore,
+        store: ChromaVectorStore,
+        snapshot_dir: Path,
+        max_vectors: int = EXACT_SEARCH_MAX_VECTORS,
+    ) -> None:
+        """Initialize the store."""
+        super().__init__(snapshot_dir=snapshot_dir, max_vectors=max_vectors)
+        self._store = store
+
+    @classmethod
+    def class_name(cls: type[ExactSearchVectorStore]) -> str:
+        """Return the class name."""
+        return "ExactSearchVectorStore"
+
+    @property
+    def client(self: ExactSearchVectorStore) -> Any:  # noqa: ANN401
+        """Return the Chroma collection."""
+        return self._store.client
+
+    def _read_version(self: ExactSearchVectorStore) -> str:
+        try:
+            return (self.snapshot_dir / VERSION_FILE_NAME).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return INITIAL_VERSION
+
+    def _seconds_since_change(self: ExactSearchVectorStore) -> float:
+        try:
+            changed = (self.snapshot_dir / VERSION_FILE_NAME).stat().st_mtime
+        except FileNotFoundError:
+            return math.inf
+        return time.time() - changed
+
+    def _mark_changed(self: ExactSearchVectorStore) -> None:
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.snapshot_dir / f".{uuid.uuid4().hex}.version"
+        tmp_path.write_text(uuid.uuid4().hex, encoding="utf-8")
+        tmp_path.replace(self.snapshot_dir / VERSION_FILE_NAME)
+
+    def _build_snapshot(self: ExactSearchVectorStore, version: str) -> None:
+        try:
+            collection = self._store.client
+            snapshot = None
+            if collection.count() <= self.max_vectors:
+                started = time.perf_counter()
+                snapshot = VectorSnapshot.build(collection, self.snapshot_dir, version)
+                logger.debug(
+                    "Built snapshot of %s in %.2fs",
+                    collection.name,
+                    time.perf_counter() - started,
+                )
+            with self._lock:
+                self._snapshot = snapshot
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to build vector snapshot: %s", e)
+        finally:
+            with self._lock:
+                self._building = False
+
+    def _current_snapshot(self: ExactSearchVectorStore) -> VectorSnapshot | None:
+        """Return the snapshot of the current version, or None while there is none."""
+        version = self._read_version()
+        with self._lock:
+            if self._snapshot is not None and self._snapshot.version == version:
+                return self._snapshot
+            if self._building:
+                return None
+        snapshot = VectorSnapshot.load(self.snapshot_dir, version)
+        idle = self._seconds_since_change() >= EXACT_SEARCH_REBUILD_INTERVAL
+        with self._lock:
+            if snapshot is not None:
+                self._snapshot = snapshot
+                return snapshot
+            if (
+                not idle
+                or self._building
+                or time.monotonic() - self._last_build < EXACT_SEARCH_REBUILD_INTERVAL
+            ):
+                return None
+            # Built off the request path; Chroma answers until it is ready
+            self._building = True
+            self._last_build = time.monotonic()
+        threading.Thread(
+            target=self._build_snapshot, args=(version,), daemon=True
+        ).start()
+        return None
+
+    def add(
+        self: ExactSearchVectorStore,
+        nodes: Sequence[BaseNode],
+        **kwargs: Any,  # noqa: ANN401
+    ) -> list[str]:
+        """Add nodes to Chroma."""
+        ids = self._store.add(list(nodes), **kwargs)
+        self._mark_changed()
+        return ids
+
+    def delete(
+        self: ExactSearchVectorStore,
+        ref_doc_id: str,
+        **delete_kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        """Delete the nodes of a document from Chroma."""
+        self._store.delete(ref_doc_id, **delete_kwargs)
+        self._mark_changed()
+
+    def delete_nodes(
+        self: ExactSearchVectorStore,
+        node_ids: list[str] | None = None,
+        filters: MetadataFilters | None = None,
+        **delete_kwargs: Any,  # noqa: ANN401, ARG002
+    ) -> None:
+        """Delete nodes from Chroma."""
+        self._store.delete_nodes(node_ids, filters)  # pyright: ignore[reportArgumentType]
+        self._mark_changed()
+
+    def clear(self: ExactSearchVectorStore) -> None:
+        """Delete all nodes from Chroma."""
+        self._store.clear()
+        self._mark_changed()
+
+    def get_nodes(
+        self: ExactSearchVectorStore,
+        node_ids: list[str] | None = None,
+        filters: MetadataFilters | None = None,
+    ) -> list[BaseNode]:
+        """Get nodes from Chroma."""
+        return self._store.get_nodes(node_ids, filters)  # pyright: ignore[reportArgumentType]
+
+    def query(
+        self: ExactSearchVectorStore,
+        query: VectorStoreQuery,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> VectorStoreQueryResult:
+        """Query the snapshot if it is current, else Chroma."""
+        if (
+            kwargs
+            or not query.query_embedding
+            or query.mode != VectorStoreQueryMode.DEFAULT
+            or query.doc_ids
+            or query.node_ids
+            or not filters_supported(query.filters)
+        ):
+            return self._store.query(query, **kwargs)
+        snapshot = self._current_snapshot()
+        if snapshot is None:
+            return self._store.query(query, **kwargs)
+
+        space = (self._store.client.metadata or {}).get("hnsw:space", "l2")
+        hits = snapshot.search(
+            query.query_embedding, query.similarity_top_k, space, query.filters
+        )
+        if not hits:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+        nodes = {node.node_id: node for node in self.get_nodes([i for i, _ in hits])}
+        # Nodes deleted since the snapshot was taken are skipped
+        hits = [(node_id, distance) for node_id, distance in hits if node_id in nodes]
+        return VectorStoreQueryResult(
+            nodes=[nodes[node_id] for node_id, _ in hits],
+            similarities=[math.exp(-distance) for _, distance in hits],
+            ids=[node_id for node_id, _ in hits],
+        )
@@ -0,0 +1,50 @@
+"""File summaries for coarse-to-fine retrieval."""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from llama_index.core.schema import BaseNode
+
+METADATA_KEY_FILE_SUMMARY = "file_summary"
+# Appended to the document ID of a file to get the ID of its summary
+FILE_SUMMARY_DOC_ID_SUFFIX = "__summary"
+# Files are only shortlisted once the summary index has this many files
+COARSE_MIN_FILES = int(os.getenv("RAG_COARSE_MIN_FILES", "1000"))
+# Files whose chunks are searched after shortlisting
+COARSE_FILE_CANDIDATES = int(os.getenv("RAG_COARSE_FILE_CANDIDATES", "50"))
+FILE_SUMMARY_MAX_OUTLINE_LINES = 200
+# Lines describing a file that has no symbols or headings
+FILE_SUMMARY_HEAD_LINES = 20
+FILE_SUMMARY_MAX_CHARS = 4000
+
+
+def build_file_summary(path: str, outline: list[str], content: str) -> str:
+    """
+    Describe a file by its path and outline, e.g. its symbols or headings.
+
+    Files without an outline are described by their first non-blank lines.
+    """
+    lines = list(dict.fromkeys(line for line in outline if line))
+    if not lines:
+        lines = [line for line in content.splitlines() if line.strip()]
+        lines = lines[:FILE_SUMMARY_HEAD_LINES]
+    summary = "\n".join([path, *lines[:FILE_SUMMARY_MAX_OUTLINE_LINES]])
+    return summary[:FILE_SUMMARY_MAX_CHARS]
+
+
+def is_file_summary(node: BaseNode) -> bool:
+    """Check if the node is a file summary rather than a chunk."""
+    return bool(node.metadata.get(METADATA_KEY_FILE_SUMMARY))
+
+
+def is_under_uri(uri: str, base_uri: str) -> bool:
+    """Check if ``uri`` is ``base_uri`` or lies below it."""
+    return uri == base_uri or uri.startswith(base_uri.rstrip("/") + "/")
+
+
+def is_file_summary_id(doc_id: str | None) -> bool:
+    """Check if a document ID belongs to a file summary."""
+    return bool(doc_id) and doc_id.endswith(FILE_SUMMARY_DOC_ID_SUFFIX)
@@ -0,0 +1,165 @@
+"""HTML to markdown conversion in a pool of worker processes."""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Literal
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+from markdownify import MarkdownConverter
+
+from libs.crawler import normalize_url
+from libs.logger import logger
+
+ExtractMode = Literal["full", "main"]
+
+# Number of conversion processes per server worker; 0 converts in a thread of
+# this process
+HTML_WORKERS = int(os.getenv("RAG_HTML_WORKERS", "2"))
+# "full" converts the whole page, "main" only its main content element
+HTML_EXTRACT_MODE: ExtractMode = os.getenv("RAG_HTML_EXTRACT_MODE", "full")  # type: ignore[assignment]
+
+# Elements that never carry page content
+BOILERPLATE_TAGS = [
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "nav",
+    "footer",
+    "iframe",
+    "svg",
+    "canvas",
+    "form",
+    "button",
+]
+BOILERPLATE_SELECTORS = [
+    "[role=navigation]",
+    "[role=contentinfo]",
+    "[role=search]",
+    "[aria-hidden=true]",
+    "[hidden]",
+]
+# Candidates for the main content element, most specific first
+MAIN_CONTENT_SELECTORS = [
+    "main",
+    "[role=main]",
+    "article",
+    "#content",
+    "#main-content",
+    ".content",
+    ".documentation",
+]
+LINK_SCHEMES = ("http", "https")
+
+
+def extract_links(base_url: str, soup: BeautifulSoup) -> list[str]:
+    """Extract absolute, normalized links from all anchors of a page."""
+    links = []
+    seen = set()
+    for anchor in soup.find_all("a", href=True):
+        url = urljoin(base_url, anchor["href"].strip())
+        if urlparse(url).scheme not in LINK_SCHEMES:
+            continue
+        url = normalize_url(url)
+        if url not in seen:
+            seen.add(url)
+            links.append(url)
+    return links
+
+
+def find_main_content(soup: BeautifulSoup) -> BeautifulSoup:
+    """Return the main content element of a page, or the page body."""
+    for selector in MAIN_CONTENT_SELECTORS:
+        element = soup.select_one(selector)
+        if element is not None and element.get_text(strip=True):
+            return element
+    return soup.body or soup
+
+
+def html_to_markdown(
+    html: str, base_url: str, mode: ExtractMode = HTML_EXTRACT_MODE
+) -> tuple[str, list[str]]:
+    """
+    Convert a page to markdown after stripping boilerplate.
+
+    Links are collected from the whole page before stripping, so that
+    navigation menus still drive the crawl in the "main" mode.
+
+    Args:
+        html: Raw HTML of the page.
+        base_url: URL of the page, used to resolve relative links.
+        mode: "full" to convert the whole page, "main" to convert only its
+            main content element.
+
+    Returns:
+        The markdown and the links of the page.
+
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    links = extract_links(base_url, soup)
+    root = find_main_content(soup) if mode == "main" else soup
+    for element in root.find_all(BOILERPLATE_TAGS):
+        element.decompose()
+    for element in root.select(",".join(BOILERPLATE_SELECTORS)):
+        element.decompose()
+    markdown = MarkdownConverter(heading_style="ATX").convert_soup(root)
+    return markdown.strip(), links
+
+
+class HtmlConverter:
+    """Run ``html_to_markdown`` in a lazily started process pool."""
+
+    def __init__(self: HtmlConverter, max_workers: int = HTML_WORKERS) -> None:
+        """Initialize the converter."""
+        self.max_workers = max_workers
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _get_executor(self: HtmlConverter) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Forking a process that runs threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def convert(
+        self: HtmlConverter,
+        html: str,
+        base_url: str,
+        mode: ExtractMode = HTML_EXTRACT_MODE,
+    ) -> tuple[str, list[str]]:
+        """Convert a page to markdown and links without blocking the event loop."""
+        if self.max_workers <= 0:
+            return await asyncio.to_thread(html_to_markdown, html, base_url, mode)
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            return await loop.run_in_executor(
+                executor, html_to_markdown, html, base_url, mode
+            )
+        except BrokenProcessPool:
+            # A dead worker fails every pending conversion; retry them once in
+            # a new pool, which only the first of them starts
+            if self._executor is executor:
+                logger.warning("HTML conversion pool broke, restarting it")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            return await loop.run_in_executor(
+                self._get_executor(), html_to_markdown, html, base_url, mode
+            )
+
+    def shutdown(self: HtmlConverter) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+html_converter = HtmlConverter()
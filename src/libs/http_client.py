@@ -0,0 +1,144 @@
+"""Shared async HTTP client for fetching remote resources."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Any
+from urllib.parse import urlparse
+
+import httpx
+
+from libs.logger import logger
+
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
+}
+
+# Connection pool and concurrency limits
+HTTP_MAX_CONNECTIONS = int(os.getenv("RAG_HTTP_MAX_CONNECTIONS", "32"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("RAG_HTTP_MAX_CONNECTIONS_PER_HOST", "4"))
+HTTP_KEEPALIVE_EXPIRY = 30.0
+HTTP_TIMEOUT = httpx.Timeout(
+    float(os.getenv("RAG_HTTP_TIMEOUT", "30")),
+    connect=10.0,
+)
+
+# Retry policy for transport errors and retryable status codes
+HTTP_MAX_RETRIES = int(os.getenv("RAG_HTTP_MAX_RETRIES", "3"))
+HTTP_RETRY_BACKOFF = 0.5
+HTTP_MAX_RETRY_AFTER = 60.0
+HTTP_RETRY_STATUS_CODES = {
+    httpx.codes.TOO_MANY_REQUESTS,
+    httpx.codes.BAD_GATEWAY,
+    httpx.codes.SERVICE_UNAVAILABLE,
+    httpx.codes.GATEWAY_TIMEOUT,
+}
+
+
+class AsyncHttpClient:
+    """
+    Keep-alive pooled HTTP client with per-host concurrency limits and retries.
+
+    The underlying ``httpx.AsyncClient`` is created lazily and re-created when
+    used from a different event loop, so the module-level instance can be
+    shared by the whole service.
+    """
+
+    def __init__(
+        self: AsyncHttpClient,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_connections_per_host: int = HTTP_MAX_CONNECTIONS_PER_HOST,
+        max_retries: int = HTTP_MAX_RETRIES,
+    ) -> None:
+        """Initialize the client."""
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.max_retries = max_retries
+        self._client: httpx.AsyncClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def _get_client(self: AsyncHttpClient) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                headers=HTTP_HEADERS,
+                http2=True,
+                timeout=HTTP_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+                ),
+            )
+            self._loop = loop
+            self._host_semaphores = {}
+        return self._client
+
+    def _get_host_semaphore(self: AsyncHttpClient, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_connections_per_host)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def request(
+        self: AsyncHttpClient,
+        method: str,
+        url: str,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> httpx.Response:
+        """
+        Send a request, retrying transport errors and retryable status codes.
+
+        Raises:
+            httpx.HTTPError: If the request still fails after all retries.
+
+        """
+        client = self._get_client()
+        semaphore = self._get_host_semaphore(url)
+        attempt = 0
+        while True:
+            delay = HTTP_RETRY_BACKOFF * 2**attempt
+            try:
+                async with semaphore:
+                    response = await client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise
+                logger.debug("Retrying %s %s after error: %s", method, url, e)
+            else:
+                if (
+                    response.status_code not in HTTP_RETRY_STATUS_CODES
+                    or attempt >= self.max_retries
+                ):
+                    return response
+                # Honor the rate limit announced by the host
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = max(delay, min(float(retry_after), HTTP_MAX_RETRY_AFTER))
+                logger.debug(
+                    "Retrying %s %s after status %d", method, url, response.status_code
+                )
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get(self: AsyncHttpClient, url: str, **kwargs: Any) -> httpx.Response:  # noqa: ANN401
+        """Send a GET request."""
+        return await self.request("GET", url, **kwargs)
+
+    async def head(self: AsyncHttpClient, url: str, **kwargs: Any) -> httpx.Response:  # noqa: ANN401
+        """Send a HEAD request."""
+        return await self.request("HEAD", url, **kwargs)
+
+    async def aclose(self: AsyncHttpClient) -> None:
+        """Close the pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+
+http_client = AsyncHttpClient()
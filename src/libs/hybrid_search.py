@@ -0,0 +1,60 @@
+"""Helpers for fusing lexical and vector search results."""
+
+from __future__ import annotations
+
+import os
+import re
+
+# Candidates fetched from each index before fusion
+HYBRID_CANDIDATES = int(os.getenv("RAG_HYBRID_CANDIDATES", "20"))
+# Damping constant of reciprocal-rank fusion; 60 is the value from the original paper
+RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+
+QUOTED_QUERY_PATTERN = re.compile(r'^\s*"(?P<text>[^"]+)"\s*$')
+# A name, optionally qualified with an identifier on each side of every
+# "." or "::", e.g. "os.path.join" or "std::vec::Vec"
+QUALIFIED_NAME_PATTERN = re.compile(
+    r"^[A-Za-z_$][\w$]*(?:(?:\.|::)[A-Za-z_$][\w$]*)*(?:\(\))?$"
+)
+# Names that only make sense as exact text: snake_case or SCREAMING_CASE,
+# camelCase or PascalCase, and qualified names
+IDENTIFIER_QUERY_PATTERN = re.compile(r"[^\W_]_|_[^\W_]|[a-z][A-Z]|\.|::")
+
+
+def exact_match_text(query: str) -> str | None:
+    """
+    Return the text an exact-match query looks for, or None for other queries.
+
+    A query is exact when it is wrapped in double quotes, or when it is a
+    single identifier such as ``handle_file_change``, ``ERR_CONNECTION_RESET``,
+    ``getFileName`` or ``os.path.join``. Words with digits or dashes, such as
+    ``python3`` or ``utf-8``, are not identifiers.
+    """
+    match = QUOTED_QUERY_PATTERN.match(query)
+    if match:
+        return match.group("text").strip() or None
+    query = query.strip()
+    if QUALIFIED_NAME_PATTERN.match(query) and IDENTIFIER_QUERY_PATTERN.search(query):
+        return query
+    return None
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[str]], k: int = RRF_K
+) -> list[tuple[str, float]]:
+    """
+    Fuse several rankings of the same items with reciprocal-rank fusion.
+
+    Each item scores ``sum(1 / (k + rank))`` over the rankings it appears in,
+    with ranks starting at 1, so scores of different scales never need to be
+    normalized against each other.
+
+    Returns:
+        ``(item, score)`` pairs, best first.
+
+    """
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
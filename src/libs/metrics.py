@@ -0,0 +1,116 @@
+"""Prometheus metrics for the indexing and retrieval pipelines."""
+
+from __future__ import annotations
+
+import os
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+# Latency buckets in seconds, from fast SQLite writes up to slow LLM calls
+STAGE_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+STAGE_DURATION = Histogram(
+    "rag_stage_duration_seconds",
+    "Latency of indexing and retrieval pipeline stages",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+CHUNKS_TOTAL = Counter(
+    "rag_chunks_total",
+    "Number of chunks written to the vector store",
+)
+TOKENS_TOTAL = Counter(
+    "rag_tokens_total",
+    "Number of LLM tokens reported by the providers",
+    ["kind"],
+)
+CACHE_HITS_TOTAL = Counter(
+    "rag_cache_hits_total",
+    "Number of cache hits",
+    ["cache"],
+)
+CACHE_MISSES_TOTAL = Counter(
+    "rag_cache_misses_total",
+    "Number of cache misses",
+    ["cache"],
+)
+FAILURES_TOTAL = Counter(
+    "rag_failures_total",
+    "Number of failures",
+    ["stage"],
+)
+QUEUE_DEPTH = Gauge(
+    "rag_queue_depth",
+    "Number of pending items per work queue",
+    ["queue"],
+    multiprocess_mode="livesum",
+)
+WATCHED_RESOURCES = Gauge(
+    "rag_watched_resources",
+    "Number of local resources watched for file changes",
+    multiprocess_mode="livesum",
+)
+
+
+@contextmanager
+def observe_stage(stage: str) -> Generator[None, None, None]:
+    """Record the duration of the enclosed block, counting raised errors as failures."""
+    with STAGE_DURATION.labels(stage).time():
+        try:
+            yield
+        except Exception:
+            FAILURES_TOTAL.labels(stage).inc()
+            raise
+
+
+@contextmanager
+def track_queue(queue: str, count: int = 1) -> Generator[None, None, None]:
+    """Count ``count`` items as pending in ``queue`` while the block runs."""
+    gauge = QUEUE_DEPTH.labels(queue)
+    gauge.inc(count)
+    try:
+        yield
+    finally:
+        gauge.dec(count)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format.
+
+    With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR so that the
+    samples of all worker processes are aggregated.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
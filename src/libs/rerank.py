@@ -0,0 +1,177 @@
+"""Rerank stage between the first-stage search and the LLM."""
+
+from __future__ import annotations
+
+import importlib
+import math
+import os
+import re
+from collections import Counter
+from collections.abc import Callable  # noqa: TC003 - resolved by pydantic
+from pathlib import PurePosixPath
+from typing import Any
+
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from pydantic import Field
+
+from libs.utils import get_node_uri
+
+# "none", "lexical" or "package.module:ClassName" of a node postprocessor
+RERANKER = os.getenv("RAG_RERANKER", "lexical")
+# Candidates taken from each index when a reranker is configured
+RERANK_CANDIDATES = int(os.getenv("RAG_RERANK_CANDIDATES", "50"))
+
+IDENTIFIER_PATTERN = re.compile(r"\w+")
+# Parts of snake_case, camelCase and PascalCase identifiers
+IDENTIFIER_PART_PATTERN = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+QUALIFIED_NAME_SEPARATOR_PATTERN = re.compile(r"[.:]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "does", "do", "for",
+    "from", "how", "in", "is", "it", "of", "on", "or", "the", "this", "to",
+    "what", "when", "where", "which", "who", "why", "with",
+}  # fmt: skip
+# Term frequency saturation, as in BM25; a single occurrence scores 1
+TERM_SATURATION = 1.2
+
+
+def split_terms(text: str) -> list[str]:
+    """Split text into lowercase terms: whole identifiers and their parts."""
+    terms = []
+    for identifier in IDENTIFIER_PATTERN.findall(text):
+        terms.append(identifier.lower())
+        parts = IDENTIFIER_PART_PATTERN.findall(identifier)
+        if len(parts) > 1:
+            terms.extend(part.lower() for part in parts)
+    return terms
+
+
+class LexicalReranker(BaseNodePostprocessor):
+    """
+    Rerank candidates by term overlap with the query and by defined symbols.
+
+    Each candidate scores a weighted sum of its first-stage rank, the
+    IDF-weighted BM25 match of the query terms (file names included) and
+    whether it defines a symbol named in the query. IDF is computed over the
+    candidates, so no corpus statistics and no network are needed.
+    """
+
+    rank_weight: float = Field(0.4, description="Weight of the first-stage rank")
+    lexical_weight: float = Field(0.4, description="Weight of the term overlap")
+    symbol_weight: float = Field(0.2, description="Weight of the symbol match")
+    symbol_lookup: Callable[[list[str]], dict[str, set[str]]] | None = Field(
+        None,
+        exclude=True,
+        description="Returns the names of the symbols defined in each chunk ID",
+    )
+
+    @classmethod
+    def class_name(cls: type[LexicalReranker]) -> str:
+        """Return the class name."""
+        return "LexicalReranker"
+
+    def _symbol_scores(
+        self: LexicalReranker, nodes: list[NodeWithScore], query: str
+    ) -> list[float]:
+        identifiers = set(IDENTIFIER_PATTERN.findall(query))
+        if self.symbol_lookup is None or not identifiers:
+            return [0.0] * len(nodes)
+        lowered = {identifier.lower() for identifier in identifiers}
+        symbols = self.symbol_lookup([node.node.node_id for node in nodes])
+        scores = []
+        for node in nodes:
+            score = 0.0
+            for name in symbols.get(node.node.node_id, ()):
+                # Methods may be qualified, e.g. "Agent:start"
+                short_name = QUALIFIED_NAME_SEPARATOR_PATTERN.split(name)[-1]
+                if name in identifiers or short_name in identifiers:
+                    score = 1.0
+                    break
+                if short_name.lower() in lowered:
+                    score = 0.5
+            scores.append(score)
+        return scores
+
+    def _postprocess_nodes(
+        self: LexicalReranker,
+        nodes: list[NodeWithScore],
+        query_bundle: QueryBundle | None = None,
+    ) -> list[NodeWithScore]:
+        if query_bundle is None or not nodes:
+            return nodes
+        query = query_bundle.query_str
+        query_terms = set(split_terms(query)) - STOPWORDS
+        node_terms = []
+        for node in nodes:
+            text = node.node.get_content()
+            uri = get_node_uri(node.node)
+            if uri:
+                text += " " + PurePosixPath(uri).name
+            node_terms.append(Counter(split_terms(text)))
+
+        count = len(nodes)
+        document_frequency = Counter(
+            term for terms in node_terms for term in query_terms & terms.keys()
+        )
+        idf = {
+            term: math.log(
+                1
+                + (count - document_frequency[term] + 0.5)
+                / (document_frequency[term] + 0.5)
+            )
+            for term in query_terms
+        }
+        total_idf = sum(idf.values()) or 1.0
+        symbol_scores = self._symbol_scores(nodes, query)
+
+        reranked = []
+        for rank, (node, terms, symbol_score) in enumerate(
+            zip(nodes, node_terms, symbol_scores, strict=True)
+        ):
+            lexical_score = (
+                sum(
+                    idf[term]
+                    * terms[term]
+                    * (TERM_SATURATION + 1)
+                    / (terms[term] + TERM_SATURATION)
+                    for term in query_terms
+                    if terms[term]
+                )
+                / total_idf
+            )
+            score = (
+                self.rank_weight * (1 - rank / count)
+                + self.lexical_weight * lexical_score
+                + self.symbol_weight * symbol_score
+            )
+            reranked.append(NodeWithScore(node=node.node, score=score))
+        reranked.sort(key=lambda node: node.score or 0.0, reverse=True)
+        return reranked
+
+
+def create_reranker(
+    name: str = RERANKER, **kwargs: Any  # noqa: ANN401
+) -> BaseNodePostprocessor | None:
+    """
+    Create the configured reranker, or None if reranking is disabled.
+
+    Args:
+        name: "none", "lexical", or "package.module:ClassName" of any node
+            postprocessor that can be created without arguments.
+        kwargs: Options of the lexical reranker.
+
+    Raises:
+        ValueError: If the reranker is unknown or cannot be loaded.
+
+    """
+    if name in ("", "none"):
+        return None
+    if name == "lexical":
+        return LexicalReranker(**kwargs)
+    module_name, _, class_name = name.partition(":")
+    try:
+        reranker_class = getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError, ValueError) as e:
+        error_msg = f"Unknown reranker: '{name}'"
+        raise ValueError(error_msg) from e
+    return reranker_class()
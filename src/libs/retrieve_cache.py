@@ -0,0 +1,78 @@
+"""LRU cache of retrieval results, keyed by request and resource generations."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from libs.embedding_cache import normalize_query
+
+RETRIEVE_CACHE_SIZE = int(os.getenv("RAG_RETRIEVE_CACHE_SIZE", "256"))
+# Upper bound on the age of a cached result, for content that changes without
+# being re-indexed, such as files edited while the watcher is debouncing;
+# 0 disables the cache
+RETRIEVE_CACHE_TTL = float(os.getenv("RAG_RETRIEVE_CACHE_TTL", "3600"))
+
+
+def make_retrieve_cache_key(
+    query: str,
+    base_uri: str,
+    top_k: int | None,
+    generations: list[tuple[int, int]],
+) -> tuple:
+    """
+    Return the cache key of a retrieve request.
+
+    ``generations`` are the ``(resource id, generation)`` pairs of the
+    resources the request searches. Indexing a resource increments its
+    generation, so results cached before the change are never served again.
+    """
+    return (normalize_query(query), base_uri, top_k, tuple(generations))
+
+
+class RetrieveCache:
+    """In-process LRU cache of retrieval results with a maximum age."""
+
+    def __init__(
+        self: RetrieveCache,
+        max_size: int = RETRIEVE_CACHE_SIZE,
+        ttl: float = RETRIEVE_CACHE_TTL,
+    ) -> None:
+        """Initialize the cache."""
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self: RetrieveCache, key: tuple) -> Any | None:  # noqa: ANN401
+        """Return the cached result for ``key``, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[1] >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self: RetrieveCache, key: tuple, result: Any) -> None:  # noqa: ANN401
+        """Cache ``result`` for ``key``."""
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (result, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self: RetrieveCache) -> None:
+        """Drop all cached results."""
+        with self._lock:
+            self._entries.clear()
+
+
+retrieve_cache = RetrieveCache()
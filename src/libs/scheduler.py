@@ -0,0 +1,149 @@
+"""Background scheduler for periodic refreshes of remote resources."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import zlib
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
+
+from libs.logger import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from models.resource import Resource
+
+# Default seconds between refreshes, overridable per resource
+REFRESH_INTERVAL = int(os.getenv("RAG_REFRESH_INTERVAL", "86400"))
+# Fraction of the interval used to spread refreshes of different resources
+REFRESH_JITTER = float(os.getenv("RAG_REFRESH_JITTER", "0.1"))
+REFRESH_CONCURRENCY = int(os.getenv("RAG_REFRESH_CONCURRENCY", "1"))
+REFRESH_POLL_INTERVAL = float(os.getenv("RAG_REFRESH_POLL_INTERVAL", "60"))
+
+
+class RefreshScheduler:
+    """
+    Periodically re-crawl remote resources whose refresh interval has passed.
+
+    Each resource gets a stable jitter derived from its URI, so resources
+    added together do not come due at the same moment. At most
+    ``concurrency`` refreshes run at once and never two for the same host,
+    which keeps the load on every site bounded by the per-host limits of the
+    shared HTTP client.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self: RefreshScheduler,
+        list_resources: Callable[[], list[Resource]],
+        refresh: Callable[[Resource], Awaitable[None]],
+        interval: int = REFRESH_INTERVAL,
+        jitter: float = REFRESH_JITTER,
+        concurrency: int = REFRESH_CONCURRENCY,
+        poll_interval: float = REFRESH_POLL_INTERVAL,
+    ) -> None:
+        """
+        Initialize the scheduler.
+
+        Args:
+            list_resources: Returns all known resources.
+            refresh: Coroutine that re-indexes a remote resource.
+            interval: Default seconds between refreshes of a resource.
+            jitter: Fraction of the interval added as a per-resource offset.
+            concurrency: Maximum number of refreshes running at once.
+            poll_interval: Seconds between checks for due resources.
+
+        """
+        self.list_resources = list_resources
+        self.refresh = refresh
+        self.interval = interval
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._running: dict[str, asyncio.Task[None]] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    def next_refresh_at(self: RefreshScheduler, resource: Resource) -> datetime | None:
+        """Return when ``resource`` is due (naive UTC), or None if refreshes are disabled."""
+        interval = (
+            self.interval
+            if resource.refresh_interval is None
+            else resource.refresh_interval
+        )
+        if interval <= 0:
+            return None
+        # Never finished or interrupted by a restart
+        if resource.last_indexed_at is None or resource.indexing_status in (
+            "pending",
+            "indexing",
+        ):
+            return datetime.min
+        fraction = zlib.crc32(resource.uri.encode()) / 0xFFFFFFFF
+        offset = interval * (1 + self.jitter * fraction)
+        return resource.last_indexed_at + timedelta(seconds=offset)
+
+    def refresh_due(self: RefreshScheduler) -> int:
+        """Start refreshes of due resources and return how many were started."""
+        now = datetime.now(UTC).replace(tzinfo=None)
+        busy_hosts = {urlparse(uri).netloc for uri in self._running}
+        started = 0
+        for resource in self.list_resources():
+            if len(self._running) >= self.concurrency:
+                break
+            if resource.status != "active" or resource.type != "remote":
+                continue
+            host = urlparse(resource.uri).netloc
+            if resource.uri in self._running or host in busy_hosts:
+                continue
+            next_refresh_at = self.next_refresh_at(resource)
+            if next_refresh_at is None or next_refresh_at > now:
+                continue
+            self._start(resource)
+            busy_hosts.add(host)
+            started += 1
+        return started
+
+    async def refresh_now(self: RefreshScheduler, resource: Resource) -> None:
+        """Refresh ``resource`` now, or wait for the refresh already in progress."""
+        await self._start(resource)
+
+    def _start(self: RefreshScheduler, resource: Resource) -> asyncio.Task[None]:
+        task = self._running.get(resource.uri)
+        if task is None:
+            task = asyncio.create_task(self._refresh(resource))
+            self._running[resource.uri] = task
+        return task
+
+    async def _refresh(self: RefreshScheduler, resource: Resource) -> None:
+        logger.info("Refreshing remote resource: %s", resource.uri)
+        try:
+            await self.refresh(resource)
+        except Exception:
+            logger.exception("Failed to refresh remote resource: %s", resource.uri)
+        finally:
+            del self._running[resource.uri]
+
+    async def _run(self: RefreshScheduler) -> None:
+        while True:
+            try:
+                self.refresh_due()
+            except Exception:
+                logger.exception("Failed to schedule remote resource refreshes")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self: RefreshScheduler) -> None:
+        """Start polling for due resources."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self: RefreshScheduler) -> None:
+        """Stop polling and cancel refreshes in progress."""
+        tasks = list(self._running.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,41 @@
+"""Coalescing of identical concurrent calls."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Hashable
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """
+    Run at most one call per key at a time and share its outcome.
+
+    Callers arriving while a call for the same key is in flight await that
+    call instead of starting their own. The shared call is shielded, so a
+    caller that gives up (e.g. a disconnected client) does not cancel it for
+    the others.
+    """
+
+    def __init__(self: SingleFlight[T]) -> None:
+        """Initialize the group."""
+        self._flights: dict[Hashable, asyncio.Future[T]] = {}
+
+    def in_flight(self: SingleFlight[T], key: Hashable) -> bool:
+        """Whether a call for ``key`` is running."""
+        return key in self._flights
+
+    async def run(
+        self: SingleFlight[T], key: Hashable, func: Callable[[], Awaitable[T]]
+    ) -> T:
+        """Return the result of ``func()``, joining a call for ``key`` already in flight."""
+        future = self._flights.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._flights[key] = future
+            future.add_done_callback(lambda _: self._flights.pop(key, None))
+        return await asyncio.shield(future)
@@ -0,0 +1,77 @@
+"""Count the LLM tokens reported by the providers."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any
+
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.events import BaseEvent
+from llama_index.core.instrumentation.events.llm import (
+    LLMChatEndEvent,
+    LLMCompletionEndEvent,
+)
+
+from libs.metrics import TOKENS_TOTAL
+
+# Usage fields of the raw responses: OpenAI compatible APIs, DashScope, Ollama
+PROMPT_TOKEN_FIELDS = ("prompt_tokens", "input_tokens", "prompt_eval_count")
+COMPLETION_TOKEN_FIELDS = ("completion_tokens", "output_tokens", "eval_count")
+
+
+def _get(value: Any, key: str) -> Any:  # noqa: ANN401
+    if isinstance(value, Mapping):
+        return value.get(key)
+    return getattr(value, key, None)
+
+
+def _first_count(usage: Any, fields: tuple[str, ...]) -> int:  # noqa: ANN401
+    for key in fields:
+        count = _get(usage, key)
+        if isinstance(count, int):
+            return count
+    return 0
+
+
+def usage_from_raw(raw: Any) -> tuple[int, int]:  # noqa: ANN401
+    """
+    Return the prompt and completion token counts of a raw provider response.
+
+    Responses without usage data count as zero tokens.
+    """
+    if raw is None:
+        return 0, 0
+    usage = _get(raw, "usage") or raw
+    return (
+        _first_count(usage, PROMPT_TOKEN_FIELDS),
+        _first_count(usage, COMPLETION_TOKEN_FIELDS),
+    )
+
+
+class TokenUsageHandler(BaseEventHandler):
+    """Add the token usage of finished LLM calls to ``rag_tokens_total``."""
+
+    @classmethod
+    def class_name(cls: type[TokenUsageHandler]) -> str:
+        """Class name."""
+        return "TokenUsageHandler"
+
+    def handle(self: TokenUsageHandler, event: BaseEvent, **kwargs: Any) -> None:  # noqa: ANN401, ARG002
+        """Count the tokens of chat and completion responses."""
+        if not isinstance(event, LLMChatEndEvent | LLMCompletionEndEvent):
+            return
+        if event.response is None:
+            return
+        prompt_tokens, completion_tokens = usage_from_raw(event.response.raw)
+        if prompt_tokens:
+            TOKENS_TOTAL.labels("prompt").inc(prompt_tokens)
+        if completion_tokens:
+            TOKENS_TOTAL.labels("completion").inc(completion_tokens)
+
+
+def install_token_usage_handler() -> None:
+    """Count the tokens of every LLM call made through LlamaIndex."""
+    dispatcher = get_dispatcher()
+    if not any(isinstance(h, TokenUsageHandler) for h in dispatcher.event_handlers):
+        dispatcher.add_event_handler(TokenUsageHandler())
@@ -64,3 +64,22 @@ def inject_uri_to_node(node: BaseNode) -> None:
     uri = get_node_uri(node)
     if uri:
         node.metadata[METADATA_KEY_URI] = uri
+
+
+def is_chunk_of(chunk: str, content: str) -> bool:
+    """
+    Check that a chunk still matches the content of the file it was split from.
+
+    Packed chunks join definitions or sections that are apart in the file, so
+    each of their non-blank lines must be a whole line of the file, in the
+    same order as in the chunk.
+    """
+    if chunk in content:
+        return True
+    # Each line is searched for after the previous one's match
+    lines = (line.strip() for line in content.splitlines())
+    return all(
+        any(line == expected for line in lines)
+        for expected in (line.strip() for line in chunk.splitlines())
+        if expected
+    )
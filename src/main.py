@@ -5,33 +5,81 @@ from __future__ import annotations
 # Standard library imports
 import asyncio
 import fcntl
+import hashlib
 import json
 import multiprocessing
 import os
-import re
 import shutil
 import subprocess
+import sys
 import threading
 import time
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import TYPE_CHECKING
-from urllib.parse import urljoin, urlparse
+from typing import TYPE_CHECKING, Any, Literal
 
 # Third-party imports
 import chromadb
 import httpx
 import pathspec
-from fastapi import BackgroundTasks, FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Response
+from fastapi.responses import StreamingResponse
 
 # Local application imports
-from libs.configs import BASE_DATA_DIR, CHROMA_PERSIST_DIR
+from libs.configs import BASE_DATA_DIR, CHROMA_PERSIST_DIR, VECTOR_SNAPSHOT_DIR
+from libs.context_budget import (
+    CONTEXT_PROMPT_RESERVE_TOKENS,
+    CONTEXT_TOKEN_BUDGET,
+    select_context,
+)
+from libs.crawler import SiteCrawler, is_url_in_scope, normalize_url
 from libs.db import init_db
+from libs.doc_split import DOC_EXT_MAP, DocFormat, DocumentSplitter, source_text
+from libs.embedding_cache import query_embedding_cache
+from libs.exact_search import (
+    EXACT_SEARCH_MAX_VECTORS,
+    VECTOR_BACKEND,
+    ExactSearchVectorStore,
+)
+from libs.file_summary import (
+    COARSE_FILE_CANDIDATES,
+    COARSE_MIN_FILES,
+    FILE_SUMMARY_DOC_ID_SUFFIX,
+    METADATA_KEY_FILE_SUMMARY,
+    build_file_summary,
+    is_file_summary,
+    is_file_summary_id,
+    is_under_uri,
+)
+from libs.html_markdown import html_converter
+from libs.hybrid_search import (
+    HYBRID_CANDIDATES,
+    exact_match_text,
+    reciprocal_rank_fusion,
+)
+from libs.http_client import http_client
 from libs.logger import logger
+from libs.rerank import RERANK_CANDIDATES, create_reranker
+from libs.retrieve_cache import make_retrieve_cache_key, retrieve_cache
+from libs.scheduler import RefreshScheduler
+from libs.single_flight import SingleFlight
+from libs.metrics import (
+    CACHE_HITS_TOTAL,
+    CACHE_MISSES_TOTAL,
+    CHUNKS_TOTAL,
+    QUEUE_DEPTH,
+    WATCHED_RESOURCES,
+    observe_stage,
+    render_metrics,
+    track_queue,
+)
+from libs.token_usage import install_token_usage_handler
 from libs.utils import (
+    METADATA_KEY_URI,
     get_node_uri,
     inject_uri_to_node,
+    is_chunk_of,
     is_local_uri,
     is_path_node,
     is_remote_uri,
@@ -92,26 +140,40 @@ from llama_index.core import (
     SimpleDirectoryReader,
     StorageContext,
     VectorStoreIndex,
+    get_response_synthesizer,
     load_index_from_storage,
 )
-from llama_index.core.schema import Document
+from llama_index.core.indices.utils import embed_nodes
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.schema import Document, MetadataMode, NodeWithScore, QueryBundle
 from llama_index.core.postprocessor import MetadataReplacementPostProcessor
+from llama_index.core.vector_stores import (
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+    VectorStoreQuery,
+)
 from llama_index.vector_stores.chroma import ChromaVectorStore
-from markdownify import markdownify as md
+from models.crawl_state import CrawlState
+from models.indexing_history import IndexingHistory
 from models.resource import Resource
+from models.symbol import Symbol
 from providers.factory import initialize_embed_model, initialize_llm_model
 from pydantic import BaseModel, Field
+from services.crawl_state import crawl_state_service
+from services.fulltext import fulltext_service
 from services.indexing_history import indexing_history_service
 from services.resource import resource_service
+from services.symbol import symbol_service
 from tree_sitter_language_pack import SupportedLanguage
 from watchdog.events import FileSystemEvent, FileSystemEventHandler
 from watchdog.observers import Observer
 
 if TYPE_CHECKING:
-    from collections.abc import AsyncGenerator
+    from collections.abc import AsyncGenerator, Iterator
 
-    from llama_index.core.schema import NodeWithScore, QueryBundle
-    from models.indexing_history import IndexingHistory
+    from llama_index.core.schema import BaseNode
+    from llama_index.core.vector_stores.types import BasePydanticVectorStore
     from watchdog.observers.api import BaseObserver
 
 # Lock file for leader election
@@ -149,6 +211,9 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:  # noqa: ARG001
     if is_leader:
         logger.info("Starting RAG service as leader (PID: %d)...", os.getpid())
 
+        # Chunks indexed before the full-text index existed
+        await asyncio.to_thread(backfill_fulltext_index)
+
         # Get all active resources
         active_resources = [
             r for r in resource_service.get_all_resources() if r.status == "active"
@@ -173,21 +238,15 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:  # noqa: ARG001
                     observer.schedule(event_handler, str(directory), recursive=True)
                     observer.start()
                     watched_resources[resource.uri] = observer
+                    WATCHED_RESOURCES.set(len(watched_resources))
 
                     # Start indexing
                     await index_local_resource_async(resource)
 
                 elif is_remote_uri(resource.uri):
-                    if not is_remote_resource_exists(resource.uri):
-                        error_msg = "HTTPS resource not found"
-                        logger.error("%s: %s", error_msg, resource.uri)
-                        resource_service.update_resource_status(
-                            resource.uri, "error", error_msg
-                        )
-                        continue
-
-                    # Start indexing
-                    await index_remote_resource_async(resource)
+                    # Re-crawled by the refresh scheduler once due, so that a
+                    # restart does not re-crawl every site at once
+                    continue
 
                 logger.debug("Successfully synced resource: %s", resource.uri)
 
@@ -198,13 +257,20 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:  # noqa: ARG001
                     resource.uri, "error", error_msg
                 )
 
+        refresh_scheduler.start()
+
     yield
 
     # Cleanup on shutdown (only in leader)
     if is_leader:
+        await refresh_scheduler.stop()
         for observer in watched_resources.values():
             observer.stop()
             observer.join()
+        WATCHED_RESOURCES.set(0)
+
+    await http_client.aclose()
+    html_converter.shutdown()
 
 
 app = FastAPI(
@@ -229,9 +295,11 @@ SIMILARITY_THRESHOLD = 0.95
 MAX_SAMPLE_SIZE = 100
 BATCH_PROCESSING_DELAY = 1
 
-# number of cpu cores to use for parallel processing
-MAX_WORKERS = multiprocessing.cpu_count()
+# number of parallel indexing workers; embedding is network bound, so this may
+# exceed the number of cpu cores
+MAX_WORKERS = int(os.getenv("RAG_MAX_WORKERS", str(multiprocessing.cpu_count())))
 BATCH_SIZE = 40  # Number of documents to process per batch
+RETRIEVE_BATCH_MAX_QUERIES = int(os.getenv("RAG_RETRIEVE_BATCH_MAX_QUERIES", "64"))
 
 logger.info("data dir: %s", BASE_DATA_DIR.resolve())
 
@@ -240,7 +308,16 @@ watched_resources: dict[
     str, BaseObserver
 ] = {}  # Directory path -> Observer instance mapping
 file_last_modified: dict[Path, float] = {}  # File path -> Last modified time mapping
+# Symbols of split documents, stored once the documents are indexed
+pending_symbols: dict[str, list[Symbol]] = {}  # Document ID -> Symbols mapping
+# Serializes vector store writes only; embedding happens outside of it
 index_lock = threading.Lock()
+reranker = create_reranker(symbol_lookup=symbol_service.get_symbol_names)
+# Candidates taken from each index; a reranker can afford a larger pool
+RETRIEVE_CANDIDATES = RERANK_CANDIDATES if reranker is not None else HYBRID_CANDIDATES
+# Identical retrieve requests in flight, keyed like the retrieve cache
+retrieve_flights: SingleFlight[dict[str, Any]] = SingleFlight()
+document_splitter = DocumentSplitter()
 
 code_ext_map: dict[str, SupportedLanguage] = {
     ".py": "python",
@@ -323,63 +400,90 @@ required_exts = [
 ]
 
 
-http_headers = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
-}
-
-
-def is_remote_resource_exists(url: str) -> bool:
+async def is_remote_resource_exists(url: str) -> bool:
     """Check if a URL exists."""
     try:
-        response = httpx.head(url, headers=http_headers)
+        response = await http_client.head(url)
         return response.status_code in {
             httpx.codes.OK,
             httpx.codes.MOVED_PERMANENTLY,
             httpx.codes.FOUND,
         }
-    except (OSError, ValueError, RuntimeError) as e:
+    except (httpx.HTTPError, OSError, ValueError, RuntimeError) as e:
         logger.error("Error checking if URL exists %s: %s", url, e)
         return False
 
 
-def fetch_markdown(url: str) -> str:
-    """Fetch markdown content from a URL."""
+async def fetch_page(url: str, resource_uri: str) -> tuple[str, list[str] | None]:
+    """
+    Fetch markdown content and links from a URL.
+
+    Pages that did not change since the last crawl are detected with a
+    conditional GET or, failing that, the hash of the body. For those the
+    download or markdown conversion is skipped: the returned markdown is ""
+    and the links are the ones stored from the previous crawl.
+    """
+    state = crawl_state_service.get_crawl_state(url)
+    headers = {}
+    if state and state.etag:
+        headers["If-None-Match"] = state.etag
+    if state and state.last_modified:
+        headers["If-Modified-Since"] = state.last_modified
+
     try:
         logger.info("Fetching markdown content from %s", url)
-        response = httpx.get(url, headers=http_headers)
-        if response.status_code == httpx.codes.OK:
-            return md(response.text)
-        return ""
-    except (OSError, ValueError, RuntimeError) as e:
+        with observe_stage("fetch"):
+            response = await http_client.get(url, headers=headers)
+    except (httpx.HTTPError, OSError, ValueError, RuntimeError) as e:
         logger.error("Error fetching markdown content %s: %s", url, e)
-        return ""
-
-
-def markdown_to_links(base_url: str, markdown: str) -> list[str]:
-    """Extract links from markdown content."""
-    links = []
-    seek = {base_url}
-    parsed_url = urlparse(base_url)
-    domain = parsed_url.netloc
-    scheme = parsed_url.scheme
-    for match in re.finditer(r"\[(.*?)\]\((.*?)\)", markdown):
-        url = match.group(2)
-        if not url.startswith(scheme):
-            url = urljoin(base_url, url)
-        if urlparse(url).netloc != domain:
-            continue
-        if url in seek:
-            continue
-        seek.add(url)
-        links.append(url)
-    return links
+        return "", []
+
+    if response.status_code == httpx.codes.NOT_MODIFIED and state:
+        logger.debug("Page not modified, skipping: %s", url)
+        CACHE_HITS_TOTAL.labels("crawl").inc()
+        crawl_state_service.touch_crawl_state(url)
+        return "", state.links
+    if response.status_code != httpx.codes.OK:
+        return "", []
+
+    content_hash = hashlib.sha256(response.content).hexdigest()
+    new_state = CrawlState(
+        url=url,
+        resource_uri=resource_uri,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+        content_hash=content_hash,
+    )
+    if state and state.content_hash == content_hash:
+        logger.debug("Page content unchanged, skipping: %s", url)
+        CACHE_HITS_TOTAL.labels("crawl").inc()
+        new_state.links = state.links
+        crawl_state_service.save_crawl_state(new_state)
+        return "", state.links
+
+    CACHE_MISSES_TOTAL.labels("crawl").inc()
+    try:
+        with observe_stage("convert"):
+            markdown, new_state.links = await html_converter.convert(
+                response.text, url
+            )
+    except Exception:  # noqa: BLE001
+        # A page that cannot be converted must not stop the crawl
+        logger.exception("Error converting %s to markdown", url)
+        crawl_state_service.delete_crawl_state(url)
+        return "", []
+    crawl_state_service.save_crawl_state(new_state)
+    return markdown, new_state.links
 
 
 # Initialize database
 init_db()
 
 # Initialize ChromaDB and LlamaIndex services
-chroma_client = chromadb.PersistentClient(path=str(CHROMA_PERSIST_DIR))
+# Reset when the embedding model changes
+chroma_client = chromadb.PersistentClient(
+    path=str(CHROMA_PERSIST_DIR), settings=chromadb.Settings(allow_reset=True)
+)
 
 # # Check if provider or model has changed
 rag_embed_provider = os.getenv("RAG_EMBED_PROVIDER", "openai")
@@ -406,14 +510,50 @@ if config_file.exists():
             # Clear existing data if config changed
             logger.info("Detected config change, clearing existing data...")
             chroma_client.reset()
+            shutil.rmtree(VECTOR_SNAPSHOT_DIR, ignore_errors=True)
+            # Everything derived from the wiped chunks must be rebuilt with them
+            crawl_state_service.delete_all_crawl_states()
+            fulltext_service.delete_all_nodes()
+            symbol_service.delete_all_symbols()
+            indexing_history_service.delete_all_indexing_statuses()
+            resource_service.increment_all_generations()
 
 # Save current config
 with Path.open(config_file, "w") as f:
     json.dump({"provider": rag_embed_provider, "embed_model": rag_embed_model}, f)
 
+
+def create_vector_store(collection: chromadb.Collection) -> BasePydanticVectorStore:
+    """
+    Create the vector store of a Chroma collection for ``RAG_VECTOR_BACKEND``.
+
+    Raises:
+        ValueError: If the backend is unknown.
+
+    """
+    store = ChromaVectorStore(chroma_collection=collection)
+    if VECTOR_BACKEND == "chroma":
+        return store
+    if VECTOR_BACKEND == "auto":
+        max_vectors = EXACT_SEARCH_MAX_VECTORS
+    elif VECTOR_BACKEND == "exact":
+        max_vectors = sys.maxsize
+    else:
+        error_msg = f"Unknown vector backend: '{VECTOR_BACKEND}'"
+        raise ValueError(error_msg)
+    return ExactSearchVectorStore(
+        store, VECTOR_SNAPSHOT_DIR / collection.name, max_vectors=max_vectors
+    )
+
+
 chroma_collection = chroma_client.get_or_create_collection("documents")  # pyright: ignore
-vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
+vector_store = create_vector_store(chroma_collection)
 storage_context = StorageContext.from_defaults(vector_store=vector_store)
+# One summary per file, for shortlisting files before searching their chunks
+summary_collection = chroma_client.get_or_create_collection("files")  # pyright: ignore
+summary_vector_store = create_vector_store(summary_collection)
+# Files indexed before symbols were stored get theirs when they are next scanned
+symbols_backfill = symbol_service.count_symbols() == 0 and chroma_collection.count() > 0
 
 try:
     embed_extra = json.loads(rag_embed_extra) if rag_embed_extra is not None else {}
@@ -459,6 +599,19 @@ except (ValueError, RuntimeError) as e:
 
 Settings.embed_model = embed_model
 Settings.llm = llm_model
+install_token_usage_handler()
+
+# Providers whose query embeddings equal document embeddings, so that the
+# queries of a batch can be embedded in one call
+BATCH_QUERY_EMBED_PROVIDERS = {"openai", "ollama", "fake"}
+
+# Identifies the embedding space of query embeddings in the cache
+embed_model_key = hashlib.sha256(
+    json.dumps(
+        [rag_embed_provider, rag_embed_endpoint, rag_embed_model, embed_extra],
+        sort_keys=True,
+    ).encode()
+).hexdigest()[:16]
 
 
 try:
@@ -478,6 +631,10 @@ class ResourceRequest(ResourceURIRequest):
     """Request model for resource operations."""
 
     name: str = Field(..., description="Name of the resource to watch and index")
+    refresh_interval: int | None = Field(
+        None,
+        description="Seconds between refreshes of a remote resource (default if unset, disabled if <= 0)",
+    )
 
 
 class SourceDocument(BaseModel):
@@ -501,6 +658,15 @@ class RetrieveRequest(BaseModel):
     )
 
 
+class RetrieveStreamRequest(RetrieveRequest):
+    """Request model for streaming information retrieval."""
+
+    format: Literal["sse", "ndjson"] = Field(
+        "sse",
+        description="Stream as Server-Sent Events or as newline-delimited JSON",
+    )
+
+
 class RetrieveResponse(BaseModel):
     """Response model for information retrieval."""
 
@@ -510,6 +676,35 @@ class RetrieveResponse(BaseModel):
     )
 
 
+class BatchRetrieveRequest(BaseModel):
+    """Request model for retrieving information for several queries."""
+
+    queries: list[RetrieveRequest] = Field(
+        ...,
+        description="Retrieve requests, each with its own query, base URI and top_k",
+        min_length=1,
+        max_length=RETRIEVE_BATCH_MAX_QUERIES,
+    )
+
+
+class BatchRetrieveResult(BaseModel):
+    """Result of one query of a batch."""
+
+    status_code: int = Field(..., description="HTTP status the query would have had on its own")
+    result: RetrieveResponse | None = Field(
+        None, description="Response and sources, if the query succeeded"
+    )
+    error: str | None = Field(None, description="Error detail, if the query failed")
+
+
+class BatchRetrieveResponse(BaseModel):
+    """Response model for batch retrieval."""
+
+    results: list[BatchRetrieveResult] = Field(
+        ..., description="Results in the order of the queries"
+    )
+
+
 class FileSystemHandler(FileSystemEventHandler):
     """Handler for file system events."""
 
@@ -572,12 +767,139 @@ def clean_text(text: str) -> str:
     return "".join(char for char in text if char.isprintable() or char in "\n\r\t")
 
 
+def embed_documents(documents: list[Document]) -> tuple[list[Document], list[BaseNode]]:
+    """
+    Chunk and embed the documents whose content differs from the index.
+
+    This runs without holding ``index_lock`` so that concurrent batches can
+    wait on the embedding provider in parallel.
+
+    Returns:
+        The changed documents and their embedded nodes.
+
+    """
+    changed_documents = [
+        doc
+        for doc in documents
+        if index.docstore.get_document_hash(doc.doc_id) != doc.hash
+    ]
+    if not changed_documents:
+        return [], []
+
+    nodes = run_transformations(changed_documents, Settings.transformations)
+    with observe_stage("embed"):
+        id_to_embedding = embed_nodes(nodes, embed_model)
+    for node in nodes:
+        node.embedding = id_to_embedding[node.node_id]
+    return changed_documents, nodes
+
+
+def upsert_nodes(documents: list[Document], nodes: list[BaseNode]) -> None:
+    """Replace the indexed nodes of the documents with already embedded nodes."""
+    chunk_nodes = [node for node in nodes if not is_file_summary(node)]
+    summary_nodes = [node for node in nodes if is_file_summary(node)]
+    with index_lock, observe_stage("vector_upsert"):
+        for doc in documents:
+            if index.docstore.get_document_hash(doc.doc_id) is None:
+                continue
+            if is_file_summary(doc):
+                summary_vector_store.delete(doc.doc_id)
+            else:
+                index.delete_ref_doc(doc.doc_id, delete_from_docstore=True)
+        index.insert_nodes(chunk_nodes)
+        store_symbols([doc.doc_id for doc in documents], chunk_nodes)
+        if summary_nodes:
+            summary_vector_store.add(summary_nodes)
+        for doc in documents:
+            index.docstore.set_document_hash(doc.doc_id, doc.hash)
+        fulltext_service.replace_nodes(
+            [doc.doc_id for doc in documents if not is_file_summary(doc)], chunk_nodes
+        )
+    # Invalidates cached retrieval results of the resources
+    resource_service.increment_generations(
+        sorted({uri for doc in documents if (uri := get_node_uri(doc))})
+    )
+    CHUNKS_TOTAL.inc(len(chunk_nodes))
+
+
+def store_symbols(doc_ids: list[str], nodes: list[BaseNode] | None = None) -> None:
+    """
+    Store the pending symbols of indexed documents.
+
+    Each symbol points at the chunk of its document that contains its name,
+    taken from ``nodes`` or, when backfilling the symbols of a document that
+    was indexed before, from the vector store.
+    """
+    symbols_by_doc = {
+        doc_id: pending_symbols.pop(doc_id)
+        for doc_id in doc_ids
+        if doc_id in pending_symbols
+    }
+    if not symbols_by_doc:
+        return
+    if nodes is None:
+        result = chroma_collection.get(
+            where={"ref_doc_id": {"$in": list(symbols_by_doc)}},
+            include=["documents", "metadatas"],
+        )
+        chunks = [
+            (metadata["ref_doc_id"], node_id, text)
+            for node_id, text, metadata in zip(
+                result["ids"],
+                result["documents"] or [],
+                result["metadatas"] or [],
+                strict=True,
+            )
+        ]
+    else:
+        chunks = [
+            (
+                node.ref_doc_id,
+                node.node_id,
+                node.get_content(metadata_mode=MetadataMode.NONE),
+            )
+            for node in nodes
+        ]
+    chunks_by_doc: dict[str, list[tuple[str, str]]] = {}
+    for doc_id, node_id, text in chunks:
+        chunks_by_doc.setdefault(str(doc_id), []).append((node_id, text))
+
+    symbols = []
+    for doc_id, doc_symbols in symbols_by_doc.items():
+        doc_chunks = chunks_by_doc.get(doc_id, [])
+        for symbol in doc_symbols:
+            # Methods may be qualified, e.g. "Agent:start"
+            short_name = symbol.name.replace(":", ".").rsplit(".", 1)[-1]
+            symbol.chunk_id = next(
+                (node_id for node_id, text in doc_chunks if short_name in text),
+                doc_chunks[0][0] if doc_chunks else None,
+            )
+            symbols.append(symbol)
+    symbol_service.replace_symbols(list(symbols_by_doc), symbols)
+
+
+def backfill_fulltext_index(batch_size: int = 1000) -> None:
+    """Fill an empty full-text index from the chunks already in the vector store."""
+    total = chroma_collection.count()
+    if total == 0 or fulltext_service.count_nodes() > 0:
+        return
+    logger.info("Building full-text index from %d indexed chunks", total)
+    with index_lock:
+        for offset in range(0, total, batch_size):
+            node_ids = chroma_collection.get(
+                limit=batch_size, offset=offset, include=[]
+            )["ids"]
+            if node_ids:
+                fulltext_service.add_nodes(vector_store.get_nodes(node_ids))
+
+
 def process_document_batch(documents: list[Document]) -> bool:  # noqa: PLR0915, C901, PLR0912, RUF100
     """Process a batch of documents for embedding."""
     try:
         # Filter out invalid and already processed documents
         valid_documents = []
         invalid_documents = []
+        unchanged_doc_ids = []
         for doc in documents:
             doc_id = doc.doc_id
 
@@ -588,6 +910,7 @@ def process_document_batch(documents: list[Document]) -> bool:  # noqa: PLR0915,
                     "Document with same hash already processed, skipping: %s",
                     doc.doc_id,
                 )
+                unchanged_doc_ids.append(doc.doc_id)
                 continue
 
             logger.debug("Processing document: %s", doc.doc_id)
@@ -644,8 +967,14 @@ def process_document_batch(documents: list[Document]) -> bool:  # noqa: PLR0915,
 
         try:
             if valid_documents:
-                with index_lock:
-                    index.refresh_ref_docs(valid_documents)
+                changed_documents, nodes = embed_documents(valid_documents)
+                if changed_documents:
+                    upsert_nodes(changed_documents, nodes)
+            if symbols_backfill:
+                # Symbols of upserted documents are already stored
+                store_symbols(
+                    unchanged_doc_ids + [doc.doc_id for doc in valid_documents]
+                )
 
             # Update status to completed for successfully processed documents
             for doc in valid_documents:
@@ -677,6 +1006,11 @@ def process_document_batch(documents: list[Document]) -> bool:  # noqa: PLR0915,
             )
         return False
 
+    finally:
+        # Symbols of documents that failed are dropped with them
+        for doc in documents:
+            pending_symbols.pop(doc.doc_id, None)
+
 
 def get_gitignore_files(directory: Path) -> list[str]:
     """Get patterns from .gitignore file."""
@@ -788,6 +1122,12 @@ def get_pathspec(directory: Path) -> pathspec.PathSpec | None:
 
 def scan_directory(directory: Path) -> list[str]:
     """Scan directory and return a list of matched files."""
+    with observe_stage("scan"):
+        return _scan_directory(directory)
+
+
+def _scan_directory(directory: Path) -> list[str]:
+    """Walk the directory, skipping binary and ignored files."""
     spec = get_pathspec(directory)
 
     binary_extensions = [
@@ -917,15 +1257,12 @@ def update_index_for_file(directory: Path, abs_file_path: Path) -> None:
 
     resource_service.update_resource_indexing_status(resource.uri, "indexing", "")
 
-    documents = SimpleDirectoryReader(
-        input_files=[abs_file_path],
-        filename_as_id=True,
-        required_exts=required_exts,
-    ).load_data()
+    with track_queue("file_updates"):
+        documents = load_documents([abs_file_path])
 
-    logger.debug("Updating index: %s", abs_file_path)
-    processed_documents = split_documents(documents)
-    success = process_document_batch(processed_documents)
+        logger.debug("Updating index: %s", abs_file_path)
+        processed_documents = split_documents(documents)
+        success = process_document_batch(processed_documents)
 
     if success:
         resource_service.update_resource_indexing_status(resource.uri, "indexed", "")
@@ -937,8 +1274,51 @@ def update_index_for_file(directory: Path, abs_file_path: Path) -> None:
         logger.error("File indexing failed: %s", abs_file_path)
 
 
+def load_documents(input_files: list[Path] | list[str]) -> list[Document]:
+    """Load files into documents."""
+    with observe_stage("load"):
+        return SimpleDirectoryReader(
+            input_files=input_files,
+            filename_as_id=True,
+            required_exts=required_exts,
+        ).load_data()
+
+
 def split_documents(documents: list[Document]) -> list[Document]:
     """Split documents into code and non-code documents."""
+    with observe_stage("split"):
+        return _split_documents(documents)
+
+
+def split_structured_document(
+    doc: Document, doc_format: DocFormat, base_url: str = ""
+) -> list[Document]:
+    """Split a markdown, rst or html document into sections along its headings."""
+    chunks = document_splitter.split_text(doc.get_content(), doc_format, base_url)
+    if len(chunks) <= 1:
+        doc.metadata["orig_doc_id"] = doc.doc_id
+        if chunks:
+            doc.set_content(chunks[0].text)
+            doc.metadata["breadcrumb"] = chunks[0].breadcrumb_text
+        return [doc]
+    return [
+        Document(
+            text=chunk.text,
+            doc_id=f"{doc.doc_id}__part_{chunk_number}",
+            metadata={
+                **doc.metadata,
+                "chunk_number": chunk_number,
+                "total_chunks": len(chunks),
+                "breadcrumb": chunk.breadcrumb_text,
+                "orig_doc_id": doc.doc_id,
+            },
+        )
+        for chunk_number, chunk in enumerate(chunks)
+    ]
+
+
+def _split_documents(documents: list[Document]) -> list[Document]:
+    """Split code and structured documents, passing others through."""
     # Initialize CodeSplitter with our language mapping
     code_splitter = CodeSplitter(LANGUAGE_NODE_MAP)
 
@@ -953,6 +1333,9 @@ def split_documents(documents: list[Document]) -> list[Document]:
         file_path = uri_to_path(uri)
         print(file_path)
         file_ext = file_path.suffix.lower()
+        file_content = doc.get_content()
+        # Symbols or headings of the file, for its summary
+        outline: list[str] = []
         if file_ext in code_ext_map:
             # Apply CodeSplitter to code files
             language = code_ext_map.get(file_ext, "python")
@@ -963,33 +1346,65 @@ def split_documents(documents: list[Document]) -> list[Document]:
                     content = content.decode("utf-8", errors="replace")
 
                 # Use our custom code splitter
-                split_results = code_splitter.split_text(content, language)
+                # Keep the parse tree so that the next save is parsed incrementally
+                code_blocks, code_symbols = code_splitter.split_blocks(
+                    content, language, cache_key=uri
+                )
+                code_blocks = [block for block in code_blocks if block.content.strip()]
 
                 logger.debug(
-                    "Split results for %s: %s", uri, list(split_results.keys())
+                    "Split %s into %d blocks with %d symbols",
+                    uri,
+                    len(code_blocks),
+                    len(code_symbols),
                 )
 
-                # Convert split results to documents
+                # Convert split results to documents, in line order
                 chunk_number = 0
-                for category, code_blocks in split_results.items():
-                    for code_block in code_blocks:
-                        if code_block.strip():  # Only include non-empty blocks
-                            new_doc = Document(
-                                text=code_block,
-                                doc_id=f"{doc.doc_id}__part_{chunk_number}",
-                                metadata={
-                                    **doc.metadata,
-                                    "chunk_number": chunk_number,
-                                    "total_chunks": sum(
-                                        len(blocks) for blocks in split_results.values()
-                                    ),
-                                    "language": language,
-                                    "category": category,
-                                    "orig_doc_id": doc.doc_id,
-                                },
-                            )
-                            processed_documents.append(new_doc)
-                            chunk_number += 1
+                for code_block in code_blocks:
+                    new_doc = Document(
+                        text=code_block.content,
+                        doc_id=f"{doc.doc_id}__part_{chunk_number}",
+                        metadata={
+                            **doc.metadata,
+                            "chunk_number": chunk_number,
+                            "total_chunks": len(code_blocks),
+                            "language": language,
+                            "category": code_block.category,
+                            "orig_doc_id": doc.doc_id,
+                        },
+                    )
+                    processed_documents.append(new_doc)
+                    chunk_number += 1
+
+                # Every symbol belongs to the smallest chunk containing its
+                # definition; chunks without symbols drop their old ones
+                part_ids = [
+                    f"{doc.doc_id}__part_{number}" for number in range(chunk_number)
+                ] or [doc.doc_id]
+                file_symbols: dict[str, list[Symbol]] = {
+                    part_id: [] for part_id in part_ids
+                }
+                for code_symbol in code_symbols:
+                    containing = [
+                        (block.end_line - block.start_line, number)
+                        for number, block in enumerate(code_blocks)
+                        if block.start_line <= code_symbol.start_line <= block.end_line
+                    ]
+                    part_id = part_ids[min(containing)[1] if containing else 0]
+                    file_symbols[part_id].append(
+                        Symbol(
+                            name=code_symbol.name,
+                            kind=code_symbol.kind,
+                            uri=uri,
+                            language=language,
+                            start_line=code_symbol.start_line,
+                            end_line=code_symbol.end_line,
+                            doc_id=part_id,
+                        )
+                    )
+                pending_symbols.update(file_symbols)
+                outline = [f"{symbol.kind} {symbol.name}" for symbol in code_symbols]
 
                 # If no valid code blocks were found, add the original document
                 if chunk_number == 0:
@@ -1006,64 +1421,98 @@ def split_documents(documents: list[Document]) -> list[Document]:
                 doc.metadata["orig_doc_id"] = doc.doc_id
                 doc.metadata["language"] = language
                 processed_documents.append(doc)
-                continue
+
+        elif file_ext in DOC_EXT_MAP:
+            sections = split_structured_document(doc, DOC_EXT_MAP[file_ext], uri)
+            processed_documents.extend(sections)
+            outline = [section.metadata.get("breadcrumb", "") for section in sections]
 
         else:
             doc.metadata["orig_doc_id"] = doc.doc_id
             # Add non-code files directly
             processed_documents.append(doc)
-    return processed_documents
-
 
-async def index_remote_resource_async(resource: Resource) -> None:
-    """Asynchronously index a remote resource."""
-    resource_service.update_resource_indexing_status(resource.uri, "indexing", "")
-    url = resource.uri
-    try:
-        logger.debug("Loading resource content: %s", url)
+        # Embedded into the summary index instead of the chunk index
+        processed_documents.append(
+            Document(
+                text=build_file_summary(str(file_path), outline, file_content),
+                doc_id=doc.doc_id + FILE_SUMMARY_DOC_ID_SUFFIX,
+                metadata={
+                    METADATA_KEY_URI: uri,
+                    METADATA_KEY_FILE_SUMMARY: True,
+                    "orig_doc_id": doc.doc_id,
+                },
+            )
+        )
+    return processed_documents
 
-        # Fetch markdown content
-        markdown = fetch_markdown(url)
 
-        link_md_pairs = [(url, markdown)]
+def submit_batch(
+    executor: ThreadPoolExecutor, batch: list[Document]
+) -> asyncio.Future[bool]:
+    """Schedule a document batch on the executor, tracking it as pending."""
+    pending = QUEUE_DEPTH.labels("index_batches")
+    pending.inc()
 
-        # Extract links from markdown
-        links = markdown_to_links(url, markdown)
+    def process_queued_batch() -> bool:
+        try:
+            return process_document_batch(batch)
+        finally:
+            pending.dec()
 
-        logger.debug("Found %d sub links", len(links))
-        logger.debug("Link list: %s", links)
+    return asyncio.get_running_loop().run_in_executor(executor, process_queued_batch)
 
-        # Use thread pool for parallel batch processing
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            mds: list[str] = await loop.run_in_executor(
-                executor,
-                lambda: list(executor.map(fetch_markdown, links)),
-            )
 
-        zipped = zip(links, mds, strict=True)  # pyright: ignore
-        link_md_pairs.extend(zipped)
+async def process_batches_async(batches: list[list[Document]]) -> list[bool]:
+    """Process document batches in parallel on a thread pool."""
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # Submit batches individually so that each one occupies its own worker
+        return await asyncio.gather(*(submit_batch(executor, batch) for batch in batches))
 
-        # Create documents from links
-        documents = [
-            Document(text=markdown, doc_id=link) for link, markdown in link_md_pairs
-        ]
 
-        logger.debug("Found %d documents", len(documents))
-        logger.debug("Document list: %s", [doc.doc_id for doc in documents])
+async def index_remote_resource_async(resource: Resource) -> None:
+    """Asynchronously index a remote resource."""
+    resource_service.update_resource_indexing_status(resource.uri, "indexing", "")
+    url = resource.uri
+    try:
+        logger.debug("Loading resource content: %s", url)
 
-        # Process documents in batches
-        total_documents = len(documents)
-        batches = [
-            documents[i : i + BATCH_SIZE] for i in range(0, total_documents, BATCH_SIZE)
-        ]
-        logger.debug("Splitting documents into %d batches for processing", len(batches))
+        crawler = SiteCrawler(
+            url, lambda page_url: fetch_page(page_url, resource.uri)
+        )
 
+        # Embed pages batch by batch while the crawl is still running
+        futures: list[asyncio.Future[bool]] = []
+        batches: list[list[Document]] = []
+        batch: list[Document] = []
         with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            results = await loop.run_in_executor(
-                executor,
-                lambda: list(executor.map(process_document_batch, batches)),
+            async for page_url, markdown in crawler.crawl():
+                with observe_stage("split"):
+                    batch.extend(
+                        split_structured_document(
+                            Document(text=markdown, doc_id=page_url), "markdown"
+                        )
+                    )
+                if len(batch) >= BATCH_SIZE:
+                    batches.append(batch)
+                    futures.append(submit_batch(executor, batch))
+                    batch = []
+            if batch:
+                batches.append(batch)
+                futures.append(submit_batch(executor, batch))
+
+            logger.debug(
+                "Crawled %d pages into %d batches", len(crawler.seen), len(futures)
             )
+            results = await asyncio.gather(*futures)
+
+        # Forget the crawl state of failed pages so that they are fully re-fetched
+        for failed_batch, success in zip(batches, results, strict=True):
+            if not success:
+                for doc in failed_batch:
+                    crawl_state_service.delete_crawl_state(
+                        normalize_url(doc.metadata["orig_doc_id"])
+                    )
 
         # Check processing results
         if all(results):
@@ -1081,7 +1530,7 @@ async def index_remote_resource_async(resource: Resource) -> None:
                 resource.uri, "indexed", error_msg
             )
 
-    except OSError as e:
+    except Exception as e:
         error_msg = f"Resource indexing failed: {url}"
         logger.exception(error_msg)
         resource_service.update_resource_indexing_status(
@@ -1090,6 +1539,11 @@ async def index_remote_resource_async(resource: Resource) -> None:
         raise e  # noqa: TRY201
 
 
+refresh_scheduler = RefreshScheduler(
+    resource_service.get_all_resources, index_remote_resource_async
+)
+
+
 async def index_local_resource_async(resource: Resource) -> None:
     """Asynchronously index a directory."""
     resource_service.update_resource_indexing_status(resource.uri, "indexing", "")
@@ -1097,11 +1551,7 @@ async def index_local_resource_async(resource: Resource) -> None:
     try:
         logger.info("Loading directory content: %s", directory_path)
 
-        documents = SimpleDirectoryReader(
-            input_files=scan_directory(directory_path),
-            filename_as_id=True,
-            required_exts=required_exts,
-        ).load_data()
+        documents = load_documents(scan_directory(directory_path))
 
         processed_documents = split_documents(documents)
 
@@ -1116,13 +1566,7 @@ async def index_local_resource_async(resource: Resource) -> None:
         ]
         logger.info("Splitting documents into %d batches for processing", len(batches))
 
-        # Use thread pool for parallel batch processing
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            results = await loop.run_in_executor(
-                executor,
-                lambda: list(executor.map(process_document_batch, batches)),
-            )
+        results = await process_batches_async(batches)
 
         # Check processing results
         if all(results):
@@ -1206,15 +1650,16 @@ async def add_resource(request: ResourceRequest, background_tasks: BackgroundTas
         observer.schedule(event_handler, str(directory), recursive=True)
         observer.start()
         watched_resources[request.uri] = observer
+        WATCHED_RESOURCES.set(len(watched_resources))
 
         background_task = index_local_resource_async
     elif is_remote_uri(request.uri):
-        if not is_remote_resource_exists(request.uri):
+        if not await is_remote_resource_exists(request.uri):
             raise HTTPException(status_code=404, detail="web resource not found")
 
         resource_type = "remote"
 
-        background_task = index_remote_resource_async
+        background_task = refresh_scheduler.refresh_now
     else:
         raise HTTPException(status_code=400, detail=f"Invalid URI: {request.uri}")
 
@@ -1226,6 +1671,10 @@ async def add_resource(request: ResourceRequest, background_tasks: BackgroundTas
             )
 
         resource_service.update_resource_status(resource.uri, "active")
+        if request.refresh_interval is not None:
+            resource_service.update_resource_refresh_interval(
+                resource.uri, request.refresh_interval
+            )
     else:
         exists_resource = resource_service.get_resource_by_name(request.name)
         if exists_resource:
@@ -1244,6 +1693,7 @@ async def add_resource(request: ResourceRequest, background_tasks: BackgroundTas
             indexing_started_at=None,
             last_indexed_at=None,
             last_error=None,
+            refresh_interval=request.refresh_interval,
         )
         resource_service.add_resource_to_db(resource)
         background_tasks.add_task(background_task, resource)
@@ -1275,41 +1725,147 @@ async def remove_resource(request: ResourceURIRequest):  # noqa: D103, ANN201
         observer.stop()
         observer.join()
         del watched_resources[request.uri]
+        WATCHED_RESOURCES.set(len(watched_resources))
 
     # Update database status
     resource_service.update_resource_status(request.uri, "inactive")
+    crawl_state_service.delete_crawl_states(request.uri)
+    symbol_service.delete_symbols(request.uri)
+    fulltext_service.delete_nodes(request.uri)
+    resource_service.increment_generations([request.uri])
 
     return {"status": "success", "message": f"Resource {request.uri} removed"}
 
 
-@app.post(
-    "/api/v1/retrieve",
-    response_model=RetrieveResponse,
-    summary="Retrieve information from indexed documents",
-    description="""
-    Performs a semantic search over all indexed documents and returns relevant information.
-    The response includes both the answer and the source documents used to generate it.
-    """,
-    responses={
-        200: {"description": "Successfully retrieved information"},
-        500: {"description": "Internal server error during retrieval"},
-    },
-)
-async def retrieve(request: RetrieveRequest):  # noqa: D103, ANN201, C901, PLR0915
-    if is_local_uri(request.base_uri):
-        directory = uri_to_path(request.base_uri)
-        # Validate directory exists
-        if not directory.exists():
-            raise HTTPException(
-                status_code=404, detail=f"Directory not found: {request.base_uri}"
-            )
+def get_query_embedding(query: str) -> list[float]:
+    """Embed a query, reusing the embedding of a recent identical query."""
+    embedding = query_embedding_cache.get(embed_model_key, query)
+    if embedding is not None:
+        CACHE_HITS_TOTAL.labels("query_embedding").inc()
+        return embedding
+    CACHE_MISSES_TOTAL.labels("query_embedding").inc()
+    with observe_stage("retrieve_embed"):
+        embedding = embed_model.get_query_embedding(query)
+    query_embedding_cache.put(embed_model_key, query, embedding)
+    return embedding
 
-    logger.info(
-        "Received retrieval request: %s for base uri: %s",
-        request.query,
-        request.base_uri,
+
+def count_tokens(text: str) -> int:
+    """Count the tokens of a text with the global tokenizer."""
+    return len(Settings.tokenizer(text))
+
+
+def get_context_budget(query: str) -> int:
+    """Return how many tokens of retrieved context fit into the LLM prompt."""
+    metadata = llm_model.metadata
+    available = (
+        metadata.context_window - metadata.num_output - CONTEXT_PROMPT_RESERVE_TOKENS
+    )
+    return max(0, min(CONTEXT_TOKEN_BUDGET, available) - count_tokens(query))
+
+
+def get_query_embeddings(queries: list[str]) -> list[list[float]]:
+    """
+    Embed several queries, reusing cached embeddings.
+
+    Providers that embed queries like documents get all missing queries in
+    one batched call; the others get one call per query.
+    """
+    embeddings = [query_embedding_cache.get(embed_model_key, query) for query in queries]
+    missing = list(
+        dict.fromkeys(
+            query
+            for query, embedding in zip(queries, embeddings, strict=True)
+            if embedding is None
+        )
+    )
+    CACHE_HITS_TOTAL.labels("query_embedding").inc(len(queries) - len(missing))
+    if not missing:
+        return embeddings  # pyright: ignore[reportReturnType]
+    CACHE_MISSES_TOTAL.labels("query_embedding").inc(len(missing))
+
+    with observe_stage("retrieve_embed"):
+        if rag_embed_provider in BATCH_QUERY_EMBED_PROVIDERS and not getattr(
+            embed_model, "query_instruction", None
+        ):
+            computed = embed_model.get_text_embedding_batch(missing)
+        else:
+            computed = [embed_model.get_query_embedding(query) for query in missing]
+    by_query = dict(zip(missing, computed, strict=True))
+    for query, embedding in by_query.items():
+        query_embedding_cache.put(embed_model_key, query, embedding)
+    return [
+        embedding if embedding is not None else by_query[query]
+        for query, embedding in zip(queries, embeddings, strict=True)
+    ]
+
+
+def get_nodes_with_scores(hits: list[tuple[str, float]]) -> list[NodeWithScore]:
+    """Load the nodes of ``(node_id, score)`` search hits from the vector store."""
+    if not hits:
+        return []
+    nodes = {node.node_id: node for node in vector_store.get_nodes([i for i, _ in hits])}
+    return [
+        NodeWithScore(node=nodes[node_id], score=score)
+        for node_id, score in hits
+        if node_id in nodes
+    ]
+
+
+def fuse_nodes(rankings: list[list[NodeWithScore]]) -> list[NodeWithScore]:
+    """Fuse rankings of nodes with reciprocal-rank fusion, scored by the fused score."""
+    nodes = {}
+    for ranking in rankings:
+        for node in ranking:
+            nodes.setdefault(node.node.node_id, node.node)
+    fused = reciprocal_rank_fusion(
+        [[node.node.node_id for node in ranking] for ranking in rankings]
+    )
+    return [NodeWithScore(node=nodes[node_id], score=score) for node_id, score in fused]
+
+
+def shortlist_files(query_embedding: list[float], base_uri: str) -> list[str] | None:
+    """
+    Return the URIs of the files under ``base_uri`` whose summaries match the query best.
+
+    Returns None if the chunks are searched without shortlisting, i.e. for
+    remote resources, which have no file summaries, and while the summary
+    index is small.
+    """
+    if not is_local_uri(base_uri):
+        return None
+    total = summary_collection.count()
+    if total < COARSE_MIN_FILES:
+        return None
+    with observe_stage("file_search"):
+        # Summaries of other resources take up part of the results
+        result = summary_vector_store.query(
+            VectorStoreQuery(
+                query_embedding=query_embedding,
+                similarity_top_k=min(COARSE_FILE_CANDIDATES * 4, total),
+            )
+        )
+    uris = dict.fromkeys(
+        uri
+        for node in result.nodes or []
+        if (uri := get_node_uri(node)) and is_under_uri(uri, base_uri)
     )
+    return list(uris)[:COARSE_FILE_CANDIDATES] or None
 
+
+def search_nodes(  # noqa: C901
+    request: RetrieveRequest,
+    query_embedding: list[float] | None = None,
+) -> tuple[QueryBundle, list[NodeWithScore]]:
+    """
+    Find the chunks relevant to a retrieve request.
+
+    ``query_embedding`` is computed when needed unless it is given.
+
+    Raises:
+        HTTPException: If no chunk under the base URI is relevant.
+
+    """
     cached_file_contents = {}
 
     # Create a filter function to only include documents from the specified directory
@@ -1332,13 +1888,19 @@ async def retrieve(request: RetrieveRequest):  # noqa: D103, ANN201, C901, PLR09
                 if content is None:
                     with file_path.open("r", encoding="utf-8") as f:
                         content = f.read()
-                        cached_file_contents[file_path] = content
-                if node.node.get_content() not in content:
+                    # Chunks of converted formats, e.g. HTML, come from the converted text
+                    doc_format = DOC_EXT_MAP.get(file_path.suffix.lower())
+                    if doc_format is not None:
+                        content = source_text(content, doc_format, uri)
+                    cached_file_contents[file_path] = content
+                if not is_chunk_of(node.node.get_content(), content):
                     logger.warning("File content does not match: %s", file_path)
                     return False
                 return True
             except ValueError:
                 return False
+        if is_remote_uri(request.base_uri):
+            return is_url_in_scope(uri, request.base_uri)
         if uri == request.base_uri:
             return True
         base_uri = request.base_uri
@@ -1376,24 +1938,88 @@ async def retrieve(request: RetrieveRequest):  # noqa: D103, ANN201, C901, PLR09
             """
             return [node for node in nodes if filter_documents(node)]
 
-    # Create query engine with the filter
-    query_engine = index.as_query_engine(
-        node_postprocessors=[ResourceFilterPostProcessor()],
-    )
-
     logger.info("Executing retrieval query")
-    response = query_engine.query(request.query)
+    # Identifiers and quoted strings are looked up as exact phrases
+    exact_text = exact_match_text(request.query)
+    with observe_stage("lexical_search"):
+        lexical_hits = fulltext_service.search(
+            exact_text or request.query,
+            request.base_uri,
+            phrase=exact_text is not None,
+            limit=RETRIEVE_CANDIDATES,
+        )
+        lexical_nodes = get_nodes_with_scores(lexical_hits)
+
+    nodes = []
+    if exact_text is not None:
+        # Exact matches are answered from the lexical index alone, without
+        # an embedding round trip
+        lexical_nodes = [
+            node for node in lexical_nodes if exact_text in node.node.get_content()
+        ]
+        query_bundle = QueryBundle(query_str=request.query)
+        with observe_stage("filter"):
+            nodes = ResourceFilterPostProcessor().postprocess_nodes(
+                lexical_nodes, query_bundle
+            )
+
+    if not nodes:
+        if query_embedding is None:
+            query_embedding = get_query_embedding(request.query)
+        query_bundle = QueryBundle(query_str=request.query, embedding=query_embedding)
+
+        # Large resources are searched coarse to fine: files, then their chunks
+        files = shortlist_files(query_embedding, request.base_uri)
+        filters = (
+            MetadataFilters(
+                filters=[
+                    MetadataFilter(
+                        key=METADATA_KEY_URI, value=files, operator=FilterOperator.IN
+                    )
+                ]
+            )
+            if files
+            else None
+        )
+        with observe_stage("vector_search"):
+            vector_nodes = index.as_retriever(
+                similarity_top_k=RETRIEVE_CANDIDATES, filters=filters
+            ).retrieve(query_bundle)
+
+        nodes = fuse_nodes([vector_nodes, lexical_nodes])
+        with observe_stage("filter"):
+            nodes = ResourceFilterPostProcessor().postprocess_nodes(
+                nodes, query_bundle
+            )
 
     # If no documents were found in the specified directory
-    if not response.source_nodes:
+    if not nodes:
         raise HTTPException(
             status_code=404,
             detail=f"No relevant documents found in uri: {request.base_uri}",
         )
 
-    # Process source documents, ensure readable text
+    if reranker is not None:
+        with observe_stage("rerank"):
+            nodes = reranker.postprocess_nodes(nodes, query_bundle)
+
+    # top_k and the token budget bound what the LLM sees, not just the sources
+    with observe_stage("context"):
+        nodes = select_context(
+            nodes, request.top_k, get_context_budget(request.query), count_tokens
+        )
+    if not nodes:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No relevant documents found in uri: {request.base_uri}",
+        )
+    return query_bundle, nodes
+
+
+def format_sources(nodes: list[NodeWithScore], top_k: int | None) -> list[dict[str, Any]]:
+    """Convert source nodes to readable source documents."""
     sources = []
-    for node in response.source_nodes[: request.top_k]:
+    for node in nodes[:top_k]:
         try:
             content = node.node.get_content()
 
@@ -1427,21 +2053,267 @@ async def retrieve(request: RetrieveRequest):  # noqa: D103, ANN201, C901, PLR09
         except (OSError, UnicodeDecodeError, json.JSONDecodeError):
             logger.warning("Error processing source document", exc_info=True)
             continue
+    return sources
 
-    logger.info("Retrieval completed, found %d relevant documents", len(sources))
 
-    # Process response text similarly
-    response_text = str(response)
-    response_text = "".join(
-        char for char in response_text if char.isprintable() or char in "\n\r\t"
-    )
+def clean_response_text(text: str) -> str:
+    """Drop unprintable characters from generated text."""
+    return "".join(char for char in text if char.isprintable() or char in "\n\r\t")
+
+
+def retrieve_sync(
+    request: RetrieveRequest, query_embedding: list[float] | None = None
+) -> dict[str, Any]:
+    """Search the indexes and synthesize a response, blocking on the providers."""
+    query_bundle, nodes = search_nodes(request, query_embedding)
+
+    with observe_stage("llm"):
+        response = get_response_synthesizer().synthesize(query_bundle, nodes)
+
+    # Process source documents, ensure readable text
+    sources = format_sources(response.source_nodes, request.top_k)
+    logger.info("Retrieval completed, found %d relevant documents", len(sources))
 
     return {
-        "response": response_text,
+        "response": clean_response_text(str(response)),
         "sources": sources,
     }
 
 
+def start_retrieve_request(request: RetrieveRequest) -> tuple:
+    """
+    Validate a retrieve request and return its cache key.
+
+    Raises:
+        HTTPException: If the base directory does not exist.
+
+    """
+    if is_local_uri(request.base_uri):
+        directory = uri_to_path(request.base_uri)
+        # Validate directory exists
+        if not directory.exists():
+            raise HTTPException(
+                status_code=404, detail=f"Directory not found: {request.base_uri}"
+            )
+
+    logger.info(
+        "Received retrieval request: %s for base uri: %s",
+        request.query,
+        request.base_uri,
+    )
+
+    # Read before retrieving, so that a result computed while the resource is
+    # re-indexed is cached under the old generation
+    return make_retrieve_cache_key(
+        request.query,
+        request.base_uri,
+        request.top_k,
+        resource_service.get_generations(request.base_uri),
+    )
+
+
+@app.post(
+    "/api/v1/retrieve",
+    response_model=RetrieveResponse,
+    summary="Retrieve information from indexed documents",
+    description="""
+    Performs a hybrid keyword (BM25) and semantic search over all indexed documents and returns relevant information.
+    Identifier-like or quoted queries are answered from the keyword index alone when it has exact matches.
+    The response includes both the answer and the source documents used to generate it.
+    """,
+    responses={
+        200: {"description": "Successfully retrieved information"},
+        500: {"description": "Internal server error during retrieval"},
+    },
+)
+async def retrieve(request: RetrieveRequest):  # noqa: D103, ANN201
+    cache_key = start_retrieve_request(request)
+    cached_result = retrieve_cache.get(cache_key)
+    if cached_result is not None:
+        CACHE_HITS_TOTAL.labels("retrieve").inc()
+        logger.info("Serving cached retrieval result")
+        return cached_result
+    return await retrieve_coalesced(request, cache_key)
+
+
+async def retrieve_coalesced(
+    request: RetrieveRequest,
+    cache_key: tuple,
+    query_embedding: list[float] | None = None,
+) -> dict[str, Any]:
+    """Retrieve and cache a result, joining an identical request in flight."""
+    if retrieve_flights.in_flight(cache_key):
+        CACHE_HITS_TOTAL.labels("retrieve_in_flight").inc()
+        logger.info("Joining identical retrieval request in flight")
+    else:
+        CACHE_MISSES_TOTAL.labels("retrieve").inc()
+
+    async def run_retrieval() -> dict[str, Any]:
+        # Off the event loop, so that identical requests can join this one
+        result = await asyncio.to_thread(retrieve_sync, request, query_embedding)
+        retrieve_cache.put(cache_key, result)
+        return result
+
+    return await retrieve_flights.run(cache_key, run_retrieval)
+
+
+@app.post(
+    "/api/v1/retrieve/batch",
+    response_model=BatchRetrieveResponse,
+    summary="Retrieve information for several queries",
+    description="""
+    Runs several retrieve requests in one round trip. Queries missing from the caches are embedded
+    together, in a single provider call where the provider supports it, and then searched and
+    answered concurrently. Every query gets its own result; a failing query does not fail the batch.
+    """,
+    responses={
+        200: {"description": "Per-query results"},
+    },
+)
+async def retrieve_batch(request: BatchRetrieveRequest) -> BatchRetrieveResponse:
+    """Retrieve information for several queries at once."""
+    results: list[BatchRetrieveResult | None] = [None] * len(request.queries)
+    pending: list[tuple[int, RetrieveRequest, tuple]] = []
+    for i, query_request in enumerate(request.queries):
+        try:
+            cache_key = start_retrieve_request(query_request)
+        except HTTPException as e:
+            results[i] = BatchRetrieveResult(status_code=e.status_code, error=e.detail)
+            continue
+        cached_result = retrieve_cache.get(cache_key)
+        if cached_result is not None:
+            CACHE_HITS_TOTAL.labels("retrieve").inc()
+            results[i] = BatchRetrieveResult(status_code=200, result=cached_result)
+        else:
+            pending.append((i, query_request, cache_key))
+
+    # Exact-match queries are usually answered without an embedding
+    to_embed = [
+        query_request.query
+        for _, query_request, cache_key in pending
+        if exact_match_text(query_request.query) is None
+        and not retrieve_flights.in_flight(cache_key)
+    ]
+    embeddings = {}
+    if to_embed:
+        computed = await asyncio.to_thread(get_query_embeddings, to_embed)
+        embeddings = dict(zip(to_embed, computed, strict=True))
+
+    outcomes = await asyncio.gather(
+        *(
+            retrieve_coalesced(
+                query_request, cache_key, embeddings.get(query_request.query)
+            )
+            for _, query_request, cache_key in pending
+        ),
+        return_exceptions=True,
+    )
+    for (i, _, _), outcome in zip(pending, outcomes, strict=True):
+        if isinstance(outcome, HTTPException):
+            results[i] = BatchRetrieveResult(
+                status_code=outcome.status_code, error=outcome.detail
+            )
+        elif isinstance(outcome, Exception):
+            logger.error("Batch retrieval query failed", exc_info=outcome)
+            results[i] = BatchRetrieveResult(status_code=500, error=str(outcome))
+        else:
+            results[i] = BatchRetrieveResult(status_code=200, result=outcome)
+    return BatchRetrieveResponse(results=results)  # pyright: ignore[reportArgumentType]
+
+
+def encode_stream_event(
+    event: str, data: dict[str, Any], stream_format: Literal["sse", "ndjson"]
+) -> str:
+    """Encode an event of a streamed retrieval."""
+    if stream_format == "ndjson":
+        return json.dumps({"event": event, **data}) + "\n"
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def replay_retrieval(
+    request: RetrieveStreamRequest, result: dict[str, Any]
+) -> Iterator[str]:
+    """Stream a cached retrieval result."""
+    yield encode_stream_event("sources", {"sources": result["sources"]}, request.format)
+    yield encode_stream_event("token", {"delta": result["response"]}, request.format)
+    yield encode_stream_event("done", {"response": result["response"]}, request.format)
+
+
+def stream_retrieval(
+    request: RetrieveStreamRequest,
+    cache_key: tuple,
+    query_bundle: QueryBundle,
+    nodes: list[NodeWithScore],
+) -> Iterator[str]:
+    """Stream the sources, then the response tokens as the LLM generates them."""
+    sources = format_sources(nodes, request.top_k)
+    yield encode_stream_event("sources", {"sources": sources}, request.format)
+
+    deltas = []
+    try:
+        with observe_stage("llm"):
+            response = get_response_synthesizer(streaming=True).synthesize(
+                query_bundle, nodes
+            )
+            for delta in response.response_gen:
+                deltas.append(clean_response_text(delta))
+                yield encode_stream_event(
+                    "token", {"delta": deltas[-1]}, request.format
+                )
+    except Exception as e:  # noqa: BLE001
+        # The status line is already sent, so errors are reported in the stream
+        logger.exception("Streaming retrieval failed")
+        yield encode_stream_event("error", {"detail": str(e)}, request.format)
+        return
+
+    response_text = "".join(deltas)
+    logger.info("Streaming retrieval completed, found %d relevant documents", len(sources))
+    retrieve_cache.put(cache_key, {"response": response_text, "sources": sources})
+    yield encode_stream_event("done", {"response": response_text}, request.format)
+
+
+@app.post(
+    "/api/v1/retrieve/stream",
+    summary="Retrieve information from indexed documents as a stream",
+    description="""
+    Streaming variant of `/api/v1/retrieve`. The source documents are sent as soon as the search completes,
+    followed by the response tokens as the LLM generates them:
+    * `sources`: `{"sources": [...]}`, sent first
+    * `token`: `{"delta": "..."}`, one per generated chunk of text
+    * `done`: `{"response": "..."}`, the full response
+    * `error`: `{"detail": "..."}`, if generation fails after the stream started
+
+    With `format` `sse` every event is a Server-Sent Event named after its type; with `ndjson` it is a
+    JSON line with an additional `event` field.
+    """,
+    responses={
+        200: {"description": "Stream of retrieval events"},
+        404: {"description": "Directory not found or no relevant documents"},
+    },
+)
+async def retrieve_stream(request: RetrieveStreamRequest) -> StreamingResponse:
+    """Stream a response to a query over the indexed documents."""
+    cache_key = start_retrieve_request(request)
+    cached_result = retrieve_cache.get(cache_key)
+    if cached_result is not None:
+        CACHE_HITS_TOTAL.labels("retrieve").inc()
+        events = replay_retrieval(request, cached_result)
+    else:
+        CACHE_MISSES_TOTAL.labels("retrieve").inc()
+        # Searched before responding, so that a miss is still a 404
+        query_bundle, nodes = await asyncio.to_thread(search_nodes, request)
+        events = stream_retrieval(request, cache_key, query_bundle, nodes)
+
+    # Sync iterators are consumed in a thread pool, off the event loop
+    return StreamingResponse(
+        events,
+        media_type="application/x-ndjson"
+        if request.format == "ndjson"
+        else "text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 class IndexingStatusRequest(BaseModel):
     """Request model for indexing status."""
 
@@ -1492,7 +2364,12 @@ async def get_indexing_status_for_resource(request: IndexingStatusRequest):  # n
             )
 
     # Get indexing history records for the specific directory
-    resource_files = indexing_history_service.get_indexing_status(base_uri=request.uri)
+    # File summaries are indexed alongside the chunks of their files
+    resource_files = [
+        file
+        for file in indexing_history_service.get_indexing_status(base_uri=request.uri)
+        if not is_file_summary_id(file.document_id)
+    ]
 
     logger.info("Found %d files in resource %s", len(resource_files), request.uri)
     for file in resource_files:
@@ -1555,6 +2432,61 @@ async def list_resources() -> ResourceListResponse:
     )
 
 
+class SymbolLookupRequest(BaseModel):
+    """Request model for symbol lookup."""
+
+    name: str = Field(..., description="Name of the symbol to look up")
+    base_uri: str | None = Field(
+        None, description="Only return symbols defined under this resource URI"
+    )
+    prefix: bool = Field(
+        False,  # noqa: FBT003
+        description="Match symbols whose name starts with the given name",
+    )
+    kind: str | None = Field(
+        None, description="Only return symbols of this kind (function/class/...)"
+    )
+    limit: int = Field(50, description="Maximum number of symbols to return", ge=1)
+
+
+class SymbolLookupResponse(BaseModel):
+    """Response model for symbol lookup."""
+
+    symbols: list[Symbol] = Field(..., description="Matching symbol definitions")
+
+
+@app.post(
+    "/api/v1/symbols",
+    response_model=SymbolLookupResponse,
+    summary="Look up symbol definitions",
+    description="""
+    Finds where functions, classes and other definitions are declared in indexed source files.
+    Lookups are exact (or by name prefix) and served from the symbol index, without a vector search.
+    Each symbol references the indexed chunk that contains its definition.
+    """,
+    responses={
+        200: {"description": "Successfully looked up symbols"},
+    },
+)
+async def lookup_symbols(request: SymbolLookupRequest) -> SymbolLookupResponse:
+    """Look up symbol definitions by name."""
+    symbols = symbol_service.find_symbols(
+        request.name,
+        request.base_uri,
+        prefix=request.prefix,
+        kind=request.kind,
+        limit=request.limit,
+    )
+    return SymbolLookupResponse(symbols=symbols)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Prometheus metrics endpoint."""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+
 @app.get("/api/health")
 async def health_check() -> dict[str, str]:
     """Health check endpoint."""
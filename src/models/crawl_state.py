@@ -0,0 +1,18 @@
+"""Crawl State Model."""
+
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class CrawlState(BaseModel):
+    """Model for the crawl state of a remote page."""
+
+    id: int | None = Field(None, description="Record ID")
+    url: str = Field(..., description="URL of the crawled page")
+    resource_uri: str = Field(..., description="URI of the resource the page belongs to")
+    etag: str | None = Field(None, description="ETag header of the last response")
+    last_modified: str | None = Field(None, description="Last-Modified header of the last response")
+    content_hash: str | None = Field(None, description="SHA-256 hash of the last response body")
+    links: list[str] = Field(default_factory=list, description="Outgoing links of the page")
+    last_fetched_at: datetime | None = Field(None, description="Last fetch timestamp")
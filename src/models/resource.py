@@ -23,3 +23,8 @@ class Resource(BaseModel):
     indexing_started_at: datetime | None = Field(None, description="Indexing start timestamp")
     last_indexed_at: datetime | None = Field(None, description="Last indexing timestamp")
     last_error: str | None = Field(None, description="Last error message if any")
+    refresh_interval: int | None = Field(
+        None,
+        description="Seconds between refreshes of a remote resource (default if unset, disabled if <= 0)",
+    )
+    generation: int = Field(0, description="Incremented whenever the indexed content of the resource changes")
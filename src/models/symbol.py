@@ -0,0 +1,17 @@
+"""Symbol Model."""
+
+from pydantic import BaseModel, Field
+
+
+class Symbol(BaseModel):
+    """Model for a symbol defined in an indexed source file."""
+
+    id: int | None = Field(None, description="Symbol ID")
+    name: str = Field(..., description="Name of the symbol")
+    kind: str = Field(..., description="Kind of definition (function/class/...)")
+    uri: str = Field(..., description="URI of the file defining the symbol")
+    language: str | None = Field(None, description="Language of the file")
+    start_line: int = Field(..., description="First line of the definition (1-based)")
+    end_line: int = Field(..., description="Last line of the definition (1-based)")
+    chunk_id: str | None = Field(None, description="ID of the indexed chunk containing the definition")
+    doc_id: str | None = Field(None, description="ID of the indexed document containing the definition")
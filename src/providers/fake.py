@@ -0,0 +1,197 @@
+# src/providers/fake.py
+
+import asyncio
+import hashlib
+import math
+import re
+import time
+from collections.abc import Sequence
+from typing import Any
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.base.llms.types import (
+    CompletionResponse,
+    CompletionResponseGen,
+    LLMMetadata,
+)
+from llama_index.core.llms.callbacks import llm_completion_callback
+from llama_index.core.llms.custom import CustomLLM
+from llama_index.core.llms.llm import LLM
+from pydantic import Field
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class FakeEmbedding(BaseEmbedding):
+    """
+    Deterministic offline embedding model.
+
+    Every word is hashed into one of ``dimensions`` buckets (feature hashing),
+    so texts sharing identifiers end up close to each other without any
+    network call.
+    """
+
+    dimensions: int = Field(default=256, gt=0, description="Embedding dimension")
+    latency: float = Field(
+        default=0.0, ge=0.0, description="Artificial latency per request in seconds"
+    )
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "FakeEmbedding"
+
+    def _embed(self, text: str) -> list[float]:
+        vector = [0.0] * self.dimensions
+        tokens = TOKEN_PATTERN.findall(text.lower()) or [text]
+        for token in tokens:
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            sign = 1.0 if value & 1 else -1.0
+            vector[(value >> 1) % self.dimensions] += sign
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def _get_query_embedding(self, query: str) -> list[float]:
+        time.sleep(self.latency)
+        return self._embed(query)
+
+    def _get_text_embedding(self, text: str) -> list[float]:
+        time.sleep(self.latency)
+        return self._embed(text)
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        # One simulated round trip per batch, like a real provider
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def _aget_query_embedding(self, query: str) -> list[float]:
+        await asyncio.sleep(self.latency)
+        return self._embed(query)
+
+    async def _aget_text_embedding(self, text: str) -> list[float]:
+        await asyncio.sleep(self.latency)
+        return self._embed(text)
+
+
+class FakeLLM(CustomLLM):
+    """Offline LLM that renders a fixed response template."""
+
+    model: str = Field(default="fake", description="Model name reported by the LLM")
+    response_template: str = Field(
+        default="Fake response from {model} for a prompt of {prompt_chars} characters.",
+        description="Template formatted with model, prompt and prompt_chars",
+    )
+    latency: float = Field(
+        default=0.0, ge=0.0, description="Artificial latency before the first token"
+    )
+    token_latency: float = Field(
+        default=0.0, ge=0.0, description="Artificial latency between streamed tokens"
+    )
+    context_window: int = Field(default=32768, gt=0)
+    num_output: int = Field(default=512, gt=0)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "FakeLLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(
+            context_window=self.context_window,
+            num_output=self.num_output,
+            model_name=self.model,
+        )
+
+    def _render(self, prompt: str) -> str:
+        return self.response_template.format(
+            model=self.model,
+            prompt=prompt,
+            prompt_chars=len(prompt),
+        )
+
+    @staticmethod
+    def _usage(prompt: str, text: str) -> dict[str, Any]:
+        # Reported like an OpenAI compatible API, counting words as tokens
+        return {
+            "usage": {
+                "prompt_tokens": len(TOKEN_PATTERN.findall(prompt)),
+                "completion_tokens": len(TOKEN_PATTERN.findall(text)),
+            }
+        }
+
+    @llm_completion_callback()
+    def complete(
+        self,
+        prompt: str,
+        formatted: bool = False,  # noqa: ARG002, FBT001, FBT002
+        **kwargs: Any,  # noqa: ANN401, ARG002
+    ) -> CompletionResponse:
+        time.sleep(self.latency)
+        text = self._render(prompt)
+        return CompletionResponse(text=text, raw=self._usage(prompt, text))
+
+    @llm_completion_callback()
+    def stream_complete(
+        self,
+        prompt: str,
+        formatted: bool = False,  # noqa: ARG002, FBT001, FBT002
+        **kwargs: Any,  # noqa: ANN401, ARG002
+    ) -> CompletionResponseGen:
+        tokens: Sequence[str] = re.findall(r"\S+\s*", self._render(prompt))
+
+        def gen() -> CompletionResponseGen:
+            time.sleep(self.latency)
+            text = ""
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(self.token_latency)
+                text += token
+                # Usage comes with the last chunk of the stream
+                raw = self._usage(prompt, text) if i == len(tokens) - 1 else None
+                yield CompletionResponse(text=text, delta=token, raw=raw)
+
+        return gen()
+
+
+def initialize_embed_model(
+    embed_endpoint: str,  # noqa: ARG001
+    embed_api_key: str,  # noqa: ARG001
+    embed_model: str,  # noqa: ARG001
+    **embed_extra: Any,  # noqa: ANN401
+) -> BaseEmbedding:
+    """
+    Create the fake embedding model.
+
+    Args:
+        embed_endpoint: Not be used by the fake provider.
+        embed_api_key: Not be used by the fake provider.
+        embed_model: Not be used by the fake provider.
+        embed_extra: Extra parameters, e.g. dimensions and latency.
+
+    Returns:
+        The initialized embed_model.
+
+    """
+    return FakeEmbedding(**embed_extra)
+
+
+def initialize_llm_model(
+    llm_endpoint: str,  # noqa: ARG001
+    llm_api_key: str,  # noqa: ARG001
+    llm_model: str,
+    **llm_extra: Any,  # noqa: ANN401
+) -> LLM:
+    """
+    Create the fake LLM model.
+
+    Args:
+        llm_endpoint: Not be used by the fake provider.
+        llm_api_key: Not be used by the fake provider.
+        llm_model: The model name echoed in responses.
+        llm_extra: Extra parameters, e.g. response_template and latency.
+
+    Returns:
+        The initialized llm_model.
+
+    """
+    return FakeLLM(model=llm_model, **llm_extra)
@@ -0,0 +1,83 @@
+"""Crawl State Service."""
+
+import json
+
+from libs.db import get_db_connection
+from models.crawl_state import CrawlState
+
+
+class CrawlStateService:
+    """Crawl State Service."""
+
+    def get_crawl_state(self, url: str) -> CrawlState | None:
+        """Get the crawl state of a page from the database."""
+        with get_db_connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM crawl_state WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if not row:
+                return None
+            row_dict = dict(row)
+            row_dict["links"] = json.loads(row_dict["links"]) if row_dict["links"] else []
+            return CrawlState(**row_dict)
+
+    def save_crawl_state(self, state: CrawlState) -> None:
+        """Insert or update the crawl state of a page."""
+        with get_db_connection() as conn:
+            conn.execute(
+                """
+              INSERT INTO crawl_state
+              (url, resource_uri, etag, last_modified, content_hash, links, last_fetched_at)
+              VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+              ON CONFLICT(url) DO UPDATE SET
+                resource_uri = excluded.resource_uri,
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                content_hash = excluded.content_hash,
+                links = excluded.links,
+                last_fetched_at = CURRENT_TIMESTAMP
+              """,
+                (
+                    state.url,
+                    state.resource_uri,
+                    state.etag,
+                    state.last_modified,
+                    state.content_hash,
+                    json.dumps(state.links),
+                ),
+            )
+            conn.commit()
+
+    def touch_crawl_state(self, url: str) -> None:
+        """Record that an unchanged page was fetched."""
+        with get_db_connection() as conn:
+            conn.execute(
+                "UPDATE crawl_state SET last_fetched_at = CURRENT_TIMESTAMP WHERE url = ?",
+                (url,),
+            )
+            conn.commit()
+
+    def delete_crawl_state(self, url: str) -> None:
+        """Delete the crawl state of a page so that it is fully re-fetched."""
+        with get_db_connection() as conn:
+            conn.execute("DELETE FROM crawl_state WHERE url = ?", (url,))
+            conn.commit()
+
+    def delete_crawl_states(self, resource_uri: str) -> None:
+        """Delete the crawl state of all pages of a resource."""
+        with get_db_connection() as conn:
+            conn.execute(
+                "DELETE FROM crawl_state WHERE resource_uri = ?",
+                (resource_uri,),
+            )
+            conn.commit()
+
+    def delete_all_crawl_states(self) -> None:
+        """Delete the crawl state of all pages so that every page is fully re-fetched."""
+        with get_db_connection() as conn:
+            conn.execute("DELETE FROM crawl_state")
+            conn.commit()
+
+
+crawl_state_service = CrawlStateService()
@@ -0,0 +1,131 @@
+"""Full-text Service."""
+
+import re
+import sqlite3
+
+from libs.db import get_db_connection
+from libs.utils import get_node_uri
+from llama_index.core.schema import BaseNode, MetadataMode
+
+# Word characters without "_", matching the unicode61 tokenizer, so that a
+# snake_case identifier in a query becomes a phrase of its parts
+QUERY_TOKEN_PATTERN = re.compile(r"[^\W_]+")
+# Upper bound for prefix range scans on URIs
+PREFIX_UPPER_BOUND = "\U0010ffff"
+
+
+class FullTextService:
+    """Full-text index of the embedded chunks, ranked with BM25."""
+
+    def add_nodes(self, nodes: list[BaseNode]) -> None:
+        """Add chunks to the full-text index."""
+        with get_db_connection() as conn:
+            self._insert_nodes(conn, nodes)
+            conn.commit()
+
+    def replace_nodes(self, doc_ids: list[str], nodes: list[BaseNode]) -> None:
+        """Replace the chunks of documents in the full-text index atomically."""
+        with get_db_connection() as conn:
+            placeholders = ",".join("?" * len(doc_ids))
+            self._delete_rows(
+                conn,
+                f"SELECT fts_rowid FROM chunks_fts_rows WHERE doc_id IN ({placeholders})",  # noqa: S608
+                doc_ids,
+            )
+            self._insert_nodes(conn, nodes)
+            conn.commit()
+
+    def delete_nodes(self, base_uri: str) -> None:
+        """Delete the chunks of all files under a resource."""
+        with get_db_connection() as conn:
+            self._delete_rows(
+                conn,
+                "SELECT fts_rowid FROM chunks_fts_rows WHERE uri >= ? AND uri < ?",
+                [base_uri, base_uri + PREFIX_UPPER_BOUND],
+            )
+            conn.commit()
+
+    def delete_all_nodes(self) -> None:
+        """Empty the full-text index."""
+        with get_db_connection() as conn:
+            conn.execute("DELETE FROM chunks_fts")
+            conn.execute("DELETE FROM chunks_fts_rows")
+            conn.commit()
+
+    def _insert_nodes(self, conn: sqlite3.Connection, nodes: list[BaseNode]) -> None:
+        for node in nodes:
+            uri = get_node_uri(node) or ""
+            cursor = conn.execute(
+                """
+              INSERT INTO chunks_fts (node_id, doc_id, uri, content)
+              VALUES (?, ?, ?, ?)
+              """,
+                (
+                    node.node_id,
+                    node.ref_doc_id,
+                    uri,
+                    node.get_content(metadata_mode=MetadataMode.NONE),
+                ),
+            )
+            conn.execute(
+                "INSERT INTO chunks_fts_rows (fts_rowid, doc_id, uri) VALUES (?, ?, ?)",
+                (cursor.lastrowid, node.ref_doc_id or "", uri),
+            )
+
+    def _delete_rows(
+        self, conn: sqlite3.Connection, rowid_query: str, params: list[str]
+    ) -> None:
+        # Deletes by rowid, as a WHERE on an UNINDEXED column scans the whole table
+        rowids = [(row[0],) for row in conn.execute(rowid_query, params)]
+        conn.executemany("DELETE FROM chunks_fts WHERE rowid = ?", rowids)
+        conn.executemany("DELETE FROM chunks_fts_rows WHERE fts_rowid = ?", rowids)
+
+    def count_nodes(self) -> int:
+        """Return the number of indexed chunks."""
+        with get_db_connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM chunks_fts").fetchone()[0]
+
+    def search(
+        self,
+        query: str,
+        base_uri: str | None = None,
+        *,
+        phrase: bool = False,
+        limit: int = 20,
+    ) -> list[tuple[str, float]]:
+        """
+        Search chunks by keywords.
+
+        Args:
+            query: Free text; only its words are used, never FTS5 syntax.
+            base_uri: Only return chunks whose URI starts with this prefix.
+            phrase: Match the words as one phrase instead of any of them.
+            limit: Maximum number of results.
+
+        Returns:
+            ``(node_id, score)`` pairs, best first. Scores are negated BM25
+            ranks, so higher is better.
+
+        """
+        tokens = QUERY_TOKEN_PATTERN.findall(query)
+        if not tokens:
+            return []
+        if phrase:
+            match = '"{}"'.format(" ".join(tokens))
+        else:
+            match = " OR ".join(f'"{token}"' for token in tokens)
+        conditions = ["chunks_fts MATCH ?"]
+        params: list[str | int] = [match]
+        if base_uri:
+            conditions += ["uri >= ?", "uri < ?"]
+            params += [base_uri, base_uri + PREFIX_UPPER_BOUND]
+        params.append(limit)
+        with get_db_connection() as conn:
+            rows = conn.execute(
+                f"SELECT node_id, bm25(chunks_fts) AS rank FROM chunks_fts WHERE {' AND '.join(conditions)} ORDER BY rank LIMIT ?",  # noqa: S608
+                params,
+            ).fetchall()
+            return [(row["node_id"], -row["rank"]) for row in rows]
+
+
+fulltext_service = FullTextService()
@@ -5,6 +5,7 @@ from typing import Any
 
 from libs.db import get_db_connection
 from libs.logger import logger
+from libs.metrics import FAILURES_TOTAL, observe_stage
 from libs.utils import get_node_uri
 from llama_index.core.schema import Document
 from models.indexing_history import IndexingHistory
@@ -35,6 +36,12 @@ class IndexingHistoryService:
             )
             conn.commit()
 
+    def delete_all_indexing_statuses(self) -> None:
+        """Delete the indexing status of all documents so that they are indexed again."""
+        with get_db_connection() as conn:
+            conn.execute("DELETE FROM indexing_history")
+            conn.commit()
+
     def update_indexing_status(
         self,
         doc: Document,
@@ -60,7 +67,10 @@ class IndexingHistoryService:
             document_id=doc.doc_id,
             metadata=metadata,
         )
-        with get_db_connection() as conn:
+        if status == "failed":
+            FAILURES_TOTAL.labels("document").inc()
+
+        with observe_stage("sqlite_write"), get_db_connection() as conn:
             # Check if record exists
             existing = conn.execute(
                 "SELECT id FROM indexing_history WHERE document_id = ?",
@@ -73,7 +83,7 @@ class IndexingHistoryService:
                     """
                   UPDATE indexing_history
                   SET content_hash = ?, status = ?, error_message = ?, document_id = ?, metadata = ?
-                  WHERE uri = ?
+                  WHERE id = ?
                   """,
                     (
                         record.content_hash,
@@ -81,7 +91,7 @@ class IndexingHistoryService:
                         record.error_message,
                         record.document_id,
                         json.dumps(record.metadata) if record.metadata else None,
-                        record.uri,
+                        existing["id"],
                     ),
                 )
             else:
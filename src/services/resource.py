@@ -1,5 +1,7 @@
 """Resource Service."""
 
+import json
+
 from libs.db import get_db_connection
 from models.resource import Resource
 
@@ -12,8 +14,8 @@ class ResourceService:
         with get_db_connection() as conn:
             conn.execute(
                 """
-              INSERT INTO resources (name, uri, type, status, indexing_status, created_at)
-              VALUES (?, ?, ?, ?, ?, ?)
+              INSERT INTO resources (name, uri, type, status, indexing_status, created_at, refresh_interval)
+              VALUES (?, ?, ?, ?, ?, ?, ?)
               """,
                 (
                     resource.name,
@@ -22,6 +24,7 @@ class ResourceService:
                     resource.status,
                     resource.indexing_status,
                     resource.created_at,
+                    resource.refresh_interval,
                 ),
             )
             conn.commit()
@@ -72,6 +75,49 @@ class ResourceService:
                 )
             conn.commit()
 
+    def update_resource_refresh_interval(self, uri: str, refresh_interval: int | None) -> None:
+        """Update the refresh interval of a remote resource in the database."""
+        with get_db_connection() as conn:
+            conn.execute(
+                "UPDATE resources SET refresh_interval = ? WHERE uri = ?",
+                (refresh_interval, uri),
+            )
+            conn.commit()
+
+    def increment_generations(self, uris: list[str]) -> None:
+        """Increment the generation of every resource containing any of the URIs."""
+        with get_db_connection() as conn:
+            conn.execute(
+                """
+              UPDATE resources SET generation = generation + 1
+              WHERE EXISTS (
+                SELECT 1 FROM json_each(?) WHERE substr(json_each.value, 1, length(uri)) = uri
+              )
+              """,
+                (json.dumps(uris),),
+            )
+            conn.commit()
+
+    def increment_all_generations(self) -> None:
+        """Increment the generation of every resource."""
+        with get_db_connection() as conn:
+            conn.execute("UPDATE resources SET generation = generation + 1")
+            conn.commit()
+
+    def get_generations(self, base_uri: str) -> list[tuple[int, int]]:
+        """Return ``(id, generation)`` of the resources containing or contained in ``base_uri``."""
+        with get_db_connection() as conn:
+            rows = conn.execute(
+                """
+              SELECT id, generation FROM resources
+              WHERE substr(uri, 1, length(:base_uri)) = :base_uri
+                 OR substr(:base_uri, 1, length(uri)) = uri
+              ORDER BY id
+              """,
+                {"base_uri": base_uri},
+            ).fetchall()
+            return [(row["id"], row["generation"]) for row in rows]
+
     def get_resource(self, uri: str) -> Resource | None:
         """Get resource from the database."""
         with get_db_connection() as conn:
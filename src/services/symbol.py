@@ -0,0 +1,112 @@
+"""Symbol Service."""
+
+from libs.db import get_db_connection
+from models.symbol import Symbol
+
+# Upper bound for prefix range scans on the name index
+PREFIX_UPPER_BOUND = "\U0010ffff"
+
+
+class SymbolService:
+    """Symbol Service."""
+
+    def replace_symbols(self, doc_ids: list[str], symbols: list[Symbol]) -> None:
+        """Replace the symbols of indexed documents in the database."""
+        with get_db_connection() as conn:
+            conn.executemany(
+                "DELETE FROM symbols WHERE doc_id = ?",
+                [(doc_id,) for doc_id in doc_ids],
+            )
+            conn.executemany(
+                """
+              INSERT INTO symbols (name, kind, uri, language, start_line, end_line, chunk_id, doc_id)
+              VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+              """,
+                [
+                    (
+                        symbol.name,
+                        symbol.kind,
+                        symbol.uri,
+                        symbol.language,
+                        symbol.start_line,
+                        symbol.end_line,
+                        symbol.chunk_id,
+                        symbol.doc_id,
+                    )
+                    for symbol in symbols
+                ],
+            )
+            conn.commit()
+
+    def delete_symbols(self, base_uri: str) -> None:
+        """Delete the symbols of all files under a resource."""
+        with get_db_connection() as conn:
+            conn.execute(
+                "DELETE FROM symbols WHERE uri >= ? AND uri < ?",
+                (base_uri, base_uri + PREFIX_UPPER_BOUND),
+            )
+            conn.commit()
+
+    def delete_all_symbols(self) -> None:
+        """Delete the symbols of all files."""
+        with get_db_connection() as conn:
+            conn.execute("DELETE FROM symbols")
+            conn.commit()
+
+    def count_symbols(self) -> int:
+        """Return the number of stored symbols."""
+        with get_db_connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM symbols").fetchone()[0]
+
+    def get_symbol_names(self, chunk_ids: list[str]) -> dict[str, set[str]]:
+        """Return the names of the symbols defined in each of the chunks."""
+        if not chunk_ids:
+            return {}
+        placeholders = ",".join("?" * len(chunk_ids))
+        with get_db_connection() as conn:
+            rows = conn.execute(
+                f"SELECT chunk_id, name FROM symbols WHERE chunk_id IN ({placeholders})",  # noqa: S608
+                chunk_ids,
+            ).fetchall()
+        names: dict[str, set[str]] = {}
+        for row in rows:
+            names.setdefault(row["chunk_id"], set()).add(row["name"])
+        return names
+
+    def find_symbols(  # noqa: PLR0913
+        self,
+        name: str,
+        base_uri: str | None = None,
+        *,
+        prefix: bool = False,
+        kind: str | None = None,
+        limit: int = 50,
+    ) -> list[Symbol]:
+        """
+        Find symbols by exact name or name prefix.
+
+        Prefix lookups are range scans on the name index, so both kinds of
+        lookup stay fast on large symbol tables.
+        """
+        if prefix:
+            conditions = ["name >= ?", "name < ?"]
+            params: list[str | int] = [name, name + PREFIX_UPPER_BOUND]
+        else:
+            conditions = ["name = ?"]
+            params = [name]
+        if base_uri:
+            conditions += ["uri >= ?", "uri < ?"]
+            params += [base_uri, base_uri + PREFIX_UPPER_BOUND]
+        if kind:
+            conditions.append("kind = ?")
+            params.append(kind)
+        params.append(limit)
+        with get_db_connection() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM symbols WHERE {' AND '.join(conditions)} ORDER BY name, uri, start_line LIMIT ?",  # noqa: S608
+                params,
+            ).fetchall()
+            return [Symbol(**dict(row)) for row in rows]
+
+
+symbol_service = SymbolService()
@@ -0,0 +1,18 @@
+"""Shared setup of the tests: import path and a throwaway data directory."""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+# The service creates its data directories when libs.configs is imported
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="rag-test-")
+os.environ["ANONYMIZED_TELEMETRY"] = "False"
+# Tests that import main index and answer with the offline fake providers
+os.environ["RAG_EMBED_PROVIDER"] = "fake"
+os.environ["RAG_EMBED_MODEL"] = "fake"
+os.environ["RAG_LLM_PROVIDER"] = "fake"
+os.environ["RAG_LLM_MODEL"] = "fake"
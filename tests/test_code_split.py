@@ -0,0 +1,72 @@
+"""Incremental reparsing must split files exactly like a full parse."""
+
+import random
+from pathlib import Path
+
+import pytest
+from libs.code_split import LANGUAGE_NODE_MAP, CodeSplitter, parse_tree_cache
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+FIXTURES = [
+    (ROOT_DIR / "src" / "libs" / "crawler.py", "python"),
+    (ROOT_DIR / "codes" / "demo.lua", "lua"),
+    (ROOT_DIR / "codes" / "kotlin_demo.kt", "kotlin"),
+]
+EDITS_PER_FIXTURE = 40
+# Inserted text: whitespace, new definitions, unbalanced syntax, multi-byte text
+EDIT_SNIPPETS = [
+    "",
+    "\n",
+    "    ",
+    "x",
+    "# é 中\n",
+    "def added(a):\n    return a\n\n",
+    "function added() return 1 end\n",
+    "fun added() = 1\n",
+    "{",
+    "}",
+    "(",
+    '"',
+]
+
+
+def random_edit(code: str, rng: random.Random) -> str:
+    """Replace a random range of up to a few lines with a random snippet."""
+    start = rng.randrange(len(code) + 1)
+    end = min(len(code), start + rng.choice([0, 0, 1, 10, 80]))
+    return code[:start] + rng.choice(EDIT_SNIPPETS) + code[end:]
+
+
+def describe(split: tuple[list, list]) -> tuple[list, list]:
+    """Comparable form of the blocks and symbols of a split."""
+    blocks, symbols = split
+    return (
+        [(b.content, b.start_line, b.end_line, b.category) for b in blocks],
+        [(s.name, s.kind, s.start_line, s.end_line) for s in symbols],
+    )
+
+
+@pytest.mark.parametrize(
+    ("path", "language"), FIXTURES, ids=[path.name for path, _ in FIXTURES]
+)
+def test_incremental_split_matches_full_split(path: Path, language: str) -> None:
+    splitter = CodeSplitter(LANGUAGE_NODE_MAP)
+    rng = random.Random(path.name)
+    cache_key = f"test://{path.name}"
+    parse_tree_cache.discard(cache_key)
+    code = path.read_text(encoding="utf-8")
+    splitter.split_blocks(code, language, cache_key=cache_key)
+
+    for _ in range(EDITS_PER_FIXTURE):
+        code = random_edit(code, rng)
+        incremental = splitter.split_blocks(code, language, cache_key=cache_key)
+        assert describe(incremental) == describe(splitter.split_blocks(code, language))
+
+
+def test_unchanged_file_reuses_cached_blocks() -> None:
+    splitter = CodeSplitter(LANGUAGE_NODE_MAP)
+    code = "def a():\n    return 1\n\n\ndef b():\n    return 2\n"
+    parse_tree_cache.discard("test://same")
+    first = splitter.split_blocks(code, "python", cache_key="test://same")
+    second = splitter.split_blocks(code, "python", cache_key="test://same")
+    assert describe(first) == describe(second)
@@ -0,0 +1,83 @@
+"""Selection of retrieved chunks under the prompt token budget."""
+
+from libs.context_budget import select_context, truncate_to_tokens
+from llama_index.core.schema import NodeWithScore, TextNode
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def make_node(text: str, uri: str = "file:///repo/a.py", score: float = 1.0) -> NodeWithScore:
+    node = TextNode(
+        text=text,
+        metadata={"uri": uri},
+        excluded_llm_metadata_keys=["uri"],
+    )
+    return NodeWithScore(node=node, score=score)
+
+
+def numbered_lines(prefix: str, count: int, words_per_line: int = 10) -> str:
+    return "\n".join(
+        " ".join(f"{prefix}{line}_{word}" for word in range(words_per_line))
+        for line in range(count)
+    )
+
+
+def texts(nodes: list[NodeWithScore]) -> list[str]:
+    return [node.node.get_content() for node in nodes]
+
+
+def test_keeps_chunks_in_order_up_to_max_nodes() -> None:
+    nodes = [make_node(f"chunk {i}", uri=f"file:///repo/{i}.py") for i in range(5)]
+    selected = select_context(nodes, 3, 1000, count_words)
+    assert texts(selected) == ["chunk 0", "chunk 1", "chunk 2"]
+    assert len(select_context(nodes, None, 1000, count_words)) == 5
+
+
+def test_drops_chunks_overlapping_a_better_chunk_of_the_same_file() -> None:
+    best = make_node("def a():\n    return 1\n\ndef b():\n    return 2")
+    contained = make_node("def b():\n    return 2")
+    same_text_other_file = make_node("def b():\n    return 2", uri="file:///repo/b.py")
+    selected = select_context(
+        [best, contained, same_text_other_file], None, 1000, count_words
+    )
+    assert selected == [best, same_text_other_file]
+
+
+def test_truncates_the_first_chunk_that_does_not_fit_to_whole_lines() -> None:
+    first = make_node(numbered_lines("a", 10))
+    second = make_node(numbered_lines("b", 40), uri="file:///repo/b.py")
+    third = make_node("never reached", uri="file:///repo/c.py")
+    selected = select_context([first, second, third], None, 355, count_words)
+
+    assert len(selected) == 2
+    assert selected[0] is first
+    truncated = selected[1].node.get_content()
+    assert count_words(truncated) == 250
+    assert truncated == "\n".join(numbered_lines("b", 40).splitlines()[:25])
+    # The original node is left untouched
+    assert second.node.get_content() == numbered_lines("b", 40)
+
+
+def test_drops_the_rest_when_too_little_of_a_chunk_would_remain() -> None:
+    first = make_node(numbered_lines("a", 10))
+    second = make_node(numbered_lines("b", 40), uri="file:///repo/b.py")
+    selected = select_context([first, second], None, 150, count_words)
+    assert selected == [first]
+
+
+def test_best_chunk_is_kept_truncated_even_over_the_budget() -> None:
+    selected = select_context([make_node(numbered_lines("a", 10))], None, 25, count_words)
+    assert texts(selected) == ["\n".join(numbered_lines("a", 2).splitlines())]
+
+
+def test_best_chunk_is_kept_when_no_budget_is_left() -> None:
+    chunk = numbered_lines("a", 30)
+    for budget in (0, -10):
+        selected = select_context([make_node(chunk)], None, budget, count_words)
+        assert texts(selected) == ["\n".join(chunk.splitlines()[:20])]
+
+
+def test_truncate_to_tokens_cuts_a_single_long_line_by_characters() -> None:
+    assert truncate_to_tokens("one two three four", 2, count_words) == "one two"
@@ -0,0 +1,171 @@
+"""Exact search over vector snapshots, filters included."""
+
+import time
+import uuid
+from pathlib import Path
+
+import chromadb
+import numpy as np
+import pytest
+from libs import exact_search
+from libs.exact_search import (
+    ExactSearchVectorStore,
+    VectorSnapshot,
+    filters_match,
+    filters_supported,
+)
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores import (
+    FilterCondition,
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+    VectorStoreQuery,
+)
+from llama_index.vector_stores.chroma import ChromaVectorStore
+
+URIS = ["file:///repo/a.py", "file:///repo/b.py", "file:///repo/c.md"]
+
+
+def uri_filters(operator: FilterOperator, value: str | list[str]) -> MetadataFilters:
+    return MetadataFilters(
+        filters=[MetadataFilter(key="uri", value=value, operator=operator)]
+    )
+
+
+def make_snapshot(count: int = 30, dimensions: int = 8) -> VectorSnapshot:
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(count, dimensions)).astype(np.float32)
+    metadatas = [
+        {"uri": URIS[i % len(URIS)], "language": "python" if i % 2 else "markdown"}
+        for i in range(count)
+    ]
+    return VectorSnapshot("v1", [f"n{i}" for i in range(count)], metadatas, vectors)
+
+
+def brute_force(
+    snapshot: VectorSnapshot, query: np.ndarray, top_k: int, filters: MetadataFilters
+) -> list[str]:
+    candidates = [
+        (float(np.sum((vector - query) ** 2)), node_id)
+        for node_id, vector, metadata in zip(
+            snapshot.ids, snapshot.vectors, snapshot.metadatas, strict=True
+        )
+        if filters_match(metadata, filters)
+    ]
+    return [node_id for _, node_id in sorted(candidates)[:top_k]]
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        uri_filters(FilterOperator.EQ, URIS[0]),
+        uri_filters(FilterOperator.NE, URIS[0]),
+        uri_filters(FilterOperator.IN, URIS[:2]),
+        uri_filters(FilterOperator.NIN, URIS[:2]),
+        MetadataFilters(
+            filters=[
+                MetadataFilter(key="uri", value=URIS[2], operator=FilterOperator.EQ),
+                MetadataFilter(key="language", value="python", operator=FilterOperator.EQ),
+            ],
+            condition=FilterCondition.OR,
+        ),
+        MetadataFilters(
+            filters=[
+                uri_filters(FilterOperator.IN, URIS[:2]),
+                MetadataFilter(key="language", value="python", operator=FilterOperator.EQ),
+            ],
+        ),
+    ],
+    ids=["eq", "ne", "in", "nin", "or", "nested-and"],
+)
+def test_snapshot_search_applies_filters(filters: MetadataFilters) -> None:
+    snapshot = make_snapshot()
+    query = np.random.default_rng(1).normal(size=8).astype(np.float32)
+    hits = snapshot.search(query.tolist(), 5, "l2", filters)
+
+    assert [node_id for node_id, _ in hits] == brute_force(snapshot, query, 5, filters)
+    for node_id, _ in hits:
+        assert filters_match(snapshot.metadatas[snapshot.ids.index(node_id)], filters)
+
+
+def test_snapshot_search_returns_only_matching_nodes_when_few_match() -> None:
+    snapshot = make_snapshot(count=6)
+    hits = snapshot.search([0.0] * 8, 5, "l2", uri_filters(FilterOperator.EQ, URIS[0]))
+    assert sorted(node_id for node_id, _ in hits) == ["n0", "n3"]
+    assert snapshot.search([0.0] * 8, 5, "l2", uri_filters(FilterOperator.EQ, "none")) == []
+
+
+def test_unsupported_filters_are_left_to_chroma() -> None:
+    assert filters_supported(None)
+    assert filters_supported(uri_filters(FilterOperator.NIN, URIS))
+    assert not filters_supported(
+        MetadataFilters(
+            filters=[MetadataFilter(key="line", value=3, operator=FilterOperator.GT)]
+        )
+    )
+
+
+@pytest.fixture
+def store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> ExactSearchVectorStore:
+    monkeypatch.setattr(exact_search, "EXACT_SEARCH_REBUILD_INTERVAL", 0.0)
+    collection = chromadb.EphemeralClient().create_collection(
+        f"test-{uuid.uuid4().hex}"
+    )
+    rng = np.random.default_rng(2)
+    nodes = [
+        TextNode(
+            id_=f"n{i}",
+            text=f"chunk {i}",
+            metadata={"uri": URIS[i % len(URIS)]},
+            embedding=rng.normal(size=8).tolist(),
+        )
+        for i in range(30)
+    ]
+    exact_store = ExactSearchVectorStore(
+        ChromaVectorStore(chroma_collection=collection), tmp_path / "vectors"
+    )
+    exact_store.add(nodes)
+    return exact_store
+
+
+def wait_for_snapshot(store: ExactSearchVectorStore) -> None:
+    query = VectorStoreQuery(query_embedding=[0.0] * 8, similarity_top_k=1)
+    deadline = time.monotonic() + 10
+    while store._current_snapshot() is None:  # noqa: SLF001
+        assert time.monotonic() < deadline, "snapshot was not built"
+        store.query(query)
+        time.sleep(0.05)
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        None,
+        uri_filters(FilterOperator.EQ, URIS[1]),
+        uri_filters(FilterOperator.IN, URIS[:2]),
+        uri_filters(FilterOperator.NIN, [URIS[0]]),
+    ],
+    ids=["none", "eq", "in", "nin"],
+)
+def test_store_matches_chroma(
+    store: ExactSearchVectorStore, filters: MetadataFilters | None
+) -> None:
+    wait_for_snapshot(store)
+    embedding = np.random.default_rng(3).normal(size=8).tolist()
+    query = VectorStoreQuery(query_embedding=embedding, similarity_top_k=5, filters=filters)
+
+    exact = store.query(query)
+    chroma = store._store.query(query)  # noqa: SLF001
+    assert exact.ids == chroma.ids
+    assert exact.similarities == pytest.approx(chroma.similarities, rel=1e-4)
+    assert [node.node_id for node in exact.nodes] == exact.ids
+
+
+def test_store_falls_back_to_chroma_while_stale(store: ExactSearchVectorStore) -> None:
+    wait_for_snapshot(store)
+    store.delete_nodes(["n0"])
+    query = VectorStoreQuery(query_embedding=[0.0] * 8, similarity_top_k=30)
+
+    assert store._current_snapshot() is None  # noqa: SLF001
+    assert "n0" not in (store.query(query).ids or [])
@@ -0,0 +1,47 @@
+"""Reciprocal-rank fusion of the lexical and vector rankings."""
+
+import pytest
+from libs.hybrid_search import exact_match_text, reciprocal_rank_fusion
+
+
+def test_items_found_by_both_rankings_come_first() -> None:
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], k=60)
+    assert [item for item, _ in fused] == ["a", "c", "b"]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 62)
+    assert fused[2][1] == pytest.approx(1 / 62)
+
+
+def test_single_ranking_keeps_its_order() -> None:
+    fused = reciprocal_rank_fusion([["x", "y", "z"]])
+    assert [item for item, _ in fused] == ["x", "y", "z"]
+
+
+def test_smaller_k_favors_top_ranks() -> None:
+    rankings = [["a", "b", "c", "d"], ["d", "c", "b", "a"], ["b"]]
+    assert reciprocal_rank_fusion(rankings, k=1)[0][0] == "b"
+    assert reciprocal_rank_fusion([], k=1) == []
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ('"connection reset"', "connection reset"),
+        ("handle_file_change", "handle_file_change"),
+        ("ERR_CONNECTION_RESET", "ERR_CONNECTION_RESET"),
+        ("getFileName", "getFileName"),
+        ("os.path.join", "os.path.join"),
+        ("std::vec::Vec", "std::vec::Vec"),
+        ("__init__", "__init__"),
+        ("how are files watched", None),
+        ("watcher", None),
+        ("python3", None),
+        ("utf-8", None),
+        ("v2", None),
+        ("watcher.", None),
+        (".watcher", None),
+        ("1.2.3", None),
+        ("_", None),
+    ],
+)
+def test_exact_match_text(query: str, expected: str | None) -> None:
+    assert exact_match_text(query) == expected
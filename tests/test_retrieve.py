@@ -0,0 +1,186 @@
+"""Retrieval through the API from locally indexed files."""
+
+import asyncio
+import functools
+from collections.abc import Iterator
+from pathlib import Path
+from types import ModuleType
+
+import httpx
+import pytest
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+
+# Long enough to be cut into several chunks at spaces
+LONG_LINE = " ".join(f"word{i}" for i in range(1200))
+HTML_PAGE = f"""<html><head><title>Guide</title><style>p {{ color: red; }}</style></head>
+<body>
+<nav><a href="index.html">Home</a></nav>
+<h1>Watcher guide</h1>
+<p>The watcher re-indexes files when they change.</p>
+<h2>Debouncing</h2>
+<p>Changes within <em>two seconds</em> are indexed once.</p>
+<p>{LONG_LINE}</p>
+</body></html>
+"""
+
+
+@pytest.fixture(scope="module")
+def main() -> Iterator[ModuleType]:
+    import main  # noqa: PLC0415 - configured by conftest before the import
+
+    yield main
+    main.html_converter.shutdown()
+
+
+def index_directory(main: ModuleType, directory: Path) -> str:
+    """Index or re-index a directory as a local resource and return its URI."""
+    from models.resource import Resource  # noqa: PLC0415
+
+    resource = Resource(
+        id=None, name=directory.name, uri=main.path_to_uri(directory), type="local"
+    )
+    if main.resource_service.get_resource(resource.uri) is None:
+        main.resource_service.add_resource_to_db(resource)
+    asyncio.run(main.index_local_resource_async(resource))
+    return resource.uri
+
+
+def retrieve(main: ModuleType, query: str, base_uri: str, top_k: int = 20) -> dict:
+    async def post() -> dict:
+        transport = ASGITransport(app=main.app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post(
+                "/api/v1/retrieve",
+                json={"query": query, "base_uri": base_uri, "top_k": top_k},
+            )
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return asyncio.run(post())
+
+
+def test_indexed_html_file_is_retrieved(main: ModuleType, tmp_path: Path) -> None:
+    (tmp_path / "guide.html").write_text(HTML_PAGE, encoding="utf-8")
+    base_uri = index_directory(main, tmp_path)
+
+    sources = retrieve(main, "how does the watcher debounce changes", base_uri)["sources"]
+    contents = [source["content"] for source in sources]
+    assert {source["uri"] for source in sources} == {main.path_to_uri(tmp_path / "guide.html")}
+    # Sections are retrieved as markdown, the long line in pieces of itself
+    assert any("two seconds" in content and "<em>" not in content for content in contents)
+    assert sum("word600" in content or "word1199" in content for content in contents) >= 1
+    assert all(content in LONG_LINE for content in contents if content.startswith("word"))
+
+WATCHER_MODULE = '''"""File watching."""
+
+
+class Watcher:
+    """Re-index files of a directory when they change."""
+
+    debounce_seconds = 2.0
+
+    def start(self, directory):
+        self.directory = directory
+        self.running = True
+        return self.running
+
+    def stop(self):
+        self.running = False
+        return self.running
+'''
+
+
+def test_best_chunk_is_answered_from_without_context_budget(
+    main: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    (tmp_path / "guide.html").write_text(HTML_PAGE, encoding="utf-8")
+    base_uri = index_directory(main, tmp_path)
+    monkeypatch.setattr(main, "get_context_budget", lambda _: 0)
+
+    sources = retrieve(main, "what happens to changes within two seconds", base_uri)["sources"]
+    assert len(sources) == 1
+
+
+def test_llm_token_usage_is_counted(main: ModuleType, tmp_path: Path) -> None:
+    (tmp_path / "guide.html").write_text(HTML_PAGE, encoding="utf-8")
+    base_uri = index_directory(main, tmp_path)
+
+    def count(kind: str) -> float:
+        return REGISTRY.get_sample_value("rag_tokens_total", {"kind": kind}) or 0.0
+
+    prompt_tokens, completion_tokens = count("prompt"), count("completion")
+    retrieve(main, "which changes are indexed once", base_uri)
+    assert count("prompt") > prompt_tokens
+    assert count("completion") > completion_tokens
+
+
+def test_skeleton_chunk_is_retrieved(
+    main: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        main, "CodeSplitter", functools.partial(main.CodeSplitter, containment="skeleton")
+    )
+    (tmp_path / "watcher.py").write_text(WATCHER_MODULE, encoding="utf-8")
+    base_uri = index_directory(main, tmp_path)
+
+    sources = retrieve(main, "watcher debounce seconds", base_uri)["sources"]
+    skeletons = [
+        source["content"]
+        for source in sources
+        if "debounce_seconds" in source["content"]
+    ]
+    assert len(skeletons) == 1
+    # Methods are collapsed to their first line, with nothing added to it
+    assert "    def start(self, directory):\n" in skeletons[0]
+    assert "self.directory = directory" not in skeletons[0]
+
+
+def test_unchanged_files_keep_their_symbols(
+    main: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    (tmp_path / "watcher.py").write_text(WATCHER_MODULE, encoding="utf-8")
+    index_directory(main, tmp_path)
+    assert main.symbol_service.find_symbols("Watcher", main.path_to_uri(tmp_path))
+
+    replaced = []
+    monkeypatch.setattr(
+        main.symbol_service, "replace_symbols", lambda *args: replaced.append(args)
+    )
+    index_directory(main, tmp_path)
+    assert replaced == []
+
+
+def test_page_that_fails_to_convert_does_not_stop_the_crawl(
+    main: ModuleType, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from models.resource import Resource  # noqa: PLC0415
+
+    root_url = "https://docs.example.com/guide/"
+    pages = {
+        root_url: '<h1>Guide</h1><p>See <a href="broken.html">broken</a>.</p>',
+        f"{root_url}broken.html": "<p>unconvertible</p>",
+    }
+
+    async def get(url: str, **_: object) -> httpx.Response:
+        if url in pages:
+            return httpx.Response(200, text=pages[url], request=httpx.Request("GET", url))
+        return httpx.Response(404, request=httpx.Request("GET", url))
+
+    convert = main.html_converter.convert
+
+    async def failing_convert(html: str, url: str) -> tuple[str, list[str]]:
+        if url.endswith("broken.html"):
+            raise RecursionError("maximum recursion depth exceeded")
+        return await convert(html, url)
+
+    monkeypatch.setattr(main.http_client, "get", get)
+    monkeypatch.setattr(main.html_converter, "convert", failing_convert)
+
+    resource = Resource(id=None, name="guide", uri=root_url, type="remote")
+    main.resource_service.add_resource_to_db(resource)
+    asyncio.run(main.index_remote_resource_async(resource))
+
+    assert main.resource_service.get_resource(root_url).indexing_status == "indexed"
+    assert main.crawl_state_service.get_crawl_state(root_url) is not None
+    assert main.crawl_state_service.get_crawl_state(f"{root_url}broken.html") is None
@@ -0,0 +1,50 @@
+"""Invalidation of cached retrieval results."""
+
+import pytest
+from libs import retrieve_cache as retrieve_cache_module
+from libs.retrieve_cache import RetrieveCache, make_retrieve_cache_key
+
+
+def test_incremented_generation_misses_the_cache() -> None:
+    cache = RetrieveCache(max_size=10, ttl=60)
+    key = make_retrieve_cache_key("how to crawl", "file:///repo", 5, [(1, 3)])
+    cache.put(key, ["result"])
+
+    assert cache.get(key) == ["result"]
+    assert cache.get(make_retrieve_cache_key("how to crawl", "file:///repo", 5, [(1, 4)])) is None
+    assert cache.get(make_retrieve_cache_key("how to crawl", "file:///repo", 5, [(1, 3), (2, 0)])) is None
+
+
+def test_key_normalizes_the_query_but_not_the_scope() -> None:
+    key = make_retrieve_cache_key("how  to crawl", "file:///repo", 5, [(1, 3)])
+    assert key == make_retrieve_cache_key("how to crawl ", "file:///repo", 5, [(1, 3)])
+    assert key != make_retrieve_cache_key("how to crawl", "file:///other", 5, [(1, 3)])
+    assert key != make_retrieve_cache_key("how to crawl", "file:///repo", 10, [(1, 3)])
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = RetrieveCache(max_size=2, ttl=60)
+    cache.put(("a",), 1)
+    cache.put(("b",), 2)
+    assert cache.get(("a",)) == 1
+    cache.put(("c",), 3)
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == 1
+    assert cache.get(("c",)) == 3
+
+
+def test_entries_expire_after_the_ttl(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr(retrieve_cache_module.time, "monotonic", lambda: now[0])
+    cache = RetrieveCache(max_size=10, ttl=60)
+    cache.put(("a",), 1)
+    now[0] += 59
+    assert cache.get(("a",)) == 1
+    now[0] += 1
+    assert cache.get(("a",)) is None
+
+
+def test_zero_ttl_disables_the_cache() -> None:
+    cache = RetrieveCache(max_size=10, ttl=0)
+    cache.put(("a",), 1)
+    assert cache.get(("a",)) is None